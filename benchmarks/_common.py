@@ -0,0 +1,98 @@
+"""Helpers shared by the benchmarks that run the real server in a subprocess or read its /metrics."""
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE = re.compile(r'^(\w+)(?:\{(\w+)="([^"]*)"\})? (\S+)$')
+# What every server started here has in common; callers add the rest
+SERVER = ['remote_switch', '--no-prompt', '--host', '127.0.0.1', '--h264-port', '0', '--pico-ip', '127.0.0.1',
+          '--video-backend', 'synthetic', '--audio-backend', 'synthetic']
+
+
+def free_port(kind=socket.SOCK_STREAM):
+    with socket.socket(socket.AF_INET, kind) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def percentile(values, q):
+    ordered = sorted(values) or [0.0]
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def metrics_text(port):
+    with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics', timeout=5) as r:
+        return r.read().decode()
+
+
+def scrape(port):
+    """Returns {(name, label value): value} from the server's /metrics."""
+    samples = {}
+    for line in metrics_text(port).splitlines():
+        match = SAMPLE.match(line)
+        if match:
+            name, _, label, value = match.groups()
+            samples[name, label] = float(value)
+    return samples
+
+
+def by_label(samples, name):
+    return {label: value for (metric, label), value in samples.items() if metric == name}
+
+
+def total(samples, name):
+    return sum(by_label(samples, name).values())
+
+
+def server_log():
+    log = tempfile.NamedTemporaryFile('w', prefix='remote-switch-', suffix='.log', delete=False)
+    print(f'server log: {log.name}')
+    return log
+
+
+def wait_for_metrics(port, process=None, log=None):
+    """Waits up to 30 s for /metrics on port, failing early if process exits."""
+    name = process.args[2] if process else 'server'
+    see = f', see {log.name}' if log else ''
+    deadline = time.perf_counter() + 30
+    while time.perf_counter() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f'{name} exited with {process.returncode}{see}')
+        try:
+            metrics_text(port)
+            return
+        except OSError:
+            time.sleep(0.2)
+    if process is not None:
+        process.kill()
+    raise RuntimeError(f'{name} did not come up{see}')
+
+
+def launch(command, port, log):
+    """Runs `python -m command...` from the repo root and returns it once its /metrics answers."""
+    process = subprocess.Popen([sys.executable, '-m', *command], cwd=ROOT, stdout=log, stderr=subprocess.STDOUT)
+    wait_for_metrics(port, process, log)
+    return process
+
+
+def start_server(port, log, *options):
+    """The server on the synthetic sources, web on port, plus any options."""
+    return launch([*SERVER, '--port', str(port), *options], port, log)
+
+
+def stop(processes):
+    """Ctrl+C for each, newest first, then a kill for any still running after 5 s."""
+    for process in reversed(processes):
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
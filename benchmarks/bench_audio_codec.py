@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Opus round trip of a synthetic tone through OpusEncoder.
+
+Feeds a 440 Hz tone in capture-sized PCM chunks, decodes the packets with
+PyAV's Opus decoder and checks that the tone survives: dominant frequency
+and SNR after aligning for the codec delay. Also reports the bandwidth
+against raw PCM. Exits non-zero if the round trip fails.
+
+    python benchmarks/bench_audio_codec.py --rate 48000 --frame-ms 20
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from remote_switch.audio_codec import OpusEncoder, av, opus_available
+
+
+def decode(packets, rate):
+    codec = av.CodecContext.create('opus', 'r')
+    codec.sample_rate = rate
+    codec.layout = 'mono'
+    pcm = []
+    for packet in packets:
+        for frame in codec.decode(av.Packet(packet)):
+            pcm.append(frame.to_ndarray().reshape(-1).astype(np.float64))
+    return np.concatenate(pcm)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rate', type=int, default=48000)
+    parser.add_argument('--frame-ms', type=int, default=20)
+    parser.add_argument('--bitrate', type=int, default=48000)
+    parser.add_argument('--chunk', type=int, default=2048, help='PCM samples per capture read')
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--min-snr', type=float, default=15.0)
+    args = parser.parse_args()
+
+    if not opus_available(args.rate, args.frame_ms):
+        print(f'Opus unavailable (PyAV installed: {av is not None}, rate {args.rate}, frame {args.frame_ms} ms)')
+        sys.exit(1)
+
+    t = np.arange(int(args.rate * args.seconds)) / args.rate
+    tone = (np.sin(2 * np.pi * 440 * t) * 12000).astype(np.int16)
+
+    encoder = OpusEncoder(args.rate, args.frame_ms, args.bitrate)
+    packets = []
+    for start in range(0, len(tone), args.chunk):
+        packets += encoder.encode(tone[start:start + args.chunk].tobytes())
+    decoded = decode(packets, args.rate) * 32768.0
+
+    # Align for the encoder's look-ahead, then compare the steady-state middle
+    reference = tone.astype(np.float64)
+    n = min(len(reference), len(decoded))
+    window = slice(n // 4, n // 4 + args.rate // 2)
+    delays = range(0, args.rate // 50)
+    delay = max(delays, key=lambda d: np.dot(reference[window], decoded[d:][window]))
+    aligned = decoded[delay:][window]
+    noise = aligned - reference[window]
+    snr = 10 * np.log10(np.sum(reference[window] ** 2) / max(np.sum(noise ** 2), 1e-9))
+    segment = decoded[: args.rate]
+    peak = np.argmax(np.abs(np.fft.rfft(segment))) * args.rate / len(segment)
+
+    opus_bytes = sum(len(p) for p in packets)
+    pcm_bytes = len(tone) * 2
+    print(f'{len(packets)} packets of {args.frame_ms} ms, {opus_bytes * 8 / args.seconds / 1000:.1f} kbit/s '
+          f'vs PCM {pcm_bytes * 8 / args.seconds / 1000:.1f} kbit/s ({pcm_bytes / opus_bytes:.1f}x smaller)')
+    print(f'codec delay {delay / args.rate * 1000:.1f} ms, peak {peak:.0f} Hz, SNR {snr:.1f} dB')
+
+    ok = abs(peak - 440) <= 2 and snr >= args.min_snr
+    print('PASS' if ok else 'FAIL')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""720p60 encode throughput: capture-thread encoding vs EncoderPool.
+
+A synthetic source produces moving 1280x720 BGR frames at the target rate
+and every rendition is watched. Reports encoded fps per rendition, frames
+the pool dropped, and how long the capture loop spent per frame (the time
+it could not spend reading the device).
+
+    python benchmarks/bench_encode_pool.py --workers 2 --seconds 10
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from remote_switch.encoder_pool import EncoderPool, encode_renditions
+
+RENDITIONS = [('low', 256, 144, 45), ('medium', 512, 288, 25), ('high', 1280, 720, 60)]
+
+
+def synthetic_frames(width, height):
+    # Diagonal gradient scrolling one step per frame, plus noise so JPEG has work to do
+    base = (np.add.outer(np.arange(height), np.arange(width)) % 256).astype(np.uint8)
+    noise = np.random.default_rng(0).integers(0, 32, (height, width, 3), dtype=np.uint8)
+    step = 0
+    while True:
+        plane = np.roll(base, step * 4, axis=1)
+        yield np.dstack((plane, plane[::-1], 255 - plane)) + noise
+        step += 1
+
+
+def run(workers, fps, seconds):
+    counts = {name: 0 for name, *_ in RENDITIONS}
+    lock = threading.Lock()
+
+    def publish(name, part, seconds):
+        with lock:
+            counts[name] += 1
+
+    pool = None
+    if workers:
+        pool = EncoderPool(workers, 1280 * 720 * 3, publish)
+    frames = synthetic_frames(1280, 720)
+    interval = 1.0 / fps
+    busy = 0.0
+    captured = 0
+    started = deadline = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        frame = next(frames)
+        t0 = time.perf_counter()
+        if pool:
+            pool.submit(frame, RENDITIONS)
+        else:
+            for name, part, seconds in encode_renditions(frame, RENDITIONS):
+                publish(name, part, seconds)
+        busy += time.perf_counter() - t0
+        captured += 1
+        deadline += interval
+        delay = deadline - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    elapsed = time.perf_counter() - started
+    dropped = 0
+    if pool:
+        time.sleep(0.2)
+        dropped = pool.dropped
+        pool.close()
+    rates = {name: count / elapsed for name, count in counts.items()}
+    return rates, captured / elapsed, dropped, busy / captured * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--fps', type=int, default=60)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    args = parser.parse_args()
+
+    for label, workers in (('inline', 0), (f'pool x{args.workers}', args.workers)):
+        rates, capture_fps, dropped, busy_ms = run(workers, args.fps, args.seconds)
+        encoded = '  '.join(f'{name} {rate:5.1f}' for name, rate in rates.items())
+        print(f'{label:>8}: capture {capture_fps:5.1f} fps | encoded fps {encoded} | '
+              f'dropped {dropped} | capture loop {busy_ms:5.2f} ms/frame')
+
+
+if __name__ == '__main__':
+    main()
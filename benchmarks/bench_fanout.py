@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Multi-viewer fan-out benchmark against a synthetic capture source.
+
+Runs N viewer threads against the old shared-Event hand-off and the
+FrameHub sequence counters, and prints the frame rate each viewer receives.
+Each send takes 0.5 to 1.5 times --send-ms, a frame interval by default:
+the shared Event only loses frames once sends are that slow, so a much
+lower value shows no difference. Exits 1 if FrameHub delivers no more
+frames in total than the shared Event.
+
+    python benchmarks/bench_fanout.py --viewers 4 --fps 60 --seconds 5
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from remote_switch.frame_hub import FrameHub
+
+
+class EventSource:
+    """The pre-FrameHub hand-off: one Event cleared by whichever viewer wakes first."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.frame_event = threading.Event()
+        self.jpeg_frame = None
+
+    def publish(self, frame):
+        with self.lock:
+            self.jpeg_frame = frame
+        self.frame_event.set()
+
+    def viewer(self, stop, counter, send_ms):
+        while not stop.is_set():
+            if self.frame_event.wait(timeout=1.0):
+                with self.lock:
+                    self.frame_event.clear()
+                    frame = self.jpeg_frame
+                if frame:
+                    send(send_ms)
+                    counter[0] += 1
+
+
+class HubSource:
+    def __init__(self):
+        self.hub = FrameHub()
+
+    def publish(self, frame):
+        self.hub.publish(frame)
+
+    def viewer(self, stop, counter, send_ms):
+        last_seq = 0
+        while not stop.is_set():
+            last_seq, frame = self.hub.wait_for(last_seq, timeout=1.0)
+            if frame:
+                send(send_ms)
+                counter[0] += 1
+
+
+def send(send_ms):
+    # Stand-in for the socket write: jittered around send_ms
+    if send_ms > 0:
+        time.sleep(random.uniform(0.5, 1.5) * send_ms / 1000)
+
+
+def capture(source, fps, frame_size, stop):
+    # Synthetic capture: a fixed-size payload published at a steady rate
+    payload = bytes(frame_size)
+    interval = 1.0 / fps
+    deadline = time.perf_counter()
+    while not stop.is_set():
+        source.publish(payload)
+        deadline += interval
+        delay = deadline - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def run(source, viewers, fps, frame_size, send_ms, seconds):
+    stop = threading.Event()
+    counters = [[0] for _ in range(viewers)]
+    threads = [threading.Thread(target=source.viewer, args=(stop, c, send_ms), daemon=True) for c in counters]
+    for t in threads:
+        t.start()
+    producer = threading.Thread(target=capture, args=(source, fps, frame_size, stop), daemon=True)
+    producer.start()
+    time.sleep(seconds)
+    stop.set()
+    producer.join()
+    return [c[0] / seconds for c in counters]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--viewers', type=int, default=4)
+    parser.add_argument('--fps', type=int, default=60)
+    parser.add_argument('--frame-size', type=int, default=30_000, help='synthetic JPEG size in bytes')
+    parser.add_argument('--send-ms', type=float, default=None,
+                        help='simulated per-frame write time, jittered; default one frame interval')
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+    send_ms = args.send_ms if args.send_ms is not None else 1000 / args.fps
+
+    totals = []
+    for name, source in (('shared Event', EventSource()), ('FrameHub', HubSource())):
+        rates = run(source, args.viewers, args.fps, args.frame_size, send_ms, args.seconds)
+        per_viewer = ' '.join(f'{r:5.1f}' for r in rates)
+        print(f'{name:>12}: capture {args.fps} fps | per viewer [{per_viewer}] | total {sum(rates):6.1f} fps')
+        totals.append(sum(rates))
+    if totals[1] <= totals[0]:
+        print(f'FrameHub did not deliver more frames than the shared Event at {send_ms:.1f} ms per send')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
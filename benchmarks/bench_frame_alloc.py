@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Bytes allocated per delivered frame, before and after pre-framing.
+
+Before: the encoder array is copied by tobytes(), then every viewer builds
+its own header + frame + CRLF concatenation. After: multipart_frame() joins
+the part once from the encoder array and every viewer yields that object.
+
+Each step publishes one frame and lets every viewer take its chunk while
+the others still hold theirs (they write concurrently), and tracemalloc's
+peak gives the bytes that step allocated.
+
+    python benchmarks/bench_frame_alloc.py --viewers 4 --frame-size 90000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from remote_switch.frame_hub import FrameHub, multipart_frame
+
+
+def before(hub, encoded, viewers):
+    hub.publish(bytes(encoded))  # buffer.tobytes()
+    return [b'--frame\r\n'
+            b'Content-Type: image/jpeg\r\n\r\n' + hub.wait_for(0)[1] + b'\r\n'
+            for _ in range(viewers)]
+
+
+def after(hub, encoded, viewers):
+    hub.publish(multipart_frame(encoded))
+    return [hub.wait_for(0)[1] for _ in range(viewers)]
+
+
+def measure(step, encoded, viewers, frames):
+    hub = FrameHub()
+    tracemalloc.start()
+    allocated = 0
+    started = time.perf_counter()
+    for _ in range(frames):
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        chunks = step(hub, encoded, viewers)
+        allocated += tracemalloc.get_traced_memory()[1] - baseline
+        del chunks
+    elapsed = time.perf_counter() - started
+    tracemalloc.stop()
+    return allocated / (frames * viewers), elapsed / frames * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--viewers', type=int, default=4)
+    parser.add_argument('--frame-size', type=int, default=90_000, help='encoded JPEG size (720p is ~90 KB)')
+    parser.add_argument('--frames', type=int, default=2000)
+    args = parser.parse_args()
+
+    # Stands in for the cv2.imencode ndarray: a buffer-protocol object, not bytes
+    encoded = memoryview(bytearray(os.urandom(args.frame_size)))
+
+    for name, step in (('before', before), ('after', after)):
+        per_delivery, us_per_frame = measure(step, encoded, args.viewers, args.frames)
+        print(f'{name:>6}: {per_delivery:10.0f} bytes allocated per delivered frame '
+              f'({args.viewers} viewers, {us_per_frame:6.1f} us per published frame traced)')
+
+
+if __name__ == '__main__':
+    main()
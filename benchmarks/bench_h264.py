@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""MJPEG vs H.264 for one rendition: bandwidth, frame rate and glass-to-glass latency.
+
+The server runs in-process on a synthetic 1280x720 source whose frames
+carry their capture time as a strip of black and white cells along the
+top. One client reads /video_feed, the other the H.264 WebSocket; each
+decodes every frame as it completes (cv2 for JPEG, PyAV for H.264, as a
+browser would) and reads the strip back, so latency covers capture,
+encoding, the network stack and decoding but not the display. The two
+run one after the other on the same source and rendition.
+
+On one core with the veryfast preset, 720p H.264 fit in about 2 Mbit/s
+where MJPEG took 15-30, at about 15 ms of encoding per frame.
+
+    python benchmarks/bench_h264.py --profile high --seconds 10 --bitrate 2000000
+
+Needs PyAV with libx264.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+import urllib.request
+
+import av
+import cv2
+import numpy as np
+from websockets.asyncio.client import connect
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _common import free_port, percentile, wait_for_metrics
+from remote_switch.app import create_app, stop_pipelines
+from remote_switch.capture import ClockCamera, clock_age, read_clock, synthetic_frames
+from remote_switch.config import Config
+from remote_switch.frame_hub import FRAME_BOUNDARY
+from remote_switch.h264 import h264_available
+
+
+class Result:
+    def __init__(self, name):
+        self.name = name
+        self.bytes = 0
+        self.latencies = []
+        self.first_frame = None
+
+    def frame(self, image, started):
+        if self.first_frame is None:
+            self.first_frame = time.perf_counter() - started
+        self.latencies.append(clock_age(read_clock(image)))
+
+    def report(self, seconds):
+        pick = lambda q: percentile(self.latencies, q)
+        first = f'{self.first_frame * 1000:.0f} ms' if self.first_frame is not None else 'never'
+        print(f'{self.name:>6}: {self.bytes * 8 / seconds / 1e6:6.2f} Mbit/s  {len(self.latencies) / seconds:5.1f} fps  '
+              f'latency p50 {pick(0.5):5.1f}  p95 {pick(0.95):5.1f}  p99 {pick(0.99):5.1f} ms  '
+              f'first frame {first}')
+
+
+def watch_mjpeg(port, profile, seconds):
+    result = Result('MJPEG')
+    started = time.perf_counter()
+    stream = urllib.request.urlopen(f'http://127.0.0.1:{port}/video_feed?profile={profile}')
+    buf = b''
+    while time.perf_counter() - started < seconds:
+        chunk = stream.read1(65536)
+        if not chunk:
+            break
+        result.bytes += len(chunk)
+        buf += chunk
+        # A part is complete at its JPEG end marker, without waiting for the next header
+        while True:
+            start = buf.find(FRAME_BOUNDARY)
+            header_end = buf.find(b'\r\n\r\n', start) if start >= 0 else -1
+            end = buf.find(b'\xff\xd9\r\n', header_end) if header_end >= 0 else -1
+            if end < 0:
+                break
+            image = cv2.imdecode(np.frombuffer(buf[header_end + 4:end + 2], np.uint8), cv2.IMREAD_GRAYSCALE)
+            buf = buf[end + 4:]
+            if image is not None:
+                result.frame(image, started)
+    stream.close()
+    return result
+
+
+async def watch_h264(port, seconds):
+    result = Result('H.264')
+    started = time.perf_counter()
+    decoder = None
+    async with connect(f'ws://127.0.0.1:{port}', compression=None, max_size=None) as websocket:
+        while time.perf_counter() - started < seconds:
+            try:
+                message = await asyncio.wait_for(websocket.recv(), started + seconds - time.perf_counter())
+            except asyncio.TimeoutError:
+                break
+            result.bytes += len(message)
+            if isinstance(message, str):
+                continue
+            if message[4:8] == b'ftyp':
+                # The decoder takes the avcC record from the init segment as extradata
+                at = message.find(b'avcC')
+                size = int.from_bytes(message[at - 4:at], 'big')
+                decoder = av.CodecContext.create('h264', 'r')
+                decoder.extradata = message[at + 4:at - 4 + size]
+                decoder.thread_type = 'SLICE'
+                continue
+            # moof then mdat: the sample is the mdat payload
+            moof = int.from_bytes(message[:4], 'big')
+            for frame in decoder.decode(av.Packet(message[moof + 8:])):
+                # The luma plane is enough to read the stamp
+                result.frame(frame.to_ndarray()[:frame.height], started)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profile', default='high', help='rendition to compare')
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--bitrate', type=int, default=Config.h264_bitrate, help='H.264 bits per second')
+    parser.add_argument('--preset', default=Config.h264_preset, help='x264 preset')
+    parser.add_argument('--fps', type=int, default=60)
+    args = parser.parse_args()
+    if not h264_available():
+        sys.exit('Needs PyAV with libx264 (pip install av)')
+
+    config = Config(video_backend='synthetic', audio_backend='synthetic', source_size=(1280, 720),
+                    mjpeg_passthrough=False, capture_fps=args.fps, host='127.0.0.1', port=free_port(),
+                    input_port=0, h264_port=0, h264_profile=args.profile, h264_bitrate=args.bitrate,
+                    h264_preset=args.preset, pico_ip='127.0.0.1')
+    frames = synthetic_frames(1280, 720, 'scroll')
+    app = create_app(config, video_device=lambda: ClockCamera(frames, args.fps))
+    try:
+        threading.Thread(target=app.socketio.run, args=(app,), daemon=True,
+                         kwargs=dict(host=config.host, port=config.port, allow_unsafe_werkzeug=True)).start()
+        app.h264_streamer.ready.wait()
+        wait_for_metrics(config.port)
+
+        print(f'{args.profile} {config.profiles[args.profile][:2]} at {args.fps} fps, H.264 '
+              f'{args.bitrate / 1e6:g} Mbit/s {args.preset}, {args.seconds:g} s each')
+        watch_mjpeg(config.port, args.profile, args.seconds).report(args.seconds)
+        asyncio.run(watch_h264(app.h264_streamer.port, args.seconds)).report(args.seconds)
+    finally:
+        stop_pipelines(app)
+
+
+if __name__ == '__main__':
+    main()
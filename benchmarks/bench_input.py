@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""handle_input throughput: JSON dict messages vs binary PacketData messages.
+
+Each call includes the Socket.IO payload decode the server does before the
+handler runs (json.loads of the event, or of the binary placeholder header)
+and a real sendto() to a local UDP socket standing in for the Pico.
+
+    python benchmarks/bench_input.py --seconds 3
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from remote_switch.input_protocol import PACKET, pack_legacy, split_message
+
+# What a browser puts on the wire for one input event
+JSON_EVENT = '42' + json.dumps(['input_data', {'player': 1, 'buttons': 5, 'lx': 128, 'ly': 128, 'rx': 200, 'ry': 90}],
+                               separators=(',', ':'))
+BINARY_HEADER = '451-' + json.dumps(['input_data', {'_placeholder': True, 'num': 0}], separators=(',', ':'))
+BINARY_PAYLOAD = PACKET.pack(1, 5, 8, 128, 128, 200, 90)
+
+
+def handle_input(sock, addr, data):
+    # Same parsing as the server's handler, minus the metrics
+    message = split_message(data)
+    packet = message[0] if message else pack_legacy(data)
+    sock.sendto(packet, addr)
+
+
+def old_format(sock, addr):
+    handle_input(sock, addr, json.loads(JSON_EVENT[2:])[1])
+
+
+def new_format(sock, addr):
+    json.loads(BINARY_HEADER[4:])
+    handle_input(sock, addr, BINARY_PAYLOAD)
+
+
+def rate(call, sock, addr, seconds):
+    calls = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        for _ in range(1000):
+            call(sock, addr)
+        calls += 1000
+    return calls / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=3.0)
+    args = parser.parse_args()
+
+    pico = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    pico.bind(('127.0.0.1', 0))
+    pico.setblocking(False)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    addr = pico.getsockname()
+
+    old = rate(old_format, sock, addr, args.seconds)
+    new = rate(new_format, sock, addr, args.seconds)
+    print(f'JSON dict : {old:10.0f} handle_input calls/s  ({len(JSON_EVENT)} B per event)')
+    print(f'binary    : {new:10.0f} handle_input calls/s  ({len(BINARY_HEADER)} B header + {len(BINARY_PAYLOAD)} B payload)')
+    print(f'speedup   : {new / old:.2f}x')
+    # Upstream traffic for an idle player: every 16 ms before, one heartbeat per 200 ms now
+    print(f'idle upstream: {len(JSON_EVENT) * 1000 / 16:.0f} B/s before, '
+          f'{(len(BINARY_HEADER) + len(BINARY_PAYLOAD)) * 1000 / 200:.0f} B/s after')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Batched vs legacy input datagrams, checked against a fake Pico.
+
+First the reference decoder and sequence filter are run through the cases
+sketch.ino has to get right: legacy packets, batches, duplicates, reordered
+and malformed datagrams, sequence wrap-around and a restarted server.
+
+Then two players send at --rate Hz with a little jitter, like two browsers,
+through an InputScheduler in each format. The fake Pico decodes what
+arrives exactly as the sketch does and checks it ends on the last state of
+each player; the report is datagrams per second (one parsePacket()/read()
+each on the Pico) and how many were rejected. Exits 1 if any check fails.
+
+    python benchmarks/bench_input_batch.py --send-hz 1000 --seconds 5
+"""
+import argparse
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from remote_switch.input_protocol import (BATCH_HEADER, BATCH_MAGIC, PACKET, PICO_TIMEOUT, SequenceFilter,
+                                          pack_batch, unpack_datagram)
+from remote_switch.input_scheduler import FORMATS, InputScheduler
+
+
+class FakePico:
+    """Keeps each player's state from the datagrams it accepts, as loop1() does."""
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.settimeout(0.2)
+        self.port = self.sock.getsockname()[1]
+        self.filter = SequenceFilter()
+        self.states = {}
+        self.datagrams = 0
+        self.rejected = 0
+        self.running = True
+        self.thread = threading.Thread(target=self.listen, daemon=True)
+        self.thread.start()
+
+    def listen(self):
+        while self.running:
+            try:
+                data = self.sock.recv(128)
+            except socket.timeout:
+                continue
+            self.datagrams += 1
+            if not self.receive(data, time.perf_counter()):
+                self.rejected += 1
+
+    def receive(self, data, now):
+        decoded = unpack_datagram(data)
+        if decoded is None:
+            return False
+        seq, packets = decoded
+        if seq is not None and not self.filter.accept(seq, now):
+            return False
+        for packet in packets:
+            self.states[packet[0]] = packet
+        return True
+
+
+def check_protocol():
+    """Returns the failed cases of the reference decoder."""
+    p1 = PACKET.pack(1, 0x0001, 8, 10, 20, 30, 40)
+    p2 = PACKET.pack(2, 0x0002, 8, 50, 60, 70, 80)
+    pico = FakePico()
+    pico.running = False
+    cases = [
+        ('legacy packet', p1, 0.0, True),
+        ('batch of two', pack_batch(5, [p1, p2]), 0.0, True),
+        ('duplicate', pack_batch(5, [p1]), 0.01, False),
+        ('older', pack_batch(4, [p1]), 0.02, False),
+        ('newer', pack_batch(6, [p2]), 0.03, True),
+        ('jump ahead', pack_batch(0x7000, [p1]), 0.04, True),
+        ('far behind', pack_batch(0x7000 + 0x8000, [p1]), 0.05, False),
+        ('further ahead', pack_batch(0xE000, [p1]), 0.06, True),
+        ('near wrap', pack_batch(0xFFFF, [p1]), 0.065, True),
+        ('wrapped', pack_batch(0, [p2]), 0.07, True),
+        ('wrong version', bytes([BATCH_MAGIC, 2]) + pack_batch(1, [p1])[2:], 0.08, False),
+        ('short count', pack_batch(1, [p1, p2])[:BATCH_HEADER.size + PACKET.size], 0.09, False),
+        ('too short', p1[:5], 0.10, False),
+        ('restarted server', pack_batch(1, [p1]), 0.10 + PICO_TIMEOUT, True),
+    ]
+    failed = [name for name, data, now, expected in cases if pico.receive(data, now) != expected]
+    if pico.states != {1: p1, 2: p2}:
+        failed.append('final states')
+    return failed
+
+
+def play(scheduler, player, rate, stop, last):
+    seq = 0
+    while not stop.is_set():
+        seq = (seq + 1) & 0xFFFF
+        packet = PACKET.pack(player, seq, 8, 128, 128, 128, 128)
+        scheduler.submit(packet, 'relay', time.perf_counter())
+        last[player] = packet
+        time.sleep(max(0.0, 1.0 / rate + random.uniform(-0.002, 0.002)))
+
+
+def run(fmt, args):
+    pico = FakePico()
+    scheduler = InputScheduler(socket.socket(socket.AF_INET, socket.SOCK_DGRAM), ('127.0.0.1', pico.port),
+                               args.send_hz, fmt)
+    stop = threading.Event()
+    last = {}
+    players = [threading.Thread(target=play, args=(scheduler, player, args.rate, stop, last), daemon=True)
+               for player in (1, 2)]
+    for t in players:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in players:
+        t.join()
+    time.sleep(0.2)
+    scheduler.close()
+    pico.running = False
+    print(f'{fmt:>6}: {pico.datagrams / args.seconds:6.1f} datagrams/s, {pico.rejected} rejected, '
+          f'final state {"ok" if pico.states == last else "WRONG"}')
+    return pico.states == last and not pico.rejected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--send-hz', type=int, default=1000, help='scheduler tick (0: send on arrival)')
+    parser.add_argument('--rate', type=float, default=60.0, help='messages per second per player')
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    failed = check_protocol()
+    print(f'reference decoder: {"ok" if not failed else "FAILED " + ", ".join(failed)}')
+    ok = not failed
+    for fmt in FORMATS:
+        ok = run(fmt, args) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Browser-to-UDP input latency through the InputRelay, under video load.
+
+A fake Pico listens on UDP and timestamps every packet; a WebSocket client
+plays the browser and sends a packet at 60 Hz, with a sequence number in the
+buttons field so each arrival can be matched to its send time.
+
+By default everything runs in this process: an InputRelay pointed at the
+fake Pico through an InputScheduler ticking at --send-hz, plus synthetic
+video load (a 60 fps FrameHub capture feeding MJPEG viewer threads). With
+--server the client targets a running server instead (started with
+--pico-ip set to this machine and --pico-port to --pico-port) and loads it
+with real /video_feed viewers.
+
+    python benchmarks/bench_input_relay.py --viewers 4 --seconds 10
+    python benchmarks/bench_input_relay.py --server 192.168.1.20 --viewers 4
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+import urllib.request
+
+from websockets.asyncio.client import connect
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from remote_switch.frame_hub import FrameHub, multipart_frame
+from remote_switch.input_protocol import PACKET, unpack_datagram
+from remote_switch.input_relay import InputRelay
+from remote_switch.input_scheduler import InputScheduler
+
+
+class FakePico:
+    def __init__(self, port):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('0.0.0.0', port))
+        self.sock.settimeout(0.5)
+        self.port = self.sock.getsockname()[1]
+        self.arrivals = {}
+        self.running = True
+        self.thread = threading.Thread(target=self.listen, daemon=True)
+        self.thread.start()
+
+    def listen(self):
+        while self.running:
+            try:
+                data = self.sock.recv(64)
+            except socket.timeout:
+                continue
+            now = time.perf_counter()
+            # Legacy packets or batches; a batch repeats recent states, so keep the first arrival
+            for packet in (unpack_datagram(data) or (None, []))[1]:
+                self.arrivals.setdefault(PACKET.unpack(packet)[1], now)
+
+
+def local_video_load(viewers, stop):
+    # Same shape as the server: a capture thread publishing pre-framed JPEGs
+    # and one thread per MJPEG viewer pulling them
+    hub = FrameHub()
+    part = multipart_frame(os.urandom(40_000))
+
+    def capture():
+        while not stop.is_set():
+            hub.publish(part)
+            time.sleep(1 / 60)
+
+    def viewer():
+        hub.subscribe()
+        last_seq = 0
+        while not stop.is_set():
+            last_seq, frame = hub.wait_for(last_seq)
+            if frame:
+                # Stand-in for the Python-side work of a WSGI write
+                sum(frame[::64])
+
+    threads = [threading.Thread(target=capture, daemon=True)]
+    threads += [threading.Thread(target=viewer, daemon=True) for _ in range(viewers)]
+    for t in threads:
+        t.start()
+
+
+def remote_video_load(server, web_port, viewers, stop):
+    def viewer():
+        with urllib.request.urlopen(f'http://{server}:{web_port}/video_feed') as response:
+            while not stop.is_set():
+                if not response.read(65536):
+                    break
+
+    for _ in range(viewers):
+        threading.Thread(target=viewer, daemon=True).start()
+
+
+async def play(url, rate, seconds):
+    sent = {}
+    async with connect(url, compression=None) as ws:
+        interval = 1.0 / rate
+        deadline = time.perf_counter()
+        seq = 0
+        stop_at = deadline + seconds
+        while time.perf_counter() < stop_at:
+            seq = (seq + 1) & 0xFFFF
+            sent[seq] = time.perf_counter()
+            await ws.send(PACKET.pack(1, seq, 8, 128, 128, 128, 128))
+            deadline += interval
+            await asyncio.sleep(max(0.0, deadline - time.perf_counter()))
+    return sent
+
+
+def percentile(values, pct):
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--server', help='host of a running server (default: in-process relay)')
+    parser.add_argument('--web-port', type=int, default=8801)
+    parser.add_argument('--relay-port', type=int, default=8802)
+    parser.add_argument('--pico-port', type=int, default=0, help='fake Pico UDP port (default: any free port)')
+    parser.add_argument('--viewers', type=int, default=4)
+    parser.add_argument('--rate', type=int, default=60)
+    parser.add_argument('--send-hz', type=int, default=1000, help='in-process relay send tick (0: send on arrival)')
+    parser.add_argument('--seconds', type=float, default=10.0)
+    args = parser.parse_args()
+
+    pico = FakePico(args.pico_port)
+    stop = threading.Event()
+    if args.server:
+        host = args.server
+        remote_video_load(host, args.web_port, args.viewers, stop)
+    else:
+        host = '127.0.0.1'
+        scheduler = InputScheduler(socket.socket(socket.AF_INET, socket.SOCK_DGRAM), ('127.0.0.1', pico.port), args.send_hz)
+        relay = InputRelay(scheduler, host=host, port=0)
+        relay.ready.wait()
+        args.relay_port = relay.port
+        local_video_load(args.viewers, stop)
+
+    time.sleep(1.0)
+    sent = asyncio.run(play(f'ws://{host}:{args.relay_port}', args.rate, args.seconds))
+    time.sleep(0.5)
+    stop.set()
+    pico.running = False
+
+    latencies = sorted((pico.arrivals[seq] - t) * 1000 for seq, t in sent.items() if seq in pico.arrivals)
+    lost = len(sent) - len(latencies)
+    if not latencies:
+        print(f'no packets reached the fake Pico ({len(sent)} sent)')
+        sys.exit(1)
+    print(f'{len(sent)} packets, {lost} lost, {args.viewers} video viewers')
+    print(f'browser->UDP latency ms: p50 {percentile(latencies, 50):.3f}  p95 {percentile(latencies, 95):.3f}  '
+          f'p99 {percentile(latencies, 99):.3f}  max {latencies[-1]:.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""Checks the video latency measurement end to end with a headless page.
+
+Starts `python -m remote_switch` on the synthetic clock pattern, whose
+frames carry the time they were grabbed as a strip of cells along the top,
+and does what a page measuring latency does: syncs to the server's clock
+over Socket.IO (clock_sync), reads /video_feed, decodes each part as it
+completes and reports capture, receive and "display" (decoded) times back
+(video_latency). Three things are checked:
+
+- each part's X-Capture-Time belongs to the picture inside it: it lies
+  between the clock drawn into the frame and a frame interval after it;
+- the latency the server aggregates on /metrics matches what this client
+  measured itself from the same frames, within --tolerance-ms; client and
+  server share a clock here, so the client needs no sync for its own figure
+  and any error in the synced offset shows up as the difference;
+- and, for reference, the latency from the picture's own clock, which is
+  what a camera filming the screen would see short of the display itself
+  (it includes the few ms the clock pattern takes to draw and encode).
+
+    python benchmarks/bench_latency.py --seconds 20 --profile high
+    python benchmarks/bench_latency.py --web-backend aiohttp
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+
+import cv2
+import numpy as np
+from websockets.asyncio.client import connect
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _common import free_port, metrics_text, percentile, server_log, start_server, stop
+from remote_switch.capture import clock_age, read_clock
+
+LATENCY = re.compile(r'^remote_switch_video_latency_ms\{client="(\d+)",stage="(\w+)",quantile="([\d.]+)"\} (\S+)$')
+JITTER = re.compile(r'^remote_switch_video_jitter_ms\{client="(\d+)"\} (\S+)$')
+# Round trips per clock sync; the fastest gives the offset
+SYNC_PINGS = 5
+
+
+def now_ms():
+    return time.time() * 1000
+
+
+def scrape_latency(port):
+    """Returns ({(stage, quantile): ms}, jitter ms) from /metrics for the first measuring client."""
+    latency = {}
+    jitter = None
+    for line in metrics_text(port).splitlines():
+        match = LATENCY.match(line)
+        if match and match.group(1) == '1':
+            latency[match.group(2), float(match.group(3))] = float(match.group(4))
+        match = JITTER.match(line)
+        if match and match.group(1) == '1':
+            jitter = float(match.group(2))
+    return latency, jitter
+
+
+class SocketIOClient:
+    """Just enough Socket.IO (Engine.IO v4 over a WebSocket) for clock_sync and video_latency."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.ack_id = 0
+        self.acks = {}
+        self.offset = 0.0
+
+    @classmethod
+    async def open(cls, port):
+        ws = await connect(f'ws://127.0.0.1:{port}/socket.io/?EIO=4&transport=websocket', compression=None)
+        await ws.recv()
+        await ws.send('40')
+        while not (await ws.recv()).startswith('40'):
+            pass
+        client = cls(ws)
+        client.reader = asyncio.create_task(client.read())
+        return client
+
+    async def read(self):
+        async for message in self.ws:
+            if message == '2':
+                await self.ws.send('3')
+            elif isinstance(message, str) and message.startswith('43'):
+                ack_id, data = re.match(r'43(\d+)(.*)', message).groups()
+                self.acks.pop(int(ack_id)).set_result(json.loads(data))
+
+    async def call(self, event):
+        self.ack_id += 1
+        self.acks[self.ack_id] = future = asyncio.get_running_loop().create_future()
+        await self.ws.send(f'42{self.ack_id}' + json.dumps([event]))
+        return (await future)[0]
+
+    async def emit(self, event, data):
+        await self.ws.send('42' + json.dumps([event, data]))
+
+    async def sync_clock(self):
+        # As the page does: the server read its clock about halfway through the round trip
+        best = None
+        for _ in range(SYNC_PINGS):
+            sent = now_ms()
+            server_ms = await self.call('clock_sync')
+            received = now_ms()
+            if best is None or received - sent < best[0]:
+                best = (received - sent, server_ms - (sent + received) / 2)
+        self.offset = best[1]
+
+    async def close(self):
+        self.reader.cancel()
+        await self.ws.close()
+
+
+class Watcher:
+    def __init__(self):
+        # (frame, capture ms, receive ms, display ms) on the server's clock, not yet reported
+        self.samples = []
+        # Every frame: header capture time minus the picture's clock, and display minus either,
+        # on this machine's clock
+        self.stamp_errors = []
+        self.display = []
+        self.picture_display = []
+
+    async def watch(self, port, profile, sio):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(f'GET /video_feed?profile={profile} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n'.encode())
+        # Flask's server sends the stream in chunks, aiohttp as it is
+        chunked = b'chunked' in (await reader.readuntil(b'\r\n\r\n')).lower()
+        buf = bytearray()
+        try:
+            while True:
+                if chunked:
+                    size = int(await reader.readuntil(b'\r\n'), 16)
+                    data = (await reader.readexactly(size + 2))[:-2]
+                else:
+                    data = await reader.read(1 << 16)
+                if not data:
+                    break
+                received = now_ms()
+                buf += data
+                while part := next_part(buf):
+                    fields, jpeg = part
+                    self.frame(fields, jpeg, received, sio.offset)
+        finally:
+            writer.close()
+
+    def frame(self, fields, jpeg, received, offset):
+        image = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_GRAYSCALE)
+        displayed = now_ms()
+        frame, captured = int(fields[b'X-Frame']), float(fields[b'X-Capture-Time'])
+        clock = read_clock(image)
+        self.stamp_errors.append(captured - (displayed - clock_age(clock, displayed)))
+        self.display.append(displayed - captured)
+        self.picture_display.append(clock_age(clock, displayed))
+        self.samples.append([frame, captured, received + offset, displayed + offset])
+
+
+def next_part(buf):
+    """Takes the first complete part off buf: (headers, JPEG), or None until there is one."""
+    header_end = buf.find(b'\r\n\r\n')
+    if header_end < 0:
+        return None
+    fields = dict(line.split(b': ', 1) for line in bytes(buf[:header_end]).split(b'\r\n')[1:])
+    start = header_end + 4
+    end = start + int(fields[b'Content-Length'])
+    if len(buf) < end + 2:
+        return None
+    jpeg = bytes(buf[start:end])
+    del buf[:end + 2]
+    return fields, jpeg
+
+
+async def measure(args, port):
+    loop = asyncio.get_running_loop()
+    sio = await SocketIOClient.open(port)
+    await sio.sync_clock()
+    watcher = Watcher()
+    watch = asyncio.create_task(watcher.watch(port, args.profile, sio))
+    began = time.perf_counter()
+    while time.perf_counter() - began < args.seconds:
+        await asyncio.sleep(1.0)
+        if watch.done():
+            watch.result()
+        await sio.sync_clock()
+        samples, watcher.samples = watcher.samples, []
+        await sio.emit('video_latency', samples)
+    watch.cancel()
+    await asyncio.gather(watch, return_exceptions=True)
+    # Let the last report land before reading /metrics
+    await asyncio.sleep(0.2)
+    server, jitter = await loop.run_in_executor(None, scrape_latency, port)
+    await sio.close()
+    return watcher, server, jitter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--profile', default='medium', help='rendition to watch')
+    parser.add_argument('--web-backend', default='flask', help='flask or aiohttp')
+    parser.add_argument('--capture-fps', type=float, default=60.0, help="the server's, for the stamp check")
+    parser.add_argument('--tolerance-ms', type=float, default=2.0,
+                        help='how far the server p50 may be from the client p50')
+    args = parser.parse_args()
+
+    port = free_port()
+    log = server_log()
+    server = start_server(port, log, '--input-port', '0', '--synthetic-pattern', 'clock',
+                          '--web-backend', args.web_backend)
+    try:
+        watcher, server_latency, jitter = asyncio.run(measure(args, port))
+    finally:
+        stop([server])
+
+    frames = len(watcher.display)
+    if not frames or not server_latency:
+        print(f'no frames measured ({frames} read), see {log.name}')
+        sys.exit(1)
+    interval = 1000 / args.capture_fps
+    errors = watcher.stamp_errors
+    stamps_ok = percentile(errors, 0.01) >= -1 and percentile(errors, 0.99) <= interval
+    # The server keeps a window of the most recent samples
+    recent = watcher.display[-1024:]
+    gap = server_latency['display', 0.5] - percentile(recent, 0.5)
+    server_ok = abs(gap) <= args.tolerance_ms
+    quantiles = lambda values: '  '.join(f'p{q * 100:.0f} {percentile(values, q):6.1f}' for q in (0.5, 0.95, 0.99))
+    print(f'{frames} frames of {args.profile}, {frames / args.seconds:.1f} fps\n')
+    print(f'X-Capture-Time after the picture\'s clock  {quantiles(errors)} ms   '
+          f'(0 to {interval:.1f}): {"PASS" if stamps_ok else "FAIL"}')
+    print(f'capture to display, this client          {quantiles(recent)} ms')
+    print(f'capture to display, server /metrics      '
+          + '  '.join(f'p{q * 100:.0f} {server_latency["display", q]:6.1f}' for q in (0.5, 0.95, 0.99))
+          + f' ms   (p50 off by {gap:+.1f}): {"PASS" if server_ok else "FAIL"}')
+    print(f'capture to receive, server /metrics      '
+          + '  '.join(f'p{q * 100:.0f} {server_latency["receive", q]:6.1f}' for q in (0.5, 0.95, 0.99)) + ' ms')
+    print(f'jitter, server /metrics                  {jitter:.1f} ms')
+    print(f'picture\'s clock to display              {quantiles(watcher.picture_display)} ms')
+    sys.exit(0 if stamps_ok and server_ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Time to first frame for cold and warm starts of LazyCapture.
+
+A viewer subscribes, waits for the first encoded frame on the hub, then
+leaves; the next viewer arrives after the grace period has run out. The
+first start opens the device (cold), later ones resume the idle device
+(warm). Also reports the CPU the capture thread burns while idle.
+
+Without --device a simulated camera is used: opening costs --open-ms and
+frames arrive at --fps, with the driver queueing a few while nobody reads.
+
+    python benchmarks/bench_lazy_capture.py --open-ms 800 --rounds 5
+    python benchmarks/bench_lazy_capture.py --device 0
+"""
+import argparse
+import collections
+import os
+import statistics
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from remote_switch.encoder_pool import encode_renditions
+from remote_switch.frame_hub import FrameHub
+from remote_switch.lazy_capture import LazyCapture
+
+RENDITION = ('medium', 512, 288, 25)
+
+
+class SimulatedCamera:
+    """Frames on a fixed clock; up to `queue` of them wait in the driver unread."""
+
+    def __init__(self, fps, open_ms, queue=4):
+        time.sleep(open_ms / 1000)
+        self.interval = 1.0 / fps
+        self.queue = queue
+        self.epoch = time.perf_counter()
+        self.next_index = 0
+        self.frame = np.zeros((720, 1280, 3), np.uint8)
+
+    def grab(self):
+        now = time.perf_counter()
+        latest = int((now - self.epoch) / self.interval)
+        # Frames older than the queue were dropped by the driver
+        self.next_index = max(self.next_index, latest - self.queue + 1)
+        if self.next_index > latest:
+            time.sleep(self.epoch + self.next_index * self.interval - now)
+        self.next_index += 1
+        return True
+
+    def retrieve(self):
+        return True, self.frame
+
+    def read(self):
+        self.grab()
+        return self.retrieve()
+
+    def release(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--device', help='cv2.VideoCapture index or path instead of the simulated camera')
+    parser.add_argument('--fps', type=int, default=60)
+    parser.add_argument('--open-ms', type=float, default=800.0, help='simulated device open time')
+    parser.add_argument('--grace', type=float, default=0.5)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.device is not None:
+        src = int(args.device) if args.device.isdigit() else args.device
+        open_device = lambda: cv2.VideoCapture(src)
+    else:
+        open_device = lambda: SimulatedCamera(args.fps, args.open_ms)
+
+    starts = collections.defaultdict(list)
+    capture = LazyCapture(open_device, args.grace, args.fps, lambda kind, s: starts[kind].append(s))
+    hub = FrameHub()
+
+    def update():
+        while True:
+            ret, frame = capture.read()
+            if ret and capture.viewers:
+                for name, part, _ in encode_renditions(frame, [RENDITION]):
+                    hub.publish(part)
+
+    threading.Thread(target=update, daemon=True).start()
+
+    first_frame = collections.defaultdict(list)
+    for i in range(args.rounds + 1):
+        kind = 'cold' if i == 0 else 'warm'
+        started = time.perf_counter()
+        capture.acquire()
+        seq, frame = hub.seq, None
+        while frame is None:
+            seq, frame = hub.wait_for(seq, timeout=5.0)
+        first_frame[kind].append(time.perf_counter() - started)
+        capture.release()
+        # Let the grace period run out so the next viewer finds the device idle
+        time.sleep(args.grace + 0.1)
+        cpu = time.process_time()
+        time.sleep(0.5)
+        idle_cpu = (time.process_time() - cpu) / 0.5 * 100
+
+    for kind in ('cold', 'warm'):
+        grabbed = starts[kind]
+        shown = first_frame[kind]
+        print(f'{kind}: {len(shown)} start(s) | first captured frame {statistics.median(grabbed) * 1000:7.1f} ms'
+              f' | first encoded frame {statistics.median(shown) * 1000:7.1f} ms (median)')
+    print(f'idle CPU while nobody watches: {idle_cpu:.1f}% of a core')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""End-to-end load test: the real server on synthetic sources, N viewers and M gamepads.
+
+Starts `python -m remote_switch` on the synthetic video and audio backends,
+pointed at a fake Pico that timestamps every UDP packet. Viewers are then
+added in stages (--viewers 1,2,4,8 keeps the earlier ones connected); each
+one reads /video_feed and, unless --audio none, subscribes to the audio
+channel over Socket.IO. Gamepads send an input message at --rate Hz to the
+input relay the whole time, with a gamepad id in LX and a sequence number in
+the buttons field so each arrival at the fake Pico is matched to its send.
+Gamepads take turns at player 1 and 2; with more than two, those sharing a
+player within one send tick are coalesced by the server, so fewer arrive.
+
+Per stage it reports delivered fps per viewer, audio packet rate, input to
+UDP latency percentiles, server CPU per component (from /metrics, see
+remote_switch_cpu_seconds) and resident memory. A stage where the median
+viewer drops below --min-fps or input p99 goes above --max-latency-ms is
+the scaling limit. Everything runs on this machine, so the harness's own
+CPU is printed too: if it nears a full core the client is the bottleneck.
+
+With --fanout N the server publishes on a spectator relay and N fan-out
+processes (python -m remote_switch.fanout) serve the viewers, spread evenly
+between them, while the gamepads stay on the server; compare the input
+latency and server CPU with a run without it.
+
+On one core with --web-backend aiohttp, viewers held about 55 fps each up
+to 75 viewers, with audio, on 10 server threads. With 100 viewers over
+--fanout 2, input p99 stayed near 10 ms (15-20 ms serving them directly)
+while spectators dropped to 20-30 fps.
+
+    python benchmarks/bench_load.py --viewers 1,2,4,8,16 --gamepads 2
+    python benchmarks/bench_load.py --viewers 2,4 --profile high --size 1920x1080 --audio pcm
+    python benchmarks/bench_load.py --viewers 10,25,50 --web-backend aiohttp
+    python benchmarks/bench_load.py --viewers 10,25,50 --web-backend aiohttp --fanout 2
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from websockets.asyncio.client import connect
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _common import by_label, free_port, launch, percentile, scrape, server_log, start_server, stop
+from remote_switch.frame_hub import FRAME_BOUNDARY
+from remote_switch.input_protocol import PACKET, PLAYERS, TRAILER, unpack_datagram
+
+
+class FakePico(asyncio.DatagramProtocol):
+    """Timestamps every input packet, keyed by (gamepad, seq)."""
+
+    def __init__(self):
+        self.arrivals = {}
+
+    def datagram_received(self, data, addr):
+        now = time.perf_counter()
+        # Legacy packets or batches; a batch repeats recent states, so keep the first arrival
+        for packet in (unpack_datagram(data) or (None, []))[1]:
+            _, seq, _, gamepad, _, _, _ = PACKET.unpack(packet)
+            self.arrivals.setdefault((gamepad, seq), now)
+
+
+class Viewer:
+    """Counts multipart parts on one /video_feed connection, plus its audio packets."""
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+        self.audio_packets = 0
+        self.audio_gap = 0.0
+        self.last_audio = None
+
+    async def watch(self, port, profile):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(f'GET /video_feed?profile={profile} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n'.encode())
+        # Keep enough of the last chunk to catch a part header split across reads
+        tail = b''
+        try:
+            while chunk := await reader.read(1 << 16):
+                data = tail + chunk
+                self.frames += data.count(FRAME_BOUNDARY)
+                self.bytes += len(chunk)
+                tail = data[-(len(FRAME_BOUNDARY) - 1):]
+        finally:
+            writer.close()
+
+    async def listen(self, port, codec):
+        # Engine.IO v4 over a plain WebSocket: open, connect, then one binary message per packet
+        async with connect(f'ws://127.0.0.1:{port}/socket.io/?EIO=4&transport=websocket', compression=None) as ws:
+            await ws.recv()
+            await ws.send('40')
+            await ws.send(f'42["audio_subscribe","{codec}"]')
+            async for message in ws:
+                if isinstance(message, bytes):
+                    now = time.perf_counter()
+                    if self.last_audio is not None:
+                        self.audio_gap = max(self.audio_gap, now - self.last_audio)
+                    self.last_audio = now
+                    self.audio_packets += 1
+                elif message == '2':
+                    await ws.send('3')
+
+
+class Gamepad:
+    def __init__(self, index):
+        self.index = index
+        self.player = PLAYERS[index % len(PLAYERS)]
+        self.sent = {}
+
+    async def play(self, port, rate):
+        for _ in range(50):
+            try:
+                ws = await connect(f'ws://127.0.0.1:{port}', compression=None)
+                break
+            except OSError:
+                await asyncio.sleep(0.1)
+        else:
+            raise RuntimeError(f'input relay on port {port} never came up')
+        seq = 0
+        next_time = time.perf_counter()
+        async with ws:
+            while True:
+                seq = (seq + 1) & 0xFFFF
+                packet = PACKET.pack(self.player, seq, 8, self.index, 128, 128, 128)
+                self.sent[self.index, seq] = time.perf_counter()
+                await ws.send(packet + TRAILER.pack(seq, time.time() * 1000))
+                next_time += 1.0 / rate
+                await asyncio.sleep(max(0.0, next_time - time.perf_counter()))
+
+
+def start_processes(args, port, input_port, pico_port, relay, log):
+    options = ['--input-port', str(input_port), '--pico-port', str(pico_port),
+               '--synthetic-pattern', args.pattern, '--source-size', args.size, '--capture-fps', str(args.fps),
+               '--web-backend', args.web_backend]
+    if relay:
+        options += ['--relay-address', relay]
+    processes = [start_server(port, log, *options)]
+    try:
+        for fanout_port in args.fanout_ports:
+            processes.append(launch(['remote_switch.fanout', '--relay', relay, '--host', '127.0.0.1',
+                                     '--port', str(fanout_port)], fanout_port, log))
+    except RuntimeError:
+        for process in processes:
+            process.kill()
+        raise
+    return processes
+
+
+async def run_stages(args, port, input_port, pico):
+    loop = asyncio.get_running_loop()
+    tasks = []
+    gamepads = [Gamepad(i) for i in range(args.gamepads)]
+    for pad in gamepads:
+        tasks.append(asyncio.create_task(pad.play(input_port, args.rate)))
+    viewers = []
+    memory = []
+    limit = None
+    # Viewers go to the fan-out processes when there are any
+    viewer_ports = args.fanout_ports or [port]
+
+    for count in (int(n) for n in args.viewers.split(',')):
+        while len(viewers) < count:
+            viewer = Viewer()
+            viewer_port = viewer_ports[len(viewers) % len(viewer_ports)]
+            viewers.append(viewer)
+            tasks.append(asyncio.create_task(viewer.watch(viewer_port, args.profile)))
+            if args.audio != 'none':
+                tasks.append(asyncio.create_task(viewer.listen(viewer_port, args.audio)))
+        await asyncio.sleep(args.warmup)
+        for task in tasks:
+            if task.done() and task.exception():
+                raise task.exception()
+
+        frames = [v.frames for v in viewers]
+        received = sum(v.bytes for v in viewers)
+        audio = [v.audio_packets for v in viewers]
+        for v in viewers:
+            v.audio_gap = 0.0
+        for pad in gamepads:
+            pad.sent.clear()
+        pico.arrivals.clear()
+        before = await loop.run_in_executor(None, scrape, port)
+        fanouts_before = [await loop.run_in_executor(None, scrape, p) for p in args.fanout_ports]
+        cpu = time.process_time()
+        began = time.perf_counter()
+        rss = []
+        while time.perf_counter() - began < args.seconds:
+            await asyncio.sleep(1.0)
+            samples = await loop.run_in_executor(None, scrape, port)
+            total = sum(by_label(samples, 'remote_switch_memory_rss_bytes').values())
+            rss.append((time.perf_counter(), total))
+        elapsed = time.perf_counter() - began
+        cpu = time.process_time() - cpu
+        after = samples
+        fanouts_after = [await loop.run_in_executor(None, scrape, p) for p in args.fanout_ports]
+        memory += rss
+
+        fps = sorted((v.frames - f) / elapsed for v, f in zip(viewers, frames))
+        median_fps = statistics.median(fps)
+        print(f'\n--- {count} viewer(s), {args.gamepads} gamepad(s), {elapsed:.1f}s ---')
+        print(f'video fps per viewer: min {fps[0]:.1f}  median {median_fps:.1f}  max {fps[-1]:.1f}'
+              f'  ({(sum(v.bytes for v in viewers) - received) * 8 / elapsed / 1e6:.0f} Mbit/s in total)')
+        if args.audio != 'none':
+            rates = [(v.audio_packets - a) / elapsed for v, a in zip(viewers, audio)]
+            print(f'audio packets/s per listener: min {min(rates):.1f}  median {statistics.median(rates):.1f}'
+                  f'  worst gap {max(v.audio_gap for v in viewers) * 1000:.0f} ms')
+
+        latencies = []
+        sent = 0
+        for pad in gamepads:
+            for key, t in list(pad.sent.items()):
+                if pico.arrivals.get(key, 0) >= t:
+                    latencies.append((pico.arrivals[key] - t) * 1000)
+            sent += len(pad.sent)
+        p99 = None
+        if latencies:
+            p99 = percentile(latencies, 0.99)
+            print(f'input -> UDP ms: p50 {percentile(latencies, 0.5):.2f}  p95 {percentile(latencies, 0.95):.2f}'
+                  f'  p99 {p99:.2f}  max {max(latencies):.2f}  ({len(latencies)}/{sent} arrived)')
+
+        cpu_before = by_label(before, 'remote_switch_cpu_seconds')
+        cpu_after = by_label(after, 'remote_switch_cpu_seconds')
+        usage = {c: (s - cpu_before.get(c, 0.0)) / elapsed * 100 for c, s in cpu_after.items()}
+        if usage:
+            parts = [f'{c} {u:.0f}' for c, u in sorted(usage.items(), key=lambda item: -item[1]) if c != 'all']
+            print(f'server CPU % of a core: {"  ".join(parts)}  |  main process {usage.get("all", 0):.0f}')
+        if fanouts_after:
+            usage = [(by_label(a, 'remote_switch_cpu_seconds').get('all', 0.0)
+                      - by_label(b, 'remote_switch_cpu_seconds').get('all', 0.0)) / elapsed * 100
+                     for b, a in zip(fanouts_before, fanouts_after)]
+            print(f'fan-out CPU % of a core: {"  ".join(f"{u:.0f}" for u in usage)}  |  total {sum(usage):.0f}')
+        threads = by_label(after, 'remote_switch_threads')
+        if threads:
+            print(f'server threads: {sum(threads.values()):.0f} ({threads.get("web", 0):.0f} web)')
+        print(f'harness CPU: {cpu / elapsed * 100:.0f}% of a core')
+        if rss:
+            print(f'server RSS: {rss[-1][1] / 1e6:.1f} MB (stage change {(rss[-1][1] - rss[0][1]) / 1e6:+.1f} MB)')
+
+        if limit is None and (median_fps < args.min_fps or (p99 is not None and p99 > args.max_latency_ms)):
+            limit = count
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return limit, memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--viewers', default='1,2,4,8', help='viewer counts, one stage each')
+    parser.add_argument('--gamepads', type=int, default=2)
+    parser.add_argument('--rate', type=float, default=60.0, help='input messages per second per gamepad')
+    parser.add_argument('--profile', default='medium', help='rendition the viewers watch')
+    parser.add_argument('--web-backend', default='flask', help='flask or aiohttp')
+    parser.add_argument('--fanout', type=int, default=0, help='spectator fan-out processes serving the viewers')
+    parser.add_argument('--audio', default='opus', choices=('opus', 'pcm', 'none'), help='codec each viewer listens to')
+    parser.add_argument('--pattern', default='scroll', help='synthetic pattern: scroll, still or noise')
+    parser.add_argument('--size', default='1280x720', help='synthetic source size')
+    parser.add_argument('--fps', type=int, default=60, help='capture frame rate')
+    parser.add_argument('--seconds', type=float, default=10.0, help='measured time per stage')
+    parser.add_argument('--warmup', type=float, default=2.0, help='unmeasured time after adding viewers')
+    parser.add_argument('--min-fps', type=float, default=54.0, help='median viewer fps below this is over the limit')
+    parser.add_argument('--max-latency-ms', type=float, default=16.7, help='input p99 above this is over the limit')
+    args = parser.parse_args()
+
+    port, input_port = free_port(), free_port()
+    args.fanout_ports = [free_port() for _ in range(args.fanout)]
+    log = server_log()
+    relay = os.path.join(tempfile.mkdtemp(prefix='remote-switch-'), 'relay.sock') if args.fanout else None
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        transport, pico = await loop.create_datagram_endpoint(FakePico, local_addr=('127.0.0.1', 0))
+        pico_port = transport.get_extra_info('sockname')[1]
+        processes = await loop.run_in_executor(None, start_processes, args, port, input_port, pico_port, relay, log)
+        try:
+            return await run_stages(args, port, input_port, pico)
+        finally:
+            stop(processes)
+            transport.close()
+
+    limit, memory = asyncio.run(run())
+    print()
+    if len(memory) > 2:
+        # Least-squares slope over every sample of the run
+        slope = statistics.linear_regression([s[0] for s in memory], [s[1] for s in memory]).slope
+        print(f'server RSS {memory[0][1] / 1e6:.1f} -> {memory[-1][1] / 1e6:.1f} MB, trend {slope * 60 / 1e6:+.2f} MB/min')
+    print(f'scaling limit: {limit} viewers' if limit else 'scaling limit: not reached')
+
+
+if __name__ == '__main__':
+    main()
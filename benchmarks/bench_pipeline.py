@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Capture-to-viewer throughput of the real VideoStreamer/AudioStreamer, no hardware needed.
+
+Runs the pipelines against a synthetic pattern or a looped video file and
+a synthetic tone or WAV file, with in-process viewers pulling each
+rendition as fast as they can. Reports capture and delivered fps, frames
+skipped as unchanged, frames the encoder pool dropped, audio packet rate
+and process CPU. The source digest identifies the exact input, so two
+runs (or two commits) can be compared like for like.
+
+    python benchmarks/bench_pipeline.py --pattern scroll --viewers 2 --seconds 10
+    python benchmarks/bench_pipeline.py --video clip.mp4 --wav music.wav --profiles high
+"""
+import argparse
+import hashlib
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from remote_switch.audio import AudioStreamer
+from remote_switch.capture import LoopedCamera, file_frames, synthetic_frames
+from remote_switch.config import Config
+from remote_switch.video import VideoStreamer
+
+
+class CountingEmitter:
+    """Stands in for Socket.IO: counts what AudioStreamer would emit."""
+
+    def __init__(self):
+        self.packets = {}
+        self.bytes = {}
+
+    def emit(self, event, data, to=None):
+        self.packets[event] = self.packets.get(event, 0) + 1
+        self.bytes[event] = self.bytes.get(event, 0) + len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pattern', default='scroll', help='synthetic pattern: scroll, still or noise')
+    parser.add_argument('--video', help='video file to loop instead of the synthetic pattern')
+    parser.add_argument('--wav', help='WAV file to loop instead of the synthetic tone')
+    parser.add_argument('--size', default='1280x720')
+    parser.add_argument('--fps', type=int, default=60)
+    parser.add_argument('--rate', type=int, default=48000)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--raw', action='store_true', help='hand the pipeline decoded frames instead of MJPEG')
+    parser.add_argument('--profiles', default='low,medium,high', help='renditions to watch')
+    parser.add_argument('--viewers', type=int, default=1, help='viewers per rendition')
+    parser.add_argument('--seconds', type=float, default=10.0)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split('x'))
+    config = Config(capture_fps=args.fps, source_size=(width, height), encode_workers=args.workers,
+                    mjpeg_passthrough=not args.raw, audio_rate=args.rate, capture_grace=0.0,
+                    audio_backend='wav' if args.wav else 'synthetic', audio_file=args.wav)
+
+    started = time.perf_counter()
+    if args.video:
+        frames = file_frames(args.video, (width, height), config.source_loop_frames)
+    else:
+        frames = synthetic_frames(width, height, args.pattern, config.source_loop_frames)
+    digest = hashlib.sha1(b''.join(f.tobytes() for f in frames)).hexdigest()[:12]
+    print(f'source: {args.video or args.pattern} {width}x{height}@{args.fps}, {len(frames)} frames, '
+          f'digest {digest}, prepared in {time.perf_counter() - started:.2f}s')
+
+    streamer = VideoStreamer(config, lambda: LoopedCamera(frames, args.fps, config.mjpeg_passthrough))
+    try:
+        emitter = CountingEmitter()
+        audio = AudioStreamer(emitter, config)
+        audio.subscribe('bench', 'opus' if audio.opus else 'pcm')
+
+        stop = threading.Event()
+        delivered = {}
+
+        def viewer(key, profile):
+            count = 0
+            frames_out = streamer.generate_frames(profile)
+            for _ in frames_out:
+                count += 1
+                delivered[key] = count
+                if stop.is_set():
+                    break
+            frames_out.close()
+
+        names = args.profiles.split(',')
+        threads = [threading.Thread(target=viewer, args=((name, i), name), daemon=True)
+                   for name in names for i in range(args.viewers)]
+        for t in threads:
+            t.start()
+        # Let the first frames through before measuring
+        time.sleep(1.0)
+        base_delivered = dict(delivered)
+        base_stats = streamer.stats()
+        base_audio = dict(emitter.packets)
+        base_dropped = streamer.pool.dropped if streamer.pool else 0
+        cpu = time.process_time()
+        began = time.perf_counter()
+        time.sleep(args.seconds)
+        elapsed = time.perf_counter() - began
+        cpu = time.process_time() - cpu
+        stats = streamer.stats()
+        stop.set()
+
+        captured = stats['frames'] - base_stats['frames']
+        skipped = stats['skipped'] - base_stats['skipped']
+        print(f'capture {captured / elapsed:5.1f} fps, {skipped} skipped as unchanged, '
+              f'{(streamer.pool.dropped if streamer.pool else 0) - base_dropped} dropped by the encoder pool')
+        for name in names:
+            rates = [(delivered.get((name, i), 0) - base_delivered.get((name, i), 0)) / elapsed
+                     for i in range(args.viewers)]
+            print(f'{name:>8}: delivered fps per viewer ' + ' '.join(f'{r:5.1f}' for r in rates))
+        for event, count in emitter.packets.items():
+            print(f'audio {event}: {(count - base_audio.get(event, 0)) / elapsed:5.1f} packets/s')
+        print(f'CPU: {cpu / elapsed * 100:.0f}% of a core in this process'
+              + (f' (+{args.workers} encoder processes)' if args.workers else ''))
+    finally:
+        streamer.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""Soak test for the per-client send queues: a healthy and a throttled client for minutes.
+
+Starts `python -m remote_switch` on the synthetic sources and connects two
+clients, each reading /video_feed and listening to audio over Socket.IO.
+The healthy one reads everything as it comes. The throttled one is a slow
+link: it reads both through small receive buffers at --kbps between them,
+less than the stream needs, and stops reading for --stall seconds of every
+--period. Each period
+prints the server's resident memory, what waits in and was dropped from its
+send queues, and the age of the audio each client got (the capture time in
+the packet header against arrival, on the same clock).
+
+A link that slow can never get its audio live: what sits in the buffers
+along the way (the server's queue, both kernels, the client's) drains at
+the link's pace. But with the queue bounded that backlog stops growing, so
+the checks are the trends of server memory and of the throttled client's
+audio age over the run. Run once with --audio-queue-packets 0 to see the
+unbounded Engine.IO queue this replaces; exits 1 if either check fails.
+On a 2 Mbit/s link that run's audio delay grew by about 50 s per minute,
+while with the queues it stayed under 8 s.
+
+    python benchmarks/bench_send_queues.py --minutes 5 --web-backend aiohttp
+    python benchmarks/bench_send_queues.py --minutes 2 --audio-queue-packets 0
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import time
+
+from websockets.asyncio.client import connect
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _common import free_port, percentile, scrape, server_log, start_server, stop, total
+from remote_switch.audio_ring import PACKET_HEADER
+from remote_switch.frame_hub import FRAME_BOUNDARY
+
+# The throttled client's receive buffers, so a stall reaches the server quickly
+THROTTLED_RCVBUF = 16 * 1024
+
+
+def trend(points):
+    """Slope of [(time, value)] per second."""
+    if len(points) < 2:
+        return 0.0
+    return statistics.linear_regression([t for t, _ in points], [v for _, v in points]).slope
+
+
+class Throttle:
+    """Reads allowed at kbps, except during the first `stall` seconds of every period."""
+
+    def __init__(self, kbps, stall, period):
+        self.rate = kbps * 1000 / 8 if kbps else None
+        self.stall = stall
+        self.period = period
+        self.started = time.perf_counter()
+        self.budget_time = self.started
+
+    def stalled(self):
+        return self.stall and (time.perf_counter() - self.started) % self.period < self.stall
+
+    async def take(self, size):
+        while self.stalled():
+            await asyncio.sleep(0.05)
+        if self.rate:
+            self.budget_time = max(self.budget_time, time.perf_counter()) + size / self.rate
+            await asyncio.sleep(max(0.0, self.budget_time - time.perf_counter()))
+
+
+def client_socket(port, rcvbuf):
+    sock = socket.socket()
+    if rcvbuf:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    sock.connect(('127.0.0.1', port))
+    sock.setblocking(False)
+    return sock
+
+
+class Client:
+    def __init__(self, name, throttle=None):
+        self.name = name
+        # Shared by video and audio, like one link
+        self.throttle = throttle
+        self.rcvbuf = THROTTLED_RCVBUF if throttle else None
+        self.frames = 0
+        # Audio packet ages in ms since the last report
+        self.ages = []
+
+    async def watch(self, port, profile):
+        chunk_size = self.rcvbuf or 1 << 16
+        reader, writer = await asyncio.open_connection(sock=client_socket(port, self.rcvbuf), limit=chunk_size)
+        writer.write(f'GET /video_feed?profile={profile} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n'.encode())
+        tail = b''
+        try:
+            while True:
+                if self.throttle:
+                    await self.throttle.take(chunk_size)
+                chunk = await reader.read(chunk_size)
+                if not chunk:
+                    break
+                data = tail + chunk
+                self.frames += data.count(FRAME_BOUNDARY)
+                tail = data[-(len(FRAME_BOUNDARY) - 1):]
+        finally:
+            writer.close()
+
+    async def listen(self, port, codec):
+        # Engine.IO v4 over a plain WebSocket: open, connect, then one binary message per packet
+        async with connect(f'ws://127.0.0.1:{port}/socket.io/?EIO=4&transport=websocket',
+                           sock=client_socket(port, self.rcvbuf), compression=None, max_queue=4,
+                           ping_interval=None) as ws:
+            await ws.recv()
+            await ws.send('40')
+            await ws.send(f'42["audio_subscribe","{codec}"]')
+            while True:
+                message = await ws.recv()
+                if isinstance(message, bytes):
+                    _, captured_ms = PACKET_HEADER.unpack_from(message)
+                    self.ages.append(time.time() * 1000 - captured_ms)
+                    if self.throttle:
+                        await self.throttle.take(len(message))
+                elif message == '2':
+                    await ws.send('3')
+
+    def report(self, elapsed):
+        ages, self.ages = self.ages, []
+        frames, self.frames = self.frames, 0
+        return frames / elapsed, ages
+
+
+async def soak(args, port):
+    loop = asyncio.get_running_loop()
+    healthy = Client('healthy')
+    throttled = Client('throttled', Throttle(args.kbps, args.stall, args.period))
+    tasks = []
+    for client in (healthy, throttled):
+        tasks.append(asyncio.create_task(client.watch(port, args.profile)))
+        tasks.append(asyncio.create_task(client.listen(port, args.audio)))
+    # Let both settle before measuring
+    await asyncio.sleep(args.period)
+    healthy.report(1)
+    throttled.report(1)
+    memory = []
+    # (time, median age) per period
+    throttled_ages = []
+    began = time.perf_counter()
+    last = began
+    while time.perf_counter() - began < args.minutes * 60:
+        await asyncio.sleep(args.period)
+        for task in tasks:
+            if task.done() and task.exception():
+                raise task.exception()
+        now = time.perf_counter()
+        samples = await loop.run_in_executor(None, scrape, port)
+        rss = samples.get(('remote_switch_memory_rss_bytes', 'server'), 0.0)
+        memory.append((now, rss))
+        healthy_fps, healthy_ages = healthy.report(now - last)
+        throttled_fps, ages = throttled.report(now - last)
+        throttled_ages.append((now, percentile(ages, 0.5)))
+        last = now
+        print(f'{now - began:5.0f}s  RSS {rss / 1e6:6.1f} MB  '
+              f'queued {total(samples, "remote_switch_send_queued_messages"):3.0f}  '
+              f'dropped audio {total(samples, "remote_switch_send_dropped_total"):5.0f} '
+              f'video {total(samples, "remote_switch_video_dropped_total"):6.0f}  |  '
+              f'audio age healthy p50 {percentile(healthy_ages, 0.5):4.0f} max {max(healthy_ages, default=0):5.0f} ms, '
+              f'throttled p50 {percentile(ages, 0.5):5.0f} max {max(ages, default=0):6.0f} ms  |  '
+              f'fps {healthy_fps:4.1f} / {throttled_fps:4.1f}')
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return memory, throttled_ages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--minutes', type=float, default=3.0)
+    parser.add_argument('--period', type=float, default=10.0, help='seconds per stall cycle and report line')
+    parser.add_argument('--stall', type=float, default=5.0, help='seconds of each period the throttled client reads nothing')
+    parser.add_argument('--kbps', type=float, default=2000.0, help="throttled client's read rate for video and audio together")
+    parser.add_argument('--profile', default='medium', help='rendition both clients watch')
+    parser.add_argument('--audio', default='pcm', choices=('pcm', 'opus'), help='codec both clients listen to')
+    parser.add_argument('--web-backend', default='flask', help='flask or aiohttp')
+    parser.add_argument('--audio-queue-packets', type=int, default=10, help='server setting; 0 for no limit')
+    parser.add_argument('--video-queue-frames', type=int, default=1, help='server setting')
+    parser.add_argument('--max-growth', type=float, default=2.0, help='MB/min of server RSS growth that fails')
+    parser.add_argument('--max-age-growth', type=float, default=5000.0,
+                        help="ms/min of growth in the throttled client's audio age that fails")
+    args = parser.parse_args()
+
+    port = free_port()
+    server = start_server(port, server_log(), '--input-port', '0', '--web-backend', args.web_backend,
+                          '--audio-queue-packets', str(args.audio_queue_packets),
+                          '--video-queue-frames', str(args.video_queue_frames))
+    try:
+        memory, ages = asyncio.run(soak(args, port))
+    finally:
+        stop([server])
+
+    slope = trend(memory) * 60 / 1e6
+    age_slope = trend(ages) * 60
+    ok = slope <= args.max_growth and age_slope <= args.max_age_growth
+    print(f'\nserver RSS {memory[0][1] / 1e6:.1f} -> {memory[-1][1] / 1e6:.1f} MB, trend {slope:+.2f} MB/min; '
+          f'throttled audio age {ages[0][1]:.0f} -> {ages[-1][1]:.0f} ms, trend {age_slope:+.0f} ms/min: '
+          f'{"PASS" if ok else "FAIL"}')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Simulated slow-client harness for the adaptive quality controller.
+
+A real VideoStreamer with the default profile ladder (Config().profiles)
+runs on a synthetic source, and one viewer reads VideoStreamer.generate_frames(),
+the same loop /video_feed uses, writing each part into a simulated link:
+a send buffer draining at a bandwidth that drops from Wi-Fi-good to
+congested and back. A write blocks while the buffer is full, as the socket
+write does, so the Viewer sees the send times it would on that link.
+End-to-end latency is the part's X-Capture-Time to its last byte leaving
+the link.
+
+    python benchmarks/bench_slow_client.py --target-ms 150
+
+Exits non-zero if the auto viewer's p95 latency misses the target.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _common import percentile
+from remote_switch.capture import LoopedCamera, synthetic_frames
+from remote_switch.config import Config
+from remote_switch.frame_hub import jpeg_size, part_jpeg
+from remote_switch.video import AUTO_PROFILE, VideoStreamer
+
+
+class Link:
+    """A send buffer of buffer_bytes draining at the current bandwidth, on the wall clock like X-Capture-Time."""
+
+    def __init__(self, buffer_bytes):
+        self.buffer_bytes = buffer_bytes
+        self.rate = 1.0
+        self.busy_until = time.time()
+
+    def write(self, size):
+        """Blocks like a full socket buffer would; returns when the last byte leaves."""
+        now = time.time()
+        start = max(now, self.busy_until)
+        self.busy_until = start + size / self.rate
+        # Sleep until whatever is still queued fits in the buffer
+        unblock = self.busy_until - self.buffer_bytes / self.rate
+        if unblock > now:
+            time.sleep(unblock - now)
+        return self.busy_until
+
+
+def capture_ms(part):
+    header = bytes(part[:part.index(b'\r\n\r\n')])
+    return float(header.split(b'X-Capture-Time: ')[1].split(b'\r\n')[0])
+
+
+def viewer(streamer, profile, link, stop, samples):
+    # Renditions told apart by their size, as the page would see them
+    names = {(width, height): name for name, (width, height, _) in streamer.profiles.items()}
+    parts = streamer.generate_frames(profile)
+    for part in parts:
+        delivered = link.write(len(part))
+        rendition = names.get(jpeg_size(part_jpeg(part)), '?')
+        samples.append((delivered, delivered * 1000 - capture_ms(part), rendition))
+        if stop.is_set():
+            break
+    parts.close()
+
+
+def run(config, frames, profile, phases, buffer_bytes):
+    streamer = VideoStreamer(config, lambda: LoopedCamera(frames, config.capture_fps, config.mjpeg_passthrough))
+    try:
+        link = Link(buffer_bytes)
+        link.rate = phases[0][1]
+        stop = threading.Event()
+        samples = []
+        thread = threading.Thread(target=viewer, args=(streamer, profile, link, stop, samples), daemon=True)
+        thread.start()
+        # Let capture start before the first phase
+        time.sleep(1.0)
+        bounds = []
+        for name, rate, seconds in phases:
+            link.rate = rate
+            begin = time.time()
+            time.sleep(seconds)
+            bounds.append((name, begin, time.time()))
+        stop.set()
+        thread.join(timeout=5)
+    finally:
+        streamer.close()
+
+    report = []
+    for name, begin, end in bounds:
+        window = [s for s in samples if begin <= s[0] < end]
+        latencies = [s[1] for s in window]
+        used = sorted({s[2] for s in window})
+        fps = len(window) / (end - begin)
+        report.append((name, fps, percentile(latencies, 0.5), percentile(latencies, 0.95), '/'.join(used)))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--good-mbit', type=float, default=40.0)
+    parser.add_argument('--congested-mbit', type=float, default=6.0)
+    parser.add_argument('--phase-seconds', type=float, default=4.0)
+    parser.add_argument('--buffer-kb', type=int, default=Config.auto_send_buffer // 1024, help='socket send buffer')
+    parser.add_argument('--pattern', default='scroll', help='synthetic pattern: scroll, still or noise')
+    parser.add_argument('--workers', type=int, default=Config.encode_workers)
+    parser.add_argument('--target-ms', type=float, default=150.0, help='p95 latency the auto viewer must meet')
+    args = parser.parse_args()
+
+    # The source is the size of the largest rendition, so that one is passed through like a capture card's MJPEG
+    config = Config(encode_workers=args.workers, capture_grace=0.0)
+    width, height = config.capture_size
+    config.source_size = (width, height)
+    frames = synthetic_frames(width, height, args.pattern, config.source_loop_frames)
+
+    good = args.good_mbit * 1e6 / 8
+    congested = args.congested_mbit * 1e6 / 8
+    phases = [
+        ('good', good, args.phase_seconds),
+        ('congested', congested, args.phase_seconds),
+        ('recovered', good, args.phase_seconds),
+    ]
+
+    top = max(config.profiles, key=lambda name: config.profiles[name][0])
+    worst_auto = 0.0
+    for profile in (top, AUTO_PROFILE):
+        print(f'profile={profile}')
+        for name, fps, p50, p95, used in run(config, frames, profile, phases, args.buffer_kb * 1024):
+            print(f'  {name:>10}: {fps:5.1f} fps  p50 {p50:6.1f} ms  p95 {p95:6.1f} ms  renditions {used}')
+            if profile == AUTO_PROFILE:
+                worst_auto = max(worst_auto, p95)
+
+    ok = worst_auto <= args.target_ms
+    print(f'auto worst-phase p95 {worst_auto:.1f} ms vs target {args.target_ms:.0f} ms: {"PASS" if ok else "FAIL"}')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Camera discovery time: sequential scan vs parallel probe vs cached.
+
+Sequential is the old startup, opening /dev/video0-9 one after the other.
+The parallel run starts from an empty cache; the cached run reuses it, as
+an unattended restart does. Run on the machine with the capture card.
+
+    python benchmarks/bench_startup.py --rounds 3
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from remote_switch.discovery import list_v4l2_cameras, probe
+
+
+def sequential_scan():
+    return [i for i in range(10) if probe(i, cv2.CAP_V4L2)]
+
+
+def timed(fn, rounds, before=None):
+    times = []
+    for _ in range(rounds):
+        if before:
+            before()
+        started = time.perf_counter()
+        found = fn()
+        times.append(time.perf_counter() - started)
+    return found, statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    cache = os.path.join(tempfile.mkdtemp(), 'devices.json')
+
+    def clear_cache():
+        if os.path.exists(cache):
+            os.remove(cache)
+
+    runs = [
+        ('sequential', sequential_scan, None),
+        ('parallel', lambda: list_v4l2_cameras(cache), clear_cache),
+        ('cached', lambda: list_v4l2_cameras(cache), None),
+    ]
+    for label, fn, before in runs:
+        found, seconds = timed(fn, args.rounds, before)
+        print(f'{label:>10}: {seconds * 1000:8.1f} ms  cameras {found}')
+
+
+if __name__ == '__main__':
+    main()
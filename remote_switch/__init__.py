@@ -0,0 +1,6 @@
+"""Remote Switch: stream a Switch to the browser and play it with a gamepad through a Pico W."""
+from .app import create_app
+from .async_app import create_async_app
+from .config import Config
+
+__all__ = ['Config', 'create_app', 'create_async_app']
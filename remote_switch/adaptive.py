@@ -0,0 +1,62 @@
+"""Per-viewer adaptive quality for the MJPEG endpoint."""
+
+
+class AdaptiveQuality:
+    """Steps a viewer along the rendition ladder based on send backpressure.
+
+    Each delivered frame reports how long its multipart write blocked and how
+    many newer frames were published meanwhile. A short run of congested
+    frames steps down one rendition; a long run of clear frames steps back up.
+    Stepping down right after stepping up doubles the wait before the next
+    probe, so a link sitting between two renditions does not oscillate.
+    """
+
+    def __init__(self, profiles, start, frame_interval, down_after=3, up_after=120, max_up_after=1920):
+        # Cheapest rendition first
+        self.ladder = sorted(profiles, key=lambda name: profiles[name][0] * profiles[name][1])
+        self.index = self.ladder.index(start)
+        self.frame_interval = frame_interval
+        self.down_after = down_after
+        self.base_up_after = up_after
+        self.up_after = up_after
+        self.max_up_after = max_up_after
+        self.congested = 0
+        self.clear = 0
+        self.since_up = None
+
+    @property
+    def profile(self):
+        return self.ladder[self.index]
+
+    def record(self, write_time, frames_behind):
+        """Feeds one delivered frame and returns the profile to send next."""
+        # A write eating most of the frame interval means the link is saturated
+        # and the socket buffer is only going to grow from here
+        if write_time > self.frame_interval * 0.8 or frames_behind > 1:
+            self.congested += 1
+            self.clear = 0
+        elif write_time < self.frame_interval * 0.3 and frames_behind == 0:
+            self.clear += 1
+            self.congested = 0
+        else:
+            self.congested = 0
+
+        if self.since_up is not None:
+            self.since_up += 1
+
+        if self.congested >= self.down_after and self.index > 0:
+            if self.since_up is not None and self.since_up < self.up_after:
+                # The last probe up failed quickly: back off before trying again
+                self.up_after = min(self.up_after * 2, self.max_up_after)
+            self.index -= 1
+            self.congested = self.clear = 0
+            self.since_up = None
+        elif self.clear >= self.up_after and self.index < len(self.ladder) - 1:
+            self.index += 1
+            self.congested = self.clear = 0
+            self.since_up = 0
+        elif self.since_up is not None and self.since_up >= self.up_after:
+            # The new rendition held up; forget the backoff
+            self.up_after = self.base_up_after
+            self.since_up = None
+        return self.profile
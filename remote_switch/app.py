@@ -0,0 +1,191 @@
+"""Application factory: the Flask app, its Socket.IO layer and the streamers behind them."""
+import socket
+import time
+
+from flask import Flask, Response, render_template_string, request
+from flask_socketio import SocketIO, join_room, leave_room
+
+from .audio import AudioStreamer
+from .config import Config
+from .h264 import H264Streamer, h264_available
+from .input_protocol import pack_legacy, split_message
+from .input_relay import InputRelay
+from .input_scheduler import InputScheduler
+from .metrics import INPUT_TRACKER, REGISTRY, VIDEO_LATENCY_TRACKER
+from .page import HTML_PAGE
+from .relay import BroadcastRelay, remove_stale_socket
+from .send_queue import QueuedEmitter, limit_unsent
+from .video import AUTO_PROFILE, VideoStreamer
+
+
+def create_app(config=None, video_device=None, audio_source=None):
+    """Builds the app and starts its pipelines; the capture card is only opened by the first viewer.
+
+    Building it does open the audio source (idle until a page enables
+    audio), start the encoder workers and bind the input and H.264 ports
+    (0 picks a free one) and the relay address, if set.
+
+    video_device is a callable returning a cv2.VideoCapture-like object and
+    audio_source an audio_capture source; both default to config's backends.
+    The Socket.IO server is app.socketio and the pipelines are app.streamer,
+    app.audio_streamer, app.input_relay and app.input_scheduler, plus
+    app.h264_streamer when H.264 is on and PyAV is installed and app.relay
+    when config.relay_address is set (else None).
+    """
+    config = config or Config()
+    app = Flask(__name__)
+    # async_mode='threading' is required for Windows OpenCV compatibility
+    socketio = SocketIO(app, async_mode='threading', cors_allowed_origins='*')
+    app.config['REMOTE_SWITCH'] = config
+    app.socketio = socketio
+    app.wsgi_app = limit_websocket_unsent(app.wsgi_app, config.media_unsent_bytes)
+    start_pipelines(app, QueuedEmitter(socketio.server, config.audio_queue_packets), config, video_device, audio_source)
+    streamer = app.streamer
+    audio_streamer = app.audio_streamer
+
+    @app.route('/')
+    def index():
+        return render_template_string(HTML_PAGE, **page_context(app, config))
+
+    @app.route('/video_feed')
+    def video_feed():
+        profile = request.args.get('profile', config.default_profile)
+        if profile not in config.profiles and profile != AUTO_PROFILE:
+            return unknown_profile(profile, config), 404
+        conn = request.environ.get('werkzeug.socket')
+        limit_unsent(conn, config.media_unsent_bytes)
+        if profile == AUTO_PROFILE and conn is not None:
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, config.auto_send_buffer)
+        return Response(streamer.generate_frames(profile), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+    @socketio.on('audio_subscribe')
+    def audio_subscribe(codec):
+        # One room per codec: each packet is encoded once and emitted to the room
+        codec = codec if codec in audio_streamer.codecs else 'pcm'
+        for other in audio_streamer.codecs:
+            leave_room('audio:' + other)
+        join_room('audio:' + codec)
+        audio_streamer.subscribe(request.sid, codec)
+
+    @socketio.on('audio_unsubscribe')
+    def audio_unsubscribe():
+        for codec in audio_streamer.codecs:
+            leave_room('audio:' + codec)
+        audio_streamer.unsubscribe(request.sid)
+
+    @socketio.on('disconnect')
+    def handle_disconnect(reason=None):
+        # Rooms are left automatically; capture stops with the last listener
+        audio_streamer.unsubscribe(request.sid)
+        VIDEO_LATENCY_TRACKER.remove(request.sid)
+
+    @socketio.on('clock_sync')
+    def clock_sync():
+        return server_time_ms()
+
+    @socketio.on('video_latency')
+    def video_latency(samples):
+        receive_latency(request.sid, samples)
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+    @socketio.on('input_data')
+    def handle_input(data):
+        receive_input(data, app.input_scheduler)
+
+    return app
+
+
+def start_pipelines(app, sio, config, video_device=None, audio_source=None):
+    """Starts the video, audio and input pipelines and sets them as attributes of app, for either web server.
+
+    sio is what AudioStreamer emits through: emit(event, data, to=room),
+    callable from its own thread.
+    """
+    if config.default_profile not in config.profiles:
+        raise ValueError(f"default_profile '{config.default_profile}' is not in profiles")
+    h264_on = config.h264_profile not in (None, '', 'none')
+    if h264_on and config.h264_profile not in config.profiles:
+        raise ValueError(f"h264_profile '{config.h264_profile}' is not in profiles")
+    if config.relay_address:
+        remove_stale_socket(config.relay_address)
+    # Encoder workers start first, while no other thread exists
+    app.streamer = VideoStreamer(config, video_device)
+    app.h264_streamer = None
+    if h264_on and h264_available():
+        app.h264_streamer = H264Streamer(app.streamer, config, host=config.host, port=config.h264_port)
+    elif h264_on:
+        print("H.264 off: needs PyAV with libx264 (pip install av)")
+
+    app.audio_streamer = AudioStreamer(sio, config, audio_source)
+    pico_addr = (config.pico_ip, config.pico_port)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    # Both input paths share one scheduler, so the Pico sees a steady rate whichever the page uses
+    app.input_scheduler = InputScheduler(sock, pico_addr, config.input_send_hz, config.input_format)
+    if config.input_format == 'batch':
+        # Older firmware reads the batch header as a player id and drops the datagram without a word
+        print("Input format batch: the Pico must run the current sketch.ino, or no input gets through "
+              "(--input-format legacy works with any firmware)")
+    app.input_relay = InputRelay(app.input_scheduler, host=config.host, port=config.input_port)
+    app.relay = None
+    if config.relay_address:
+        app.relay = BroadcastRelay(app.streamer, app.audio_streamer, config, config.relay_address)
+
+
+def stop_pipelines(app):
+    """Stops what start_pipelines() started: encoder processes and their shared memory included."""
+    for pipeline in (app.streamer, app.h264_streamer, app.audio_streamer, app.input_scheduler):
+        if pipeline is not None:
+            pipeline.close()
+
+
+def page_context(app, config):
+    """Template values for HTML_PAGE; without an input relay the page is for spectators."""
+    h264_streamer = app.h264_streamer
+    return dict(profiles=config.profiles, input_port=app.input_relay.port if app.input_relay else None,
+                h264_port=h264_streamer.port if h264_streamer else None,
+                h264_height=config.profiles[config.h264_profile][1] if h264_streamer else None,
+                audio_rate=config.audio_rate, audio_packet_ms=config.audio_packet_ms,
+                audio_codecs=app.audio_streamer.codecs)
+
+
+def limit_websocket_unsent(wsgi_app, size):
+    """WSGI middleware: Socket.IO's WebSocket (audio) gets limit_unsent() before Engine.IO takes it over."""
+
+    def middleware(environ, start_response):
+        if 'transport=websocket' in environ.get('QUERY_STRING', ''):
+            limit_unsent(environ.get('werkzeug.socket'), size)
+        return wsgi_app(environ, start_response)
+    return middleware
+
+
+def unknown_profile(profile, config):
+    return f"Unknown profile '{profile}'. Choose from: {', '.join([AUTO_PROFILE, *config.profiles])}"
+
+
+def server_time_ms():
+    """The clock frames are stamped with; pages measuring latency sync to it through clock_sync."""
+    return time.time() * 1000
+
+
+def receive_latency(sid, samples):
+    """Handles a Socket.IO video_latency message."""
+    try:
+        VIDEO_LATENCY_TRACKER.report(sid, samples)
+    except (TypeError, ValueError):
+        pass
+
+
+def receive_input(data, input_scheduler):
+    """Handles a Socket.IO input_data message."""
+    arrived = time.perf_counter()
+    try:
+        # Binary packets already match PacketData; dicts are from older pages
+        message = split_message(data)
+        packet, seq, client_ms = message if message else (pack_legacy(data), None, None)
+        INPUT_TRACKER.received(packet[0], seq, client_ms, arrived)
+        input_scheduler.submit(packet, 'socketio', arrived)
+    except Exception:
+        pass
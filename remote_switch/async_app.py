@@ -0,0 +1,183 @@
+"""Async web server: the same page, streams and Socket.IO events on one asyncio event loop.
+
+Under Flask's server every /video_feed viewer and every Socket.IO client
+holds an OS thread blocked in a write or a wait. Here each is a coroutine:
+one event loop thread serves them all, woken once per frame by the hubs.
+Capture, encoding, audio and the input relay keep their own threads and
+processes; only the serving side changes.
+
+Needs aiohttp (pip install aiohttp); python -m remote_switch --web-backend aiohttp
+"""
+import asyncio
+import socket
+import time
+import types
+
+import jinja2
+import socketio
+
+try:
+    from aiohttp import web
+except ImportError:
+    web = None
+
+from .app import page_context, receive_input, receive_latency, server_time_ms, start_pipelines, unknown_profile
+from .config import Config
+from .frame_hub import HubWaiter
+from .metrics import REGISTRY, VIDEO_LATENCY_TRACKER
+from .page import HTML_PAGE
+from .send_queue import SendQueues, encode_event, limit_unsent
+from .video import AUTO_PROFILE, Viewer
+
+WEB_BACKENDS = ('flask', 'aiohttp')
+# Where create_async_app() keeps the Socket.IO server and the pipelines
+PIPELINES = web.AppKey('pipelines', types.SimpleNamespace) if web else None
+
+
+def aiohttp_available():
+    return web is not None
+
+
+class ThreadsafeEmitter:
+    """emit() for AudioStreamer's thread: the packet goes to the room's members from the event loop,
+    each through its own bounded queue (see send_queue.py)."""
+
+    def __init__(self, sio, depth):
+        self.sio = sio
+        self.queues = SendQueues(sio.eio, depth)
+        # Set once the server is running; nobody can be listening before that
+        self.loop = None
+
+    def emit(self, event, data=None, to=None):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.create_task, self.send(event, data, to))
+
+    async def send(self, event, data, room):
+        # sio.emit() spawns a task per recipient and packet; one loop over the room is far cheaper
+        eio_sids = [eio_sid for _, eio_sid in self.sio.manager.get_participants('/', room)]
+        for eio_sid, packets in self.queues.push(room, eio_sids, encode_event(self.sio, event, data)):
+            for packet in packets:
+                await self.sio.eio.send_packet(eio_sid, packet)
+
+
+def create_async_app(config=None, video_device=None, audio_source=None):
+    """create_app() for aiohttp: returns a web.Application, started with run(app, host, port).
+
+    The Socket.IO server and the pipelines are on app[PIPELINES], named as
+    on create_app()'s app: app[PIPELINES].streamer and so on.
+    """
+    config = config or Config()
+    sio = socketio.AsyncServer(async_mode='aiohttp', cors_allowed_origins='*')
+    emitter = ThreadsafeEmitter(sio, config.audio_queue_packets)
+    pipelines = types.SimpleNamespace(socketio=sio)
+    start_pipelines(pipelines, emitter, config, video_device, audio_source)
+    return web_app(pipelines, config, emitter)
+
+
+def web_app(pipelines, config, emitter):
+    """The page, /video_feed, /metrics and Socket.IO events over pipelines, as set by start_pipelines().
+
+    Spectator fan-out processes pass stand-ins for the streamers and no
+    input_scheduler, which leaves the input_data event out.
+    """
+
+    @web.middleware
+    async def limit_websocket_unsent(request, handler):
+        # Socket.IO's WebSocket (audio), before Engine.IO takes it over
+        if request.query.get('transport') == 'websocket' and request.transport is not None:
+            limit_unsent(request.transport.get_extra_info('socket'), config.media_unsent_bytes)
+        return await handler(request)
+
+    app = web.Application(middlewares=[limit_websocket_unsent])
+    sio = pipelines.socketio
+    sio.attach(app)
+    app[PIPELINES] = pipelines
+    streamer = pipelines.streamer
+    audio_streamer = pipelines.audio_streamer
+    page = jinja2.Environment(autoescape=True).from_string(HTML_PAGE)
+    # profile -> HubWaiter on the server's event loop
+    waiters = {}
+
+    async def on_startup(app):
+        loop = asyncio.get_running_loop()
+        emitter.loop = loop
+        for name, hub in streamer.hubs.items():
+            waiters[name] = HubWaiter(hub, loop)
+
+    async def index(request):
+        return web.Response(text=page.render(**page_context(pipelines, config)), content_type='text/html')
+
+    async def video_feed(request):
+        profile = request.query.get('profile', config.default_profile)
+        if profile not in config.profiles and profile != AUTO_PROFILE:
+            return web.Response(text=unknown_profile(profile, config), status=404)
+        conn = request.transport.get_extra_info('socket')
+        limit_unsent(conn, config.media_unsent_bytes)
+        if profile == AUTO_PROFILE and conn is not None:
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, config.auto_send_buffer)
+        response = web.StreamResponse(headers={'Content-Type': 'multipart/x-mixed-replace; boundary=frame'})
+        await response.prepare(request)
+        viewer = Viewer(streamer, profile)
+        last_seq = viewer.start_seq
+        try:
+            while True:
+                last_seq, frame = await waiters[viewer.profile].wait_for(last_seq)
+                if frame:
+                    started = time.perf_counter()
+                    # Returns at once unless the connection is backed up, so this is the send time
+                    await response.write(frame)
+                    last_seq = viewer.sent(last_seq, time.perf_counter() - started)
+        except ConnectionError:
+            # Client disconnected
+            pass
+        finally:
+            viewer.close()
+        return response
+
+    async def metrics(request):
+        return web.Response(body=REGISTRY.render().encode(), headers={'Content-Type': 'text/plain; version=0.0.4'})
+
+    @sio.on('audio_subscribe')
+    async def audio_subscribe(sid, codec):
+        # One room per codec: each packet is encoded once and emitted to the room
+        codec = codec if codec in audio_streamer.codecs else 'pcm'
+        for other in audio_streamer.codecs:
+            await sio.leave_room(sid, 'audio:' + other)
+        await sio.enter_room(sid, 'audio:' + codec)
+        audio_streamer.subscribe(sid, codec)
+
+    @sio.on('audio_unsubscribe')
+    async def audio_unsubscribe(sid):
+        for codec in audio_streamer.codecs:
+            await sio.leave_room(sid, 'audio:' + codec)
+        audio_streamer.unsubscribe(sid)
+
+    @sio.on('disconnect')
+    async def handle_disconnect(sid, reason=None):
+        # Rooms are left automatically; capture stops with the last listener
+        audio_streamer.unsubscribe(sid)
+        VIDEO_LATENCY_TRACKER.remove(sid)
+
+    @sio.on('clock_sync')
+    async def clock_sync(sid):
+        return server_time_ms()
+
+    @sio.on('video_latency')
+    async def video_latency(sid, samples):
+        receive_latency(sid, samples)
+
+    if pipelines.input_scheduler:
+        @sio.on('input_data')
+        async def handle_input(sid, data):
+            receive_input(data, pipelines.input_scheduler)
+
+    app.on_startup.append(on_startup)
+    app.router.add_get('/', index)
+    app.router.add_get('/video_feed', video_feed)
+    app.router.add_get('/metrics', metrics)
+    return app
+
+
+def run(app, host, port):
+    # Streams never end on their own: on Ctrl+C close them instead of waiting a minute
+    web.run_app(app, host=host, port=port, access_log=None, shutdown_timeout=1.0)
@@ -0,0 +1,123 @@
+"""Audio pipeline: capture into a ring, cut packets, encode once per codec."""
+import threading
+import time
+
+from .audio_capture import open_audio
+from .audio_codec import OPUS_FRAME_MS, OpusEncoder, opus_available
+from .audio_ring import PACKET_HEADER, AudioRing
+from .metrics import AUDIO_LISTENERS, AUDIO_PACKETS, REGISTRY
+
+# Socket.IO event of each codec's packets
+AUDIO_EVENTS = {'pcm': 'audio_data', 'opus': 'audio_opus'}
+
+
+class AudioStreamer:
+    def __init__(self, sio, config, source=None):
+        self.sio = sio
+        self.config = config
+        rate = config.audio_rate
+        # Opus when PyAV is available and the rate allows it; raw PCM stays as the fallback
+        self.opus = None
+        if opus_available(rate, config.audio_packet_ms):
+            self.opus = OpusEncoder(rate, config.audio_packet_ms)
+        elif opus_available(rate):
+            print(f"Opus off: packets of {config.audio_packet_ms} ms are not an Opus frame size "
+                  f"({', '.join(f'{ms:g}' for ms in OPUS_FRAME_MS)}); sending raw PCM")
+        self.codecs = ['opus', 'pcm'] if self.opus else ['pcm']
+        # Small capture periods into a ring; packets are cut from it at audio_packet_ms
+        self.ring = AudioRing(rate, config.audio_ring_ms)
+        self.period_samples = rate * config.capture_period_ms // 1000
+        self.packet_bytes = rate * config.audio_packet_ms // 1000 * 2
+        # sid -> codec of every page that enabled audio; the device only runs while this is non-empty
+        self.listeners = {}
+        # Called with (codec, packet) for every packet emitted, e.g. by the spectator relay
+        self.taps = []
+        self.lock = threading.Lock()
+        self.active = threading.Event()
+        REGISTRY.on_collect(self.collect_metrics)
+        self.running = True
+
+        try:
+            self.source = source or open_audio(config, self.period_samples)
+            print(f"Audio Stream Ready: {self.source.name} @ {rate}Hz")
+            self.thread = threading.Thread(target=self.capture_audio, name='audio-capture', daemon=True)
+            self.thread.start()
+            self.sender = threading.Thread(target=self.stream_audio, name='audio-send', daemon=True)
+            self.sender.start()
+        except IOError as e:
+            print(f"Audio Error: {e}")
+            self.running = False
+
+    def subscribe(self, sid, codec):
+        with self.lock:
+            self.listeners[sid] = codec
+            self.active.set()
+
+    def unsubscribe(self, sid):
+        with self.lock:
+            self.listeners.pop(sid, None)
+            if not self.listeners:
+                self.active.clear()
+
+    def collect_metrics(self):
+        with self.lock:
+            codecs = list(self.listeners.values())
+        for codec in self.codecs:
+            AUDIO_LISTENERS.set(codecs.count(codec), codec=codec)
+
+    def capture_audio(self):
+        period_ms = self.config.capture_period_ms
+        paused = False
+        while self.running:
+            try:
+                if not self.active.is_set():
+                    # Nobody listening: stop the device until someone subscribes
+                    paused = True
+                    self.source.stop()
+                    self.active.wait()
+                if paused:
+                    # Whatever the ring held from before the pause is stale
+                    self.ring.reset()
+                    self.source.start()
+                    paused = False
+                # Read blocking is fine in its own thread; stamp the period's first sample
+                data = self.source.read()
+                self.ring.write(data, time.time() * 1000 - period_ms)
+            except Exception:
+                time.sleep(0.1)
+
+    def stream_audio(self):
+        # Sequence of the last packet fed to the Opus encoder
+        opus_seq = None
+        while self.running:
+            try:
+                packet = self.ring.read(self.packet_bytes)
+                if packet is None:
+                    continue
+                seq, captured_ms, data = packet
+                header = PACKET_HEADER.pack(seq & 0xFFFFFFFF, captured_ms)
+                with self.lock:
+                    codecs = set(self.listeners.values())
+                # Only encode and emit what someone is listening to
+                if 'pcm' in codecs:
+                    self.emit('pcm', header + data)
+                if 'opus' in codecs:
+                    # After a gap (a pause, a skip, nobody on Opus) leftover samples would be spliced onto other audio
+                    if opus_seq is None or seq != opus_seq + 1:
+                        self.opus.reset()
+                    opus_seq = seq
+                    for encoded in self.opus.encode(data):
+                        self.emit('opus', header + encoded)
+            except Exception:
+                time.sleep(0.1)
+
+    def emit(self, codec, packet):
+        self.sio.emit(AUDIO_EVENTS[codec], packet, to='audio:' + codec)
+        AUDIO_PACKETS.inc(codec=codec)
+        for tap in self.taps:
+            tap(codec, packet)
+
+    def close(self):
+        self.running = False
+        REGISTRY.remove_collector(self.collect_metrics)
+        self.active.set()
@@ -0,0 +1,159 @@
+"""Audio capture backends: a PyAudio input, or without a sound card a synthetic
+tone or a WAV file on a loop.
+
+Sources deliver mono 16-bit PCM one period at a time: start(), then read()
+blocks until the next period is ready; stop() pauses the device.
+"""
+import time
+import wave
+
+import numpy as np
+
+try:
+    import pyaudio
+except ImportError:
+    pyaudio = None
+
+BACKENDS = ('pyaudio', 'synthetic', 'wav')
+
+
+def open_audio(config, period_samples):
+    if config.audio_backend == 'synthetic':
+        return SyntheticTone(config.audio_rate, period_samples, config.synthetic_tone_hz)
+    if config.audio_backend == 'wav':
+        return WavSource(config.audio_file, config.audio_rate, period_samples)
+    if config.audio_backend != 'pyaudio':
+        raise ValueError(f"Unknown audio backend '{config.audio_backend}'. Choose from: {', '.join(BACKENDS)}")
+    return PyAudioSource(config.audio_rate, period_samples, config.audio_device)
+
+
+def list_audio_devices():
+    """Scans for audio input devices using PyAudio."""
+    if pyaudio is None:
+        return {}
+    p = pyaudio.PyAudio()
+    available_devices = {}
+    print("\n--- Available Audio Input Devices ---")
+    for i in range(p.get_device_count()):
+        dev = p.get_device_info_by_index(i)
+        if dev['maxInputChannels'] > 0:
+            print(f"Index [{i}]: {dev['name']} (Channels: {dev['maxInputChannels']}, Rate: {int(dev['defaultSampleRate'])})")
+            available_devices[i] = dev['name']
+    p.terminate()
+    return available_devices
+
+
+class PyAudioSource:
+    def __init__(self, rate, period_samples, device=None):
+        if pyaudio is None:
+            raise IOError("PyAudio is not installed")
+        self.period_samples = period_samples
+        self.p = pyaudio.PyAudio()
+        self.stream = self.p.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=rate,
+            input=True,
+            input_device_index=device,
+            frames_per_buffer=period_samples,
+            start=False
+        )
+        self.name = "Default"
+        if device is not None:
+            self.name = self.p.get_device_info_by_index(device).get('name')
+
+    def start(self):
+        self.stream.start_stream()
+
+    def stop(self):
+        self.stream.stop_stream()
+
+    def read(self):
+        return self.stream.read(self.period_samples, exception_on_overflow=False)
+
+    def close(self):
+        self.stream.close()
+        self.p.terminate()
+
+
+class PacedSource:
+    """Hands out PCM one period at a time, no faster than a sound card would."""
+
+    def __init__(self, rate, period_samples):
+        self.rate = rate
+        self.period_samples = period_samples
+        self.sample = 0
+        self.next_time = time.perf_counter()
+
+    def start(self):
+        self.next_time = time.perf_counter()
+
+    def stop(self):
+        pass
+
+    def read(self):
+        self.next_time += self.period_samples / self.rate
+        delay = self.next_time - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        pcm = self.samples(self.sample, self.period_samples)
+        self.sample += self.period_samples
+        return pcm.tobytes()
+
+    def close(self):
+        pass
+
+
+class SyntheticTone(PacedSource):
+    """A steady sine at the given frequency."""
+
+    name = "Synthetic tone"
+
+    def __init__(self, rate, period_samples, frequency=440):
+        super().__init__(rate, period_samples)
+        self.step = 2 * np.pi * frequency / rate
+
+    def samples(self, start, count):
+        t = np.arange(start, start + count)
+        return (np.sin(t * self.step) * 12000).astype(np.int16)
+
+
+class WavSource(PacedSource):
+    """A WAV file on a loop, mixed down to mono and resampled to the stream rate."""
+
+    def __init__(self, path, rate, period_samples):
+        super().__init__(rate, period_samples)
+        self.name = f"WAV {path}"
+        self.pcm = read_wav(path, rate)
+
+    def samples(self, start, count):
+        index = np.arange(start, start + count) % len(self.pcm)
+        return self.pcm[index]
+
+
+def read_wav(path, rate):
+    """Returns the file as mono int16 samples at rate."""
+    with wave.open(path, 'rb') as f:
+        width = f.getsampwidth()
+        channels = f.getnchannels()
+        source_rate = f.getframerate()
+        raw = f.readframes(f.getnframes())
+    if width == 1:
+        samples = (np.frombuffer(raw, np.uint8).astype(np.float64) - 128) * 256
+    elif width == 2:
+        samples = np.frombuffer(raw, '<i2').astype(np.float64)
+    elif width == 3:
+        bytes3 = np.frombuffer(raw, np.uint8).reshape(-1, 3)
+        samples = (bytes3[:, 0].astype(np.int32) << 8 | bytes3[:, 1].astype(np.int32) << 16
+                   | bytes3[:, 2].astype(np.int8).astype(np.int32) << 24).astype(np.float64) / 65536
+    elif width == 4:
+        samples = np.frombuffer(raw, '<i4').astype(np.float64) / 65536
+    else:
+        raise IOError(f"Unsupported WAV sample width: {width} bytes")
+    samples = samples.reshape(-1, channels).mean(axis=1)
+    if not len(samples):
+        raise IOError(f"{path} has no audio")
+    if source_rate != rate:
+        positions = np.arange(int(len(samples) * rate / source_rate)) * source_rate / rate
+        samples = np.interp(positions, np.arange(len(samples)), samples)
+    return np.clip(samples, -32768, 32767).astype(np.int16)
@@ -0,0 +1,53 @@
+"""Opus audio, encoded once on the server and shared by every listener.
+
+Needs PyAV (pip install av); without it the streamers fall back to raw PCM.
+"""
+import numpy as np
+
+try:
+    import av
+except ImportError:
+    av = None
+
+# Sample rates Opus can encode natively
+OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+# Frame durations Opus can encode, in ms
+OPUS_FRAME_MS = (2.5, 5, 10, 20, 40, 60)
+
+
+def opus_available(rate, frame_ms=20):
+    return av is not None and rate in OPUS_RATES and frame_ms in OPUS_FRAME_MS
+
+
+class OpusEncoder:
+    """Turns mono 16-bit PCM into one Opus packet per frame_ms of audio."""
+
+    def __init__(self, rate, frame_ms=20, bitrate=48000):
+        self.rate = rate
+        self.frame_samples = rate * frame_ms // 1000
+        self.codec = av.CodecContext.create('libopus', 'w')
+        self.codec.sample_rate = rate
+        self.codec.layout = 'mono'
+        self.codec.format = 's16'
+        self.codec.bit_rate = bitrate
+        self.codec.options = {'application': 'lowdelay', 'frame_duration': str(frame_ms)}
+        self.pending = b''
+        self.pts = 0
+
+    def reset(self):
+        """Drops samples still waiting for a full frame, before audio that does not follow on from them."""
+        self.pending = b''
+
+    def encode(self, pcm):
+        """Returns the packets completed by this chunk; leftover samples wait for the next one."""
+        self.pending += pcm
+        size = self.frame_samples * 2
+        packets = []
+        while len(self.pending) >= size:
+            chunk, self.pending = self.pending[:size], self.pending[size:]
+            frame = av.AudioFrame.from_ndarray(np.frombuffer(chunk, np.int16).reshape(1, -1), format='s16', layout='mono')
+            frame.sample_rate = self.rate
+            frame.pts = self.pts
+            self.pts += self.frame_samples
+            packets += [bytes(packet) for packet in self.codec.encode(frame)]
+        return packets
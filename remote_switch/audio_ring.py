@@ -0,0 +1,64 @@
+"""Ring buffer between audio capture and the packet sender."""
+import struct
+import threading
+
+# Prefixed to every audio packet: [Seq (4B) | Capture time of first sample, ms since epoch (8B double)]
+PACKET_HEADER = struct.Struct('<Id')
+
+
+class AudioRing:
+    """Captured PCM in a fixed ring, read back as fixed-size packets.
+
+    Capture writes small periods and never blocks. The sender reads whole
+    packets; if it falls more than a ring behind, it skips ahead to the
+    oldest audio still held, which shows up as a sequence gap. Every packet
+    carries the capture time of its first sample, so the page can measure
+    jitter and drift against the capture clock.
+    """
+
+    def __init__(self, rate, capacity_ms, sample_bytes=2):
+        self.rate = rate
+        self.sample_bytes = sample_bytes
+        self.capacity = rate * capacity_ms // 1000 * sample_bytes
+        self.buf = bytearray(self.capacity)
+        self.cond = threading.Condition()
+        # Absolute byte positions since capture started
+        self.written = 0
+        self.read_pos = 0
+        # (position, capture ms) of the most recent period
+        self.stamp = (0, 0.0)
+
+    def write(self, pcm, captured_ms):
+        with self.cond:
+            start = self.written % self.capacity
+            first = min(len(pcm), self.capacity - start)
+            self.buf[start:start + first] = pcm[:first]
+            self.buf[:len(pcm) - first] = pcm[first:]
+            self.stamp = (self.written, captured_ms)
+            self.written += len(pcm)
+            self.cond.notify_all()
+
+    def reset(self):
+        """Drops everything not read yet, e.g. when capture resumes after a pause."""
+        with self.cond:
+            self.read_pos = self.written
+
+    def read(self, packet_bytes, timeout=1.0):
+        """Returns (seq, capture ms, pcm) for the next packet, or None on timeout."""
+        if packet_bytes * 2 > self.capacity:
+            raise ValueError("The ring must hold at least two packets")
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.written - self.read_pos >= packet_bytes, timeout):
+                return None
+            behind = self.written - self.capacity - self.read_pos
+            if behind > 0:
+                # Overwritten already: skip whole packets so sequence numbers stay aligned
+                self.read_pos += -(-behind // packet_bytes) * packet_bytes
+            start = self.read_pos % self.capacity
+            first = min(packet_bytes, self.capacity - start)
+            pcm = bytes(self.buf[start:start + first]) + bytes(self.buf[:packet_bytes - first])
+            stamp_pos, stamp_ms = self.stamp
+            captured_ms = stamp_ms + (self.read_pos - stamp_pos) / self.sample_bytes / self.rate * 1000
+            seq = self.read_pos // packet_bytes
+            self.read_pos += packet_bytes
+            return seq, captured_ms, pcm
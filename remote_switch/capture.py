@@ -0,0 +1,196 @@
+"""Video capture backends.
+
+Every backend hands back an object with cv2.VideoCapture's read(), grab(),
+retrieve() and release(), so the streamer does not care where frames come
+from: V4L2 on Linux, DirectShow on Windows, or, without a capture card, a
+synthetic pattern or a video file played on a loop.
+"""
+import time
+
+import cv2
+import numpy as np
+
+from .discovery import list_dshow_cameras, list_v4l2_cameras
+
+CV2_BACKENDS = {'v4l2': cv2.CAP_V4L2, 'dshow': cv2.CAP_DSHOW}
+BACKENDS = (*CV2_BACKENDS, 'synthetic', 'file')
+PATTERNS = ('scroll', 'still', 'noise', 'clock')
+CARD_JPEG_QUALITY = 90
+# The clock pattern's strip: milliseconds since the epoch, low 32 bits, one cell per bit
+CLOCK_BITS = 32
+
+
+def open_camera(config):
+    """Opens config.camera on config.video_backend at the capture size and rate."""
+    if config.video_backend == 'synthetic':
+        pattern = config.synthetic_pattern
+        frames = synthetic_frames(*source_size(config), 'scroll' if pattern == 'clock' else pattern,
+                                  config.source_loop_frames)
+        if pattern == 'clock':
+            return ClockCamera(frames, config.capture_fps, config.mjpeg_passthrough)
+        return LoopedCamera(frames, config.capture_fps, config.mjpeg_passthrough)
+    if config.video_backend == 'file':
+        frames = file_frames(config.video_file, source_size(config), config.source_loop_frames)
+        return LoopedCamera(frames, config.capture_fps, config.mjpeg_passthrough)
+    if config.video_backend not in CV2_BACKENDS:
+        raise ValueError(f"Unknown video backend '{config.video_backend}'. Choose from: {', '.join(BACKENDS)}")
+    width, height = config.capture_size
+    cap = cv2.VideoCapture(config.camera, CV2_BACKENDS[config.video_backend])
+    if config.video_backend == 'v4l2':
+        # Force MJPG to avoid USB bandwidth lag
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc('M', 'J', 'P', 'G'))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    cap.set(cv2.CAP_PROP_FPS, config.capture_fps)
+    if config.video_backend == 'v4l2' and config.mjpeg_passthrough:
+        # read() now returns the raw MJPEG bitstream instead of decoded BGR
+        cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+    return cap
+
+
+def source_size(config):
+    return config.source_size or config.capture_size
+
+
+def list_cameras(backend):
+    if backend == 'v4l2':
+        return list_v4l2_cameras()
+    if backend == 'dshow':
+        return list_dshow_cameras()
+    return [0]
+
+
+def card_jpeg(frame):
+    # Roughly what an MJPEG capture card puts on the wire
+    return cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, CARD_JPEG_QUALITY])[1]
+
+
+def synthetic_frames(width, height, pattern='scroll', count=120):
+    """A deterministic loop of JPEG frames; the same arguments give the same bytes.
+
+    scroll: a gradient moving sideways, every frame different
+    still: one frame repeated, so the change detector skips nearly all of it
+    noise: seeded noise, the worst case for JPEG size and encode time
+    clock: scroll, with the time of each grab drawn in (see ClockCamera)
+    """
+    if pattern not in PATTERNS:
+        raise ValueError(f"Unknown synthetic pattern '{pattern}'. Choose from: {', '.join(PATTERNS)}")
+    if pattern == 'still':
+        count = 1
+    plane = (np.add.outer(np.arange(height), np.arange(width)) % 256).astype(np.uint8)
+    rng = np.random.default_rng(0)
+    frames = []
+    for index in range(count):
+        if pattern == 'noise':
+            frame = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        else:
+            shifted = np.roll(plane, index * width // count, axis=1)
+            frame = np.dstack((shifted, shifted[::-1], 255 - shifted))
+        frames.append(card_jpeg(frame))
+    return frames
+
+
+def file_frames(path, size, count=600):
+    """Decodes up to count frames of a video file, scaled to size, as JPEG."""
+    cap = cv2.VideoCapture(path)
+    frames = []
+    try:
+        while len(frames) < count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if (frame.shape[1], frame.shape[0]) != tuple(size):
+                frame = cv2.resize(frame, tuple(size), interpolation=cv2.INTER_AREA)
+            frames.append(card_jpeg(frame))
+    finally:
+        cap.release()
+    if not frames:
+        raise IOError(f"No frames could be read from {path}")
+    return frames
+
+
+class LoopedCamera:
+    """Plays a list of JPEG frames on a loop at a steady rate, like an MJPEG capture card.
+
+    Frames are encoded once up front, so playback costs what a real card
+    costs: with mjpeg set, retrieve() hands back the bitstream (as V4L2 does
+    with CONVERT_RGB off), otherwise the decoded BGR frame.
+    """
+
+    def __init__(self, frames, fps, mjpeg=False):
+        self.frames = frames
+        self.mjpeg = mjpeg
+        self.interval = 1.0 / fps
+        self.index = -1
+        self.next_time = time.perf_counter()
+
+    def isOpened(self):
+        return True
+
+    def grab(self):
+        delay = self.next_time - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            # Running late (or resuming): carry on from now rather than burst to catch up
+            self.next_time = time.perf_counter()
+        self.next_time += self.interval
+        self.index += 1
+        return True
+
+    def retrieve(self):
+        jpeg = self.frames[self.index % len(self.frames)]
+        if self.mjpeg:
+            return True, jpeg
+        return True, cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+
+    def read(self):
+        self.grab()
+        return self.retrieve()
+
+    def release(self):
+        pass
+
+
+class ClockCamera(LoopedCamera):
+    """The scrolling pattern with the wall clock at each grab written into the top 1/18th of every frame.
+
+    A black or white cell per bit of the low 32 bits of milliseconds since
+    the epoch, large enough to survive scaling and JPEG; read_clock() reads
+    it back. Frames are drawn, and with mjpeg re-encoded, as they are read,
+    which costs the capture thread a few milliseconds per frame.
+    """
+
+    def grab(self):
+        super().grab()
+        self.clock = int(time.time() * 1000) & 0xFFFFFFFF
+        return True
+
+    def retrieve(self):
+        frame = cv2.imdecode(self.frames[self.index % len(self.frames)], cv2.IMREAD_COLOR)
+        height, width = frame.shape[:2]
+        cell = width // CLOCK_BITS
+        for bit in range(CLOCK_BITS):
+            frame[:height // 18, bit * cell:(bit + 1) * cell] = 255 if self.clock >> bit & 1 else 0
+        if self.mjpeg:
+            return True, card_jpeg(frame)
+        return True, frame
+
+
+def read_clock(frame):
+    """The clock ClockCamera drew into a decoded frame (BGR or luma), in ms modulo 2**32."""
+    height, width = frame.shape[:2]
+    row = frame[height // 36]
+    cell = width // CLOCK_BITS
+    clock = 0
+    for bit in range(CLOCK_BITS):
+        if row[bit * cell + cell // 2].mean() > 128:
+            clock |= 1 << bit
+    return clock
+
+
+def clock_age(clock, now_ms=None):
+    """Milliseconds from a clock read_clock() returned to now_ms (default: now, on the same wall clock)."""
+    if now_ms is None:
+        now_ms = time.time() * 1000
+    return ((int(now_ms) - clock) & 0xFFFFFFFF) + now_ms % 1
@@ -0,0 +1,52 @@
+"""Static-scene suppression for the capture loop."""
+import time
+
+import cv2
+import numpy as np
+
+
+def thumbnail(frame):
+    """Coarse grayscale view of a BGR frame or a raw JPEG bitstream."""
+    if frame.ndim == 3:
+        return frame[::8, ::8, 1]
+    # libjpeg scales during the IDCT, so this costs a fraction of a full decode
+    return cv2.imdecode(frame, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+
+
+class ChangeDetector:
+    """Tells whether a frame differs enough from the last one let through.
+
+    Frames are compared by mean absolute difference of their thumbnails
+    against the last *sent* frame, so slow fades still add up to a change.
+    One frame per keepalive interval always goes through. The caller
+    reports with sent() which frames really went out.
+    """
+
+    def __init__(self, threshold, keepalive):
+        self.threshold = threshold
+        self.keepalive = keepalive
+        self.reference = None
+        self.last_sent = 0.0
+        self.frames = 0
+        self.skipped = 0
+
+    @property
+    def skip_ratio(self):
+        return self.skipped / self.frames if self.frames else 0.0
+
+    def changed(self, thumb, force=False):
+        self.frames += 1
+        now = time.monotonic()
+        if (not force and thumb is not None and self.reference is not None
+                and thumb.shape == self.reference.shape
+                and now - self.last_sent < self.keepalive
+                and np.abs(thumb.astype(np.int16) - self.reference).mean() < self.threshold):
+            self.skipped += 1
+            return False
+        return True
+
+    def sent(self, thumb):
+        """Makes thumb the reference; until then a changed frame that got dropped is still a change."""
+        if thumb is not None:
+            self.reference = thumb.astype(np.int16)
+        self.last_sent = time.monotonic()
@@ -0,0 +1,71 @@
+"""Command line entry point: python -m remote_switch --help"""
+import time
+
+from . import async_app
+from .app import create_app, stop_pipelines
+from .audio_capture import list_audio_devices
+from .capture import list_cameras
+from .config import Config
+from .settings import OPTIONS, load_settings
+
+
+def select_camera(settings):
+    # Only probe when no camera was configured
+    if settings.camera is not None:
+        return settings.camera
+    cams = list_cameras(settings.video_backend)
+    if not cams:
+        print("No cameras found.")
+        return 0
+    if len(cams) == 1 or not settings.prompt:
+        print(f"Auto-selecting camera: {cams[0]}")
+        return cams[0]
+    print(f"Available cameras: {cams}")
+    try:
+        return int(input("Enter Video Camera Index: "))
+    except ValueError:
+        return cams[0]
+
+
+def select_audio_device(settings):
+    # PortAudio is only scanned to answer the prompt
+    if settings.audio_device is not None:
+        return None if settings.audio_device == 'default' else settings.audio_device
+    if settings.audio_backend != 'pyaudio' or not settings.prompt or not list_audio_devices():
+        return None
+    print("\nSelect the audio device ID for your Capture Card.")
+    user_audio_input = input("Enter Audio Device Index (Press Enter for Default): ")
+    try:
+        return int(user_audio_input) if user_audio_input.strip() else None
+    except ValueError:
+        return None
+
+
+def main(argv=None):
+    defaults = {name: getattr(Config, name) for name in OPTIONS if name not in ('camera', 'audio_device', 'prompt')}
+    settings = load_settings(defaults, argv, description="Remote Switch server")
+    print("--- DEVICE SETUP ---")
+    setup_started = time.perf_counter()
+    camera = select_camera(settings)
+    audio_device = select_audio_device(settings)
+    print(f"Device setup took {time.perf_counter() - setup_started:.2f}s")
+
+    config = Config(**{name: getattr(settings, name) for name in defaults}, camera=camera, audio_device=audio_device)
+    if config.web_backend not in async_app.WEB_BACKENDS:
+        raise ValueError(f"Unknown web backend '{config.web_backend}'. Choose from: {', '.join(async_app.WEB_BACKENDS)}")
+    if config.web_backend == 'aiohttp' and not async_app.aiohttp_available():
+        print("aiohttp is not installed (pip install aiohttp): using the flask web backend")
+        config.web_backend = 'flask'
+    if config.web_backend == 'aiohttp':
+        app = async_app.create_async_app(config)
+        try:
+            async_app.run(app, config.host, config.port)
+        finally:
+            stop_pipelines(app[async_app.PIPELINES])
+        return
+    app = create_app(config)
+    try:
+        # allow_unsafe_werkzeug=True helps prevents some dev-server related shutdowns.
+        app.socketio.run(app, host=config.host, port=config.port, debug=False, allow_unsafe_werkzeug=True)
+    finally:
+        stop_pipelines(app)
@@ -0,0 +1,126 @@
+"""Server configuration shared by every platform."""
+import sys
+
+
+class Config:
+    """Settings for create_app(). Override any of them as keywords: Config(camera=2)."""
+
+    # --- PICO ---
+    pico_ip = "192.168.1.xxx"  # CHANGE THIS TO YOUR PICO IP
+    pico_port = 4210
+
+    # --- WEB SERVER ---
+    host = '0.0.0.0'
+    port = 8801
+    # 'flask': a thread per viewer and Socket.IO client; 'aiohttp': every connection
+    # on one asyncio event loop, for many viewers (pip install aiohttp)
+    web_backend = 'flask'
+    # Controller input gets its own WebSocket port, away from video and Socket.IO
+    input_port = 8802
+    # Controller state goes to the Pico at most this often, the latest state on
+    # each tick; 1000 matches its 1 ms USB poll. 0 sends every message at once
+    input_send_hz = 1000
+    # 'legacy': an 8-byte packet per player, which every sketch.ino understands;
+    # 'batch': one sequenced datagram for every player, only once the Pico runs the
+    # current sketch.ino (older firmware silently drops every batch)
+    input_format = 'legacy'
+
+    # --- SPECTATOR RELAY ---
+    # Encoded frames and audio are published once here for spectator fan-out processes
+    # (python -m remote_switch.fanout): a Unix socket path or host:port. None turns it off
+    relay_address = None
+
+    # --- VIDEO CAPTURE ---
+    # 'v4l2' (Linux), 'dshow' (Windows), or without a device: 'synthetic' (test pattern)
+    # or 'file' (video_file on a loop)
+    video_backend = 'dshow' if sys.platform == 'win32' else 'v4l2'
+    # Device index or path
+    camera = 0
+    video_file = None
+    # 'scroll' (always moving), 'still' (exercises change detection), 'noise' (worst case for JPEG)
+    # or 'clock' (scroll with the capture time drawn in, for checking latency measurements)
+    synthetic_pattern = 'scroll'
+    # Synthetic and file sources: (width, height), None for the capture size, and frames per loop
+    source_size = None
+    source_loop_frames = 120
+    capture_fps = 60
+    # Keep reading this long after the last viewer leaves; the device then idles but stays open
+    capture_grace = 10.0
+    # Forward the card's own MJPEG untouched to renditions of the same size (V4L2 only).
+    # Frames heavier than this many bytes per pixel are re-encoded at the profile quality.
+    mjpeg_passthrough = True
+    passthrough_max_bytes_per_pixel = 0.25
+    # Worker processes for resize/encode (0 = encode in the capture thread)
+    encode_workers = 2
+    # Linux forks the workers before any thread exists; Windows can only spawn
+    encode_start_method = 'spawn' if sys.platform == 'win32' else 'fork'
+
+    # --- STREAM PROFILES ---
+    # name: (width, height, jpeg_quality). A rendition is only encoded while at
+    # least one viewer watches it; pick one with /video_feed?profile=<name>
+    profiles = {
+        'low': (256, 144, 45),
+        'medium': (512, 288, 25),
+        'high': (1280, 720, 60),
+    }
+    # /video_feed without a profile; /video_feed?profile=auto starts here and follows each viewer's link
+    default_profile = 'medium'
+    # Small send buffer for auto viewers so congestion shows up as blocked writes
+    # instead of seconds of queued frames
+    auto_send_buffer = 64 * 1024
+    # Frames whose thumbnail differs from the last sent one by less than this
+    # mean grey level are skipped (menus, pauses); one still goes out per interval
+    change_threshold = 1.5
+    keepalive_interval = 1.0
+
+    # --- H.264 ---
+    # This rendition is also offered as H.264 over a WebSocket on h264_port, for a
+    # fraction of MJPEG's bandwidth (needs PyAV with libx264). None turns it off.
+    h264_profile = 'high'
+    h264_port = 8803
+    h264_bitrate = 2_000_000
+    # libx264 speed/quality trade-off; slower presets cost CPU per frame
+    h264_preset = 'veryfast'
+    # Seconds between regular keyframes; joining viewers get one straight away
+    h264_keyframe_interval = 2.0
+
+    # --- AUDIO ---
+    # 'pyaudio', or without a device: 'synthetic' (test tone) or 'wav' (audio_file on a loop)
+    audio_backend = 'pyaudio'
+    # PortAudio input index; None for the system default
+    audio_device = None
+    audio_file = None
+    synthetic_tone_hz = 440
+    # HDMI capture cards run at 48000Hz; 44100Hz makes them resample and drift
+    audio_rate = 48000
+    # Capture reads this much at a time into a ring buffer...
+    capture_period_ms = 5
+    # ...and the sender emits packets of this length (also the Opus frame: 5, 10, 20, 40 or 60; others send PCM only)
+    audio_packet_ms = 20
+    # Audio the sender may fall behind by before it skips ahead
+    audio_ring_ms = 200
+
+    # --- SEND QUEUES ---
+    # A client on a slow link has at most this much media waiting for it; what arrives
+    # after that pushes out the oldest, so memory stays flat and what it plays stays recent.
+    # Audio packets per listener, on top of the few Engine.IO is sending (0: no limit)
+    audio_queue_packets = 10
+    # Frames a viewer may fall behind: 1 always sends the newest, more lets it catch
+    # up through older ones (smoother on a jittery link, a frame of latency each)
+    video_queue_frames = 1
+    # Bytes a media connection may hold unsent in the kernel (Linux and macOS), so a
+    # stalled link keeps stale media in the queues above, not in a socket buffer
+    # TCP has grown to megabytes. 0 leaves it to the OS
+    media_unsent_bytes = 16 * 1024
+
+    def __init__(self, **overrides):
+        for name, value in overrides.items():
+            if name.startswith('_') or not hasattr(Config, name) or isinstance(getattr(Config, name), property):
+                raise TypeError(f"Unknown setting '{name}'")
+            setattr(self, name, value)
+
+    @property
+    def capture_size(self):
+        # Capture at the largest rendition and scale down from there
+        return (max(w for w, h, q in self.profiles.values()),
+                max(h for w, h, q in self.profiles.values()))
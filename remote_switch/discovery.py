@@ -0,0 +1,105 @@
+"""Capture card discovery, probed in parallel and cached per device node."""
+import glob
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+CACHE_PATH = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+                          'remote-switch', 'devices.json')
+
+
+def probe(src, backend):
+    cap = cv2.VideoCapture(src, backend)
+    try:
+        return cap.isOpened()
+    finally:
+        cap.release()
+
+
+def probe_all(sources, backend):
+    """Opens every source at once; each open mostly waits on the driver."""
+    sources = list(sources)
+    if not sources:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(sources)) as pool:
+        return dict(zip(sources, pool.map(lambda src: probe(src, backend), sources)))
+
+
+def node_identity(path):
+    # Changes whenever udev recreates the node: replug, reboot, driver reload
+    st = os.stat(path)
+    return f'{st.st_rdev}:{st.st_ino}:{st.st_ctime_ns}'
+
+
+def is_metadata_node(index):
+    # UVC cards expose a second, metadata-only node (index 1) that never opens as a camera
+    try:
+        with open(f'/sys/class/video4linux/video{index}/index') as f:
+            return f.read().strip() != '0'
+    except OSError:
+        return False
+
+
+def load_cache(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(path, cache):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(cache, f, indent=1)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"Could not write device cache {path}: {e}")
+
+
+def list_v4l2_cameras(cache_path=CACHE_PATH):
+    """Indices of the /dev/videoN nodes that open as cameras.
+
+    A node whose identity matches the cache reuses the last result; only new
+    or recreated nodes are opened, all at the same time.
+    """
+    nodes = {}
+    for path in glob.glob('/dev/video*'):
+        match = re.fullmatch(r'/dev/video(\d+)', path)
+        if match:
+            nodes[path] = int(match.group(1))
+    cache = load_cache(cache_path)
+    fresh = {}
+    found = []
+    for path, index in sorted(nodes.items(), key=lambda item: item[1]):
+        try:
+            key = node_identity(path)
+        except OSError:
+            continue
+        entry = cache.get(path)
+        if entry and entry.get('key') == key:
+            fresh[path] = entry
+        elif is_metadata_node(index):
+            fresh[path] = {'key': key, 'ok': False}
+        else:
+            fresh[path] = {'key': key, 'ok': None}
+    results = probe_all([nodes[p] for p, e in fresh.items() if e['ok'] is None], cv2.CAP_V4L2)
+    for path, entry in fresh.items():
+        if entry['ok'] is None:
+            entry['ok'] = results[nodes[path]]
+        if entry['ok']:
+            found.append(nodes[path])
+    # Vanished nodes are dropped along with their entries
+    if fresh != cache:
+        save_cache(cache_path, fresh)
+    return sorted(found)
+
+
+def list_dshow_cameras(count=3):
+    """DirectShow indices that open; they have no stable identity to cache by."""
+    return sorted(i for i, ok in probe_all(range(count), cv2.CAP_DSHOW).items() if ok)
@@ -0,0 +1,129 @@
+"""JPEG encoding in worker processes, fed through shared memory."""
+import multiprocessing
+import signal
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from .frame_hub import multipart_frame
+
+
+def encode_renditions(frame, renditions, flags=cv2.IMREAD_COLOR, stamp=None):
+    """Resizes and encodes one frame into [(name, multipart part, encode seconds)].
+
+    frame is either decoded BGR (3 dims) or a raw JPEG bitstream, which is
+    decoded first with the given cv2.imdecode flags. stamp goes into every
+    part's headers (see multipart_frame()).
+    """
+    if frame.ndim != 3:
+        frame = cv2.imdecode(frame, flags)
+        if frame is None:
+            return []
+    parts = []
+    for name, width, height, quality in renditions:
+        started = time.perf_counter()
+        if frame.shape[1] != width or frame.shape[0] != height:
+            scaled = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        else:
+            scaled = frame
+        success, buffer = cv2.imencode('.jpg', scaled, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if success:
+            parts.append((name, multipart_frame(buffer, stamp), time.perf_counter() - started))
+    return parts
+
+
+def _encode_worker(shm_name, slot_bytes, tasks, results):
+    # Ctrl+C reaches the whole process group; the server stops us through close()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # One cv2 thread per process: the pool is the parallelism
+    cv2.setNumThreads(1)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            job, slot, shape, flags, renditions, stamp = task
+            view = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=slot * slot_bytes)
+            parts = encode_renditions(view, renditions, flags, stamp)
+            # The slot can be reused as soon as the view is gone
+            del view
+            results.put((job, slot, parts))
+    finally:
+        shm.close()
+
+
+class EncoderPool:
+    """Resizes and encodes renditions in worker processes.
+
+    submit() copies the frame into a free shared-memory slot and returns at
+    once; a collector thread publishes the workers' framed JPEGs. When every
+    slot is busy the frame is dropped, so capture never waits on encoding.
+    """
+
+    def __init__(self, workers, slot_bytes, publish, context=None):
+        ctx = multiprocessing.get_context(context)
+        self.publish = publish
+        self.slot_bytes = slot_bytes
+        self.shm = shared_memory.SharedMemory(create=True, size=slot_bytes * workers * 2)
+        self.lock = threading.Lock()
+        self.free = list(range(workers * 2))
+        self.job = 0
+        # Workers can finish out of order; never publish an older frame over a newer one
+        self.latest = {}
+        self.dropped = 0
+
+        self.tasks = ctx.Queue()
+        self.results = ctx.Queue()
+        self.procs = [
+            ctx.Process(target=_encode_worker, args=(self.shm.name, slot_bytes, self.tasks, self.results),
+                        name='video-encode', daemon=True)
+            for _ in range(workers)
+        ]
+        for p in self.procs:
+            p.start()
+        self.thread = threading.Thread(target=self.collect, name='video-encode', daemon=True)
+        self.thread.start()
+
+    def submit(self, frame, renditions, flags=cv2.IMREAD_COLOR, stamp=None):
+        """Queues renditions [(name, width, height, quality)]; False if the frame was dropped."""
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"Frame of {frame.nbytes} bytes does not fit a {self.slot_bytes} byte slot")
+        with self.lock:
+            if not self.free:
+                self.dropped += 1
+                return False
+            slot = self.free.pop()
+            self.job += 1
+            job = self.job
+        dst = np.ndarray(frame.shape, dtype=np.uint8, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+        dst[...] = frame
+        del dst
+        self.tasks.put((job, slot, frame.shape, flags, renditions, stamp))
+        return True
+
+    def collect(self):
+        while True:
+            item = self.results.get()
+            if item is None:
+                break
+            job, slot, parts = item
+            with self.lock:
+                self.free.append(slot)
+            for name, part, seconds in parts:
+                if job > self.latest.get(name, 0):
+                    self.latest[name] = job
+                    self.publish(name, part, seconds)
+
+    def close(self):
+        for _ in self.procs:
+            self.tasks.put(None)
+        for p in self.procs:
+            p.join(timeout=2)
+        self.results.put(None)
+        self.thread.join(timeout=2)
+        self.shm.close()
+        self.shm.unlink()
@@ -0,0 +1,189 @@
+"""Spectator fan-out: serves a server's stream to view-only browsers from a process of its own.
+
+    python -m remote_switch --relay-address /tmp/remote-switch.sock ...
+    python -m remote_switch.fanout --relay /tmp/remote-switch.sock --port 8811
+
+It serves the same page, /video_feed, audio and /metrics as the server,
+without controller input, from what the server's relay sends (see relay.py):
+no device, no encoding, no state of its own. Run one per spare core, each
+on its own port, and send spectators there; players stay on the server.
+It lowers its own CPU priority (--nice), so where it shares cores with the
+server, spectators slow down before controller input does.
+
+Needs aiohttp (pip install aiohttp).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import types
+
+import socketio
+
+from .async_app import ThreadsafeEmitter, aiohttp_available, web, web_app
+from .audio import AUDIO_EVENTS
+from .config import Config
+from .frame_hub import FrameHub
+from .metrics import AUDIO_LISTENERS, AUDIO_PACKETS, REGISTRY, VIDEO_VIEWERS
+from .relay import AUDIO, DEMAND, HELLO, VIDEO, open_relay, read_message, write_message
+
+# Spectators' demand is checked this often and sent to the server when it changed
+DEMAND_INTERVAL = 0.02
+RECONNECT_DELAY = 1.0
+
+
+class RelayCapture:
+    # The server's capture follows our demand; viewers here have nothing to start
+    def acquire(self):
+        pass
+
+    def release(self):
+        pass
+
+
+class RelayVideo:
+    """Stands in for VideoStreamer: a hub per rendition, fed by the relay."""
+
+    def __init__(self, config):
+        self.config = config
+        self.profiles = config.profiles
+        self.hubs = {name: FrameHub(config.video_queue_frames) for name in self.profiles}
+        self.capture = RelayCapture()
+        self.viewer_ids = itertools.count(1)
+        REGISTRY.on_collect(self.collect_metrics)
+
+    def wanted(self):
+        return sorted(name for name, hub in self.hubs.items() if hub.viewers)
+
+    def collect_metrics(self):
+        for name, hub in self.hubs.items():
+            VIDEO_VIEWERS.set(hub.viewers, profile=name)
+
+
+class RelayAudio:
+    """Stands in for AudioStreamer: spectators' subscriptions, and packets emitted as they arrive."""
+
+    def __init__(self, sio, codecs):
+        self.sio = sio
+        self.codecs = codecs
+        # Only touched from the event loop
+        self.listeners = {}
+        REGISTRY.on_collect(self.collect_metrics)
+
+    def subscribe(self, sid, codec):
+        self.listeners[sid] = codec
+
+    def unsubscribe(self, sid):
+        self.listeners.pop(sid, None)
+
+    def wanted(self):
+        return sorted(set(self.listeners.values()))
+
+    def emit(self, codec, packet):
+        self.sio.emit(AUDIO_EVENTS[codec], packet, to='audio:' + codec)
+        AUDIO_PACKETS.inc(codec=codec)
+
+    def collect_metrics(self):
+        codecs = list(self.listeners.values())
+        for codec in self.codecs:
+            AUDIO_LISTENERS.set(codecs.count(codec), codec=codec)
+
+
+async def connect(address):
+    """Returns (reader, writer, hello) for a new relay connection."""
+    reader, writer = await open_relay(address)
+    kind, _, payload = await read_message(reader)
+    if kind != HELLO:
+        writer.close()
+        raise ConnectionError("Not a relay")
+    return reader, writer, json.loads(payload)
+
+
+async def connect_retrying(address):
+    """connect(), tried again every RECONNECT_DELAY until the server is there."""
+    while True:
+        try:
+            return await connect(address)
+        except (asyncio.IncompleteReadError, OSError):
+            await asyncio.sleep(RECONNECT_DELAY)
+
+
+async def send_demand(writer, pipelines):
+    sent = None
+    while True:
+        demand = {'video': pipelines.streamer.wanted(), 'audio': pipelines.audio_streamer.wanted()}
+        if demand != sent:
+            write_message(writer, DEMAND, 0, json.dumps(demand).encode())
+            sent = demand
+        await asyncio.sleep(DEMAND_INTERVAL)
+
+
+async def relay_session(reader, writer, pipelines):
+    """Feeds the hubs and audio from one relay connection until it drops."""
+    hubs = list(pipelines.streamer.hubs.values())
+    audio = pipelines.audio_streamer
+    demand = asyncio.create_task(send_demand(writer, pipelines))
+    try:
+        while True:
+            kind, channel, payload = await read_message(reader)
+            if kind == VIDEO:
+                hubs[channel].publish(payload)
+            elif kind == AUDIO:
+                audio.emit(audio.codecs[channel], payload)
+    finally:
+        demand.cancel()
+        writer.close()
+
+
+async def serve(relay, host, port):
+    # Started before the server, or while it restarts: wait for it like a reconnect does
+    print(f"Connecting to relay {relay}...")
+    reader, writer, hello = await connect_retrying(relay)
+    config = Config(profiles={name: tuple(profile) for name, profile in hello['profiles'].items()},
+                    default_profile=hello['default_profile'], capture_fps=hello['capture_fps'],
+                    audio_rate=hello['audio_rate'], audio_packet_ms=hello['audio_packet_ms'],
+                    audio_queue_packets=hello['audio_queue_packets'], video_queue_frames=hello['video_queue_frames'],
+                    media_unsent_bytes=hello['media_unsent_bytes'], host=host, port=port)
+    sio = socketio.AsyncServer(async_mode='aiohttp', cors_allowed_origins='*')
+    emitter = ThreadsafeEmitter(sio, config.audio_queue_packets)
+    pipelines = types.SimpleNamespace(socketio=sio, streamer=RelayVideo(config),
+                                      audio_streamer=RelayAudio(emitter, hello['audio_codecs']),
+                                      h264_streamer=None, input_relay=None, input_scheduler=None)
+    runner = web.AppRunner(web_app(pipelines, config, emitter), access_log=None, shutdown_timeout=1.0)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+        print(f"Serving spectators on {host}:{port} from {relay}")
+        while True:
+            try:
+                await relay_session(reader, writer, pipelines)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                print("Relay lost, reconnecting...")
+            # Spectators stay connected and pick up where the stream resumes
+            await asyncio.sleep(RECONNECT_DELAY)
+            reader, writer, _ = await connect_retrying(relay)
+    finally:
+        await runner.cleanup()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Remote Switch spectator fan-out")
+    parser.add_argument('--relay', required=True, help="the server's --relay-address")
+    parser.add_argument('--host', default=Config.host, help='address to serve spectators on')
+    parser.add_argument('--port', type=int, default=8811, help='port to serve spectators on')
+    parser.add_argument('--nice', type=int, default=10, help='CPU priority below the server (Unix; 0 for none)')
+    args = parser.parse_args(argv)
+    if not aiohttp_available():
+        sys.exit("The fan-out needs aiohttp (pip install aiohttp)")
+    if args.nice and hasattr(os, 'nice'):
+        os.nice(args.nice)
+    try:
+        asyncio.run(serve(args.relay, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
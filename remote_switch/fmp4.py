@@ -0,0 +1,93 @@
+"""Just enough fragmented MP4 for one live H.264 track, as Media Source Extensions play it.
+
+An init segment (ftyp + moov) describes the track; every frame then goes
+out as its own fragment (moof + mdat) the moment it is encoded. ffmpeg's mp4
+muxer holds each fragment back until the next frame arrives, which is one
+frame of latency this avoids.
+"""
+import struct
+
+TIMESCALE = 90000
+TRACK_ID = 1
+# trun sample flags: sync sample / depends on others and not a sync sample
+KEY_SAMPLE = 0x02000000
+DELTA_SAMPLE = 0x01010000
+# Unity transform for mvhd and tkhd
+MATRIX = struct.pack('>9I', 0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x40000000)
+# NAL unit types
+SPS, PPS, AUD = 7, 8, 9
+
+
+def box(kind, *payload):
+    data = b''.join(payload)
+    return struct.pack('>I', 8 + len(data)) + kind + data
+
+
+def full_box(kind, version, flags, *payload):
+    return box(kind, struct.pack('>I', version << 24 | flags), *payload)
+
+
+def split_nals(annexb):
+    """Splits an Annex B byte stream (start-code delimited) into NAL units."""
+    nals = []
+    for chunk in annexb.split(b'\x00\x00\x01'):
+        # A NAL unit never ends in a zero byte: these belong to a 4-byte start code
+        chunk = chunk.rstrip(b'\x00')
+        if chunk:
+            nals.append(chunk)
+    return nals
+
+
+def to_sample(nals):
+    """Length-prefixes the picture's NAL units; parameter sets live in the init segment."""
+    return b''.join(struct.pack('>I', len(nal)) + nal for nal in nals if nal[0] & 0x1F not in (SPS, PPS, AUD))
+
+
+def codec_string(sps):
+    """The MSE codecs value, e.g. avc1.64001f: profile, constraint flags and level from the SPS."""
+    return f'avc1.{sps[1]:02x}{sps[2]:02x}{sps[3]:02x}'
+
+
+def avc_config(sps, pps):
+    """AVCDecoderConfigurationRecord (the avcC box payload), 4-byte NAL lengths."""
+    config = (bytes((1, sps[1], sps[2], sps[3], 0xFF, 0xE1)) + struct.pack('>H', len(sps)) + sps
+              + b'\x01' + struct.pack('>H', len(pps)) + pps)
+    if sps[1] in (100, 110, 122, 144):
+        # High profiles: 4:2:0, 8-bit, no SPS extensions
+        config += b'\xfd\xf8\xf8\x00'
+    return config
+
+
+def init_segment(width, height, sps, pps):
+    ftyp = box(b'ftyp', b'isom', struct.pack('>I', 0x200), b'isomiso6avc1mp41')
+    mvhd = full_box(b'mvhd', 0, 0, struct.pack('>IIIIIH', 0, 0, TIMESCALE, 0, 0x10000, 0x100),
+                    bytes(10), MATRIX, bytes(24), struct.pack('>I', TRACK_ID + 1))
+    tkhd = full_box(b'tkhd', 0, 3, struct.pack('>IIIII', 0, 0, TRACK_ID, 0, 0), bytes(8),
+                    struct.pack('>hhhH', 0, 0, 0, 0), MATRIX, struct.pack('>II', width << 16, height << 16))
+    mdhd = full_box(b'mdhd', 0, 0, struct.pack('>IIIIHH', 0, 0, TIMESCALE, 0, 0x55C4, 0))
+    hdlr = full_box(b'hdlr', 0, 0, bytes(4), b'vide', bytes(12), b'VideoHandler\x00')
+    avc1 = box(b'avc1', bytes(6), struct.pack('>H', 1), bytes(16), struct.pack('>HHIIIH', width, height,
+               0x480000, 0x480000, 0, 1), bytes(32), struct.pack('>Hh', 0x18, -1), box(b'avcC', avc_config(sps, pps)))
+    stbl = box(b'stbl', full_box(b'stsd', 0, 0, struct.pack('>I', 1), avc1),
+               full_box(b'stts', 0, 0, bytes(4)), full_box(b'stsc', 0, 0, bytes(4)),
+               full_box(b'stsz', 0, 0, bytes(8)), full_box(b'stco', 0, 0, bytes(4)))
+    minf = box(b'minf', full_box(b'vmhd', 0, 1, bytes(8)),
+               box(b'dinf', full_box(b'dref', 0, 0, struct.pack('>I', 1), full_box(b'url ', 0, 1))), stbl)
+    trak = box(b'trak', tkhd, box(b'mdia', mdhd, hdlr, minf))
+    mvex = box(b'mvex', full_box(b'trex', 0, 0, struct.pack('>IIIII', TRACK_ID, 1, 0, 0, 0)))
+    return ftyp + box(b'moov', mvhd, trak, mvex)
+
+
+def fragment(seq, decode_time, duration, sample, keyframe):
+    """One frame as moof + mdat; decode_time and duration are in TIMESCALE units."""
+
+    def moof(data_offset):
+        trun = full_box(b'trun', 0, 0x000701, struct.pack('>IiIII', 1, data_offset, duration, len(sample),
+                                                          KEY_SAMPLE if keyframe else DELTA_SAMPLE))
+        # default-base-is-moof: the data offset counts from the start of this moof
+        traf = box(b'traf', full_box(b'tfhd', 0, 0x020000, struct.pack('>I', TRACK_ID)),
+                   full_box(b'tfdt', 1, 0, struct.pack('>Q', decode_time)), trun)
+        return box(b'moof', full_box(b'mfhd', 0, 0, struct.pack('>I', seq)), traf)
+
+    size = len(moof(0))
+    return moof(size + 8) + box(b'mdat', sample)
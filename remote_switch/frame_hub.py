@@ -0,0 +1,137 @@
+"""Broadcast hub shared by every /video_feed viewer."""
+import collections
+import threading
+
+# Every multipart part starts with this; the headers after it vary per frame
+FRAME_BOUNDARY = b'--frame\r\n'
+# The headers of a part without a stamp
+FRAME_HEADER = FRAME_BOUNDARY + b'Content-Type: image/jpeg\r\n\r\n'
+
+
+def multipart_frame(jpeg, stamp=None):
+    """Wraps an encoded JPEG (bytes or the cv2.imencode array) in its multipart part.
+
+    stamp is (frame number, capture time in ms since the epoch), sent as
+    X-Frame and X-Capture-Time headers for pages measuring latency. This is
+    the only copy a frame gets: viewers yield the result as-is.
+    """
+    if stamp is None:
+        return b''.join((FRAME_HEADER, jpeg, b'\r\n'))
+    header = (f'--frame\r\nContent-Type: image/jpeg\r\nContent-Length: {memoryview(jpeg).nbytes}\r\n'
+              f'X-Frame: {stamp[0]}\r\nX-Capture-Time: {stamp[1]:.3f}\r\n\r\n')
+    return b''.join((header.encode(), jpeg, b'\r\n'))
+
+
+def part_jpeg(part):
+    """The JPEG inside a multipart part, without copying it."""
+    return memoryview(part)[part.index(b'\r\n\r\n') + 4:-2]
+
+
+def jpeg_size(jpeg):
+    """Returns (width, height) from a JPEG's SOF marker, or None if it has none.
+
+    Only walks the segment headers, so it is cheap enough to run per frame.
+    """
+    data = memoryview(jpeg).cast('B')
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            i += 1
+            continue
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height = (data[i + 5] << 8) | data[i + 6]
+            width = (data[i + 7] << 8) | data[i + 8]
+            return width, height
+        if marker == 0xDA:
+            # Start of scan before any frame header
+            return None
+        i += 2 + ((data[i + 2] << 8) | data[i + 3])
+    return None
+
+
+class FrameHub:
+    """Keeps the newest encoded frame stamped with a sequence number.
+
+    Viewers remember the last sequence they sent and wait for a newer one,
+    so a viewer picking up a frame never hides it from the others. The last
+    depth frames are kept: a viewer that fell behind gets the oldest of them
+    it has not sent, and anything older is dropped for it.
+    """
+
+    def __init__(self, depth=1):
+        self.cond = threading.Condition()
+        self.seq = 0
+        self.frame = None
+        # (seq, frame), oldest first
+        self.recent = collections.deque(maxlen=depth)
+        self.viewers = 0
+        # Set when someone new is waiting, so the next frame is not skipped as static
+        self.fresh_viewer = False
+        # Called from the publishing thread after every frame (see HubWaiter)
+        self.listeners = []
+
+    def subscribe(self):
+        with self.cond:
+            self.viewers += 1
+            self.fresh_viewer = True
+
+    def unsubscribe(self):
+        with self.cond:
+            self.viewers -= 1
+
+    def publish(self, frame):
+        with self.cond:
+            self.seq += 1
+            self.frame = frame
+            self.recent.append((self.seq, frame))
+            self.fresh_viewer = False
+            self.cond.notify_all()
+            seq = self.seq
+        for listener in self.listeners:
+            listener()
+        return seq
+
+    def following(self, last_seq):
+        """The oldest kept (seq, frame) newer than last_seq, or the newest if there is none."""
+        with self.cond:
+            for seq, frame in self.recent:
+                if seq > last_seq:
+                    return seq, frame
+            return self.seq, self.frame
+
+    def wait_for(self, last_seq, timeout=1.0):
+        """Returns the oldest kept (seq, frame) newer than last_seq, or (last_seq, None) on timeout."""
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.seq > last_seq, timeout):
+                return last_seq, None
+        return self.following(last_seq)
+
+
+class HubWaiter:
+    """wait_for() for coroutines: every viewer on one event loop waits on a FrameHub without a thread each.
+
+    The hub wakes the loop once per frame, however many viewers are waiting.
+    """
+
+    def __init__(self, hub, loop):
+        self.hub = hub
+        self.loop = loop
+        self.changed = loop.create_future()
+        hub.listeners.append(lambda: loop.call_soon_threadsafe(self.wake))
+
+    def wake(self):
+        # A fresh future per frame, so waiters never miss one between awaits
+        changed, self.changed = self.changed, self.loop.create_future()
+        changed.set_result(None)
+
+    async def wait_for(self, last_seq):
+        """Returns the oldest kept (seq, frame) newer than last_seq, waiting as long as it takes."""
+        if self.hub.seq <= last_seq:
+            await self.changed
+        return self.hub.following(last_seq)
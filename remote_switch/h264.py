@@ -0,0 +1,254 @@
+"""H.264 video engine: one rendition as fragmented MP4 over a WebSocket, for Media Source Extensions.
+
+MJPEG sends every frame whole; H.264 sends mostly the difference from the
+last one, so the same picture costs a fraction of the bandwidth. The
+encoder watches a rendition hub like any /video_feed viewer, so capture,
+scaling and change detection are shared with MJPEG, and it only runs while
+someone is connected.
+
+Needs PyAV with libx264 (pip install av); without it only MJPEG is served.
+"""
+import asyncio
+import collections
+import json
+import threading
+import time
+from fractions import Fraction
+
+import cv2
+import numpy as np
+from websockets.asyncio.server import serve
+
+try:
+    import av
+except ImportError:
+    av = None
+
+from . import fmp4
+from .frame_hub import part_jpeg
+from .metrics import H264_BYTES, H264_ENCODE, H264_FRAMES, H264_RESYNCS, H264_VIEWERS
+from .send_queue import limit_unsent
+
+# Keyframes forced for joining or recovering viewers come at most this often
+MIN_FORCED_KEYFRAME_INTERVAL = 0.2
+# A viewer this many frames behind drops its backlog and restarts at a keyframe
+MAX_QUEUED_FRAMES = 8
+
+
+def h264_available():
+    return av is not None and 'libx264' in av.codecs_available
+
+
+class H264Encoder:
+    """libx264 tuned for latency: zerolatency means no B-frames, no lookahead and no frame threading."""
+
+    def __init__(self, width, height, fps, bitrate, preset='veryfast', keyframe_interval=2.0):
+        self.codec = av.CodecContext.create('libx264', 'w')
+        self.codec.width = width
+        self.codec.height = height
+        self.codec.pix_fmt = 'yuv420p'
+        self.codec.time_base = Fraction(1, 1000)
+        self.codec.framerate = Fraction(fps)
+        self.codec.bit_rate = bitrate
+        self.codec.gop_size = max(1, int(fps * keyframe_interval))
+        # A small VBV buffer keeps keyframes from bursting far above the bitrate
+        self.codec.options = {'preset': preset, 'tune': 'zerolatency', 'bf': '0',
+                              'maxrate': str(bitrate), 'bufsize': str(bitrate // 2)}
+        self.started = time.perf_counter()
+        self.pts = -1
+        self.sps = None
+        self.pps = None
+
+    def encode(self, bgr, keyframe=False):
+        """Returns [(sample, is_keyframe)] for what this frame completes, samples ready for fmp4."""
+        frame = av.VideoFrame.from_ndarray(bgr, format='bgr24').reformat(format='yuv420p')
+        # Wall-clock timestamps, strictly increasing as x264 requires
+        self.pts = max(self.pts + 1, int((time.perf_counter() - self.started) * 1000))
+        frame.pts = self.pts
+        if keyframe:
+            frame.pict_type = av.video.frame.PictureType.I
+        samples = []
+        for packet in self.codec.encode(frame):
+            nals = fmp4.split_nals(bytes(packet))
+            for nal in nals:
+                if nal[0] & 0x1F == fmp4.SPS:
+                    self.sps = nal
+                elif nal[0] & 0x1F == fmp4.PPS:
+                    self.pps = nal
+            samples.append((fmp4.to_sample(nals), packet.is_keyframe))
+        return samples
+
+
+class H264Client:
+    def __init__(self, websocket):
+        self.websocket = websocket
+        # (message, is_init) still to send
+        self.queue = collections.deque()
+        self.wake = asyncio.Event()
+        # Deltas are useless until a keyframe has gone out
+        self.synced = False
+        self.init_queued = False
+        self.init_sent = False
+
+    def push(self, message, is_init=False):
+        self.queue.append((message, is_init))
+        self.wake.set()
+
+    async def send_loop(self):
+        while True:
+            while not self.queue:
+                self.wake.clear()
+                await self.wake.wait()
+            message, is_init = self.queue.popleft()
+            await self.websocket.send(message)
+            self.init_sent = self.init_sent or is_init
+
+
+class H264Streamer:
+    """Encodes config.h264_profile while anyone watches and serves it on its own WebSocket port.
+
+    A viewer gets a JSON text message with the MSE codec string, the init
+    segment, then one fragment per frame from the next keyframe; one is
+    forced when a viewer joins so playback starts at once. A viewer that
+    falls MAX_QUEUED_FRAMES behind drops its backlog and resyncs the same way.
+    """
+
+    def __init__(self, video_streamer, config, host='0.0.0.0', port=8803):
+        self.video = video_streamer
+        self.config = config
+        self.profile = config.h264_profile
+        width, height, _ = config.profiles[self.profile]
+        self.size = (width, height)
+        self.host = host
+        self.port = port
+        self.encoder = None
+        self.init = None
+        self.codec = None
+        self.seq = 0
+        self.decode_time = 0
+        self.duration = fmp4.TIMESCALE // config.capture_fps
+        self.keyframe_wanted = False
+        self.last_forced = 0.0
+        self.clients = set()
+        # Set while anyone is connected; the encoder only watches its rendition then
+        self.wanted = threading.Event()
+        self.ready = threading.Event()
+        self.loop = None
+        self.running = True
+
+        self.server_thread = threading.Thread(target=self.run_server, name='h264-server', daemon=True)
+        self.server_thread.start()
+        self.thread = threading.Thread(target=self.run, name='h264-encode', daemon=True)
+        self.thread.start()
+
+    # --- WebSocket side (asyncio thread) ---
+
+    def run_server(self):
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        async with serve(self.handle, self.host, self.port, compression=None) as server:
+            self.port = server.sockets[0].getsockname()[1]
+            self.ready.set()
+            await server.serve_forever()
+
+    async def handle(self, websocket):
+        limit_unsent(websocket.transport.get_extra_info('socket'), self.config.media_unsent_bytes)
+        client = H264Client(websocket)
+        self.clients.add(client)
+        H264_VIEWERS.set(len(self.clients))
+        self.keyframe_wanted = True
+        self.wanted.set()
+        sender = asyncio.create_task(client.send_loop())
+        try:
+            # Viewers only listen; anything they send is ignored
+            async for _ in websocket:
+                pass
+        finally:
+            sender.cancel()
+            self.clients.discard(client)
+            H264_VIEWERS.set(len(self.clients))
+            if not self.clients:
+                self.wanted.clear()
+
+    def broadcast(self, data, keyframe):
+        for client in self.clients:
+            if not client.synced:
+                if not keyframe:
+                    continue
+                if not client.init_queued:
+                    client.push(json.dumps({'codec': f'video/mp4; codecs="{self.codec}"'}), True)
+                    client.push(self.init, True)
+                    client.init_queued = True
+                client.synced = True
+            elif len(client.queue) >= MAX_QUEUED_FRAMES:
+                # Too far behind to catch up frame by frame: drop the backlog, wait for a keyframe
+                client.queue = collections.deque(item for item in client.queue if item[1])
+                client.init_queued = client.init_sent or bool(client.queue)
+                client.synced = False
+                self.keyframe_wanted = True
+                H264_RESYNCS.inc()
+                continue
+            client.push(data)
+
+    # --- Encoder side ---
+
+    def run(self):
+        while self.running:
+            self.wanted.wait()
+            hub = self.video.hubs[self.profile]
+            hub.subscribe()
+            self.video.capture.acquire()
+            try:
+                # Start from the next encode, not whatever frame the hub still holds
+                last_seq = hub.seq
+                while self.running and self.wanted.is_set():
+                    last_seq, part = self.video.get_frame(self.profile, last_seq)
+                    if part:
+                        self.encode(part)
+            except Exception as e:
+                # Start over with a fresh encoder rather than leave viewers on a dead stream
+                print(f"H.264 Error: {e}")
+                self.encoder = None
+                time.sleep(1.0)
+            finally:
+                hub.unsubscribe()
+                self.video.capture.release()
+
+    def encode(self, part):
+        started = time.perf_counter()
+        bgr = cv2.imdecode(np.frombuffer(part_jpeg(part), np.uint8), cv2.IMREAD_COLOR)
+        if bgr is None:
+            return
+        if (bgr.shape[1], bgr.shape[0]) != self.size:
+            bgr = cv2.resize(bgr, self.size, interpolation=cv2.INTER_AREA)
+        if self.encoder is None:
+            self.encoder = H264Encoder(*self.size, self.config.capture_fps, self.config.h264_bitrate,
+                                       self.config.h264_preset, self.config.h264_keyframe_interval)
+            self.init = None
+        force = self.keyframe_wanted and started - self.last_forced >= MIN_FORCED_KEYFRAME_INTERVAL
+        if force:
+            self.keyframe_wanted = False
+            self.last_forced = started
+        for sample, keyframe in self.encoder.encode(bgr, force):
+            if keyframe and self.init is None:
+                self.init = fmp4.init_segment(*self.size, self.encoder.sps, self.encoder.pps)
+                self.codec = fmp4.codec_string(self.encoder.sps)
+            if self.init is None:
+                continue
+            self.seq += 1
+            data = fmp4.fragment(self.seq, self.decode_time, self.duration, sample, keyframe)
+            # A steady timeline: frames skipped as unchanged just leave the player waiting at the live edge
+            self.decode_time += self.duration
+            H264_FRAMES.inc(type='key' if keyframe else 'delta')
+            H264_BYTES.inc(len(data))
+            self.loop.call_soon_threadsafe(self.broadcast, data, keyframe)
+        H264_ENCODE.observe(time.perf_counter() - started)
+
+    def close(self):
+        self.running = False
+        self.wanted.set()
+        # x264 must not be mid-frame when the interpreter goes away
+        self.thread.join(timeout=2.0)
+        self.encoder = None
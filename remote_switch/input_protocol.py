@@ -0,0 +1,91 @@
+"""Controller packets forwarded to the Pico (PacketData in sketch.ino)."""
+import struct
+
+# [PlayerID (1B) | Buttons (2B) | Hat (1B) | LX (1B) | LY (1B) | RX (1B) | RY (1B)]
+PACKET = struct.Struct('<BHBBBBB')
+# Optional trailer from the page: [Seq (2B) | Client time, ms since epoch (8B double)]
+TRAILER = struct.Struct('<Hd')
+MESSAGE_SIZE = PACKET.size + TRAILER.size
+PLAYERS = (1, 2)
+
+# Batched datagram to the Pico: [Magic (1B) | Version (1B) | Seq (2B) | Count (1B)]
+# followed by Count x PacketData. A bare 8-byte PacketData is still accepted.
+BATCH_HEADER = struct.Struct('<BBHB')
+BATCH_MAGIC = 0xB5
+BATCH_VERSION = 1
+MAX_BATCH = 8
+# TIMEOUT_MS in sketch.ino: a player's controller is released after this much silence
+PICO_TIMEOUT = 0.5
+
+
+def split_message(data):
+    """Splits a binary input message into (packet, seq, client_ms).
+
+    Returns None for anything that is not one. seq and client_ms are None
+    for a bare 8-byte packet. Only the packet goes on to the Pico.
+    """
+    if not isinstance(data, bytes):
+        return None
+    if len(data) == PACKET.size:
+        packet, seq, client_ms = data, None, None
+    elif len(data) == MESSAGE_SIZE:
+        packet = data[:PACKET.size]
+        seq, client_ms = TRAILER.unpack_from(data, PACKET.size)
+    else:
+        return None
+    if packet[0] not in PLAYERS:
+        return None
+    return packet, seq, client_ms
+
+
+def pack_legacy(data):
+    """Builds a packet from the old {player, buttons, lx, ly, rx, ry} message."""
+    pid = int(data.get('player', 1))
+    return PACKET.pack(pid, data['buttons'], 8, data['lx'], data['ly'], data['rx'], data['ry'])
+
+
+def pack_batch(seq, packets):
+    """One datagram carrying the PacketData of every player in packets."""
+    if len(packets) > MAX_BATCH:
+        raise ValueError(f"At most {MAX_BATCH} players fit a batch, got {len(packets)}")
+    return BATCH_HEADER.pack(BATCH_MAGIC, BATCH_VERSION, seq & 0xFFFF, len(packets)) + b''.join(packets)
+
+
+def unpack_datagram(data):
+    """Reference decoder for what sketch.ino receives: (seq, [packet, ...]).
+
+    seq is None for a legacy PacketData. Returns None for a datagram the
+    Pico drops: too short, another version or a count that does not match
+    its length.
+    """
+    if len(data) >= BATCH_HEADER.size and data[0] == BATCH_MAGIC:
+        _, version, seq, count = BATCH_HEADER.unpack_from(data)
+        if version != BATCH_VERSION or count > MAX_BATCH or len(data) != BATCH_HEADER.size + count * PACKET.size:
+            return None
+        return seq, [data[BATCH_HEADER.size + i * PACKET.size:][:PACKET.size] for i in range(count)]
+    if len(data) >= PACKET.size:
+        return None, [data[:PACKET.size]]
+    return None
+
+
+class SequenceFilter:
+    """The Pico's check on batch sequence numbers.
+
+    Drops duplicates and datagrams older than the last one accepted. After
+    PICO_TIMEOUT of silence anything goes, so a restarted server that counts
+    from 0 again is not locked out.
+    """
+
+    def __init__(self, timeout=PICO_TIMEOUT):
+        self.timeout = timeout
+        self.last_seq = None
+        self.last_time = 0.0
+
+    def accept(self, seq, now):
+        if self.last_seq is not None and now - self.last_time < self.timeout:
+            ahead = (seq - self.last_seq) & 0xFFFF
+            if ahead == 0 or ahead >= 0x8000:
+                return False
+        self.last_seq = seq
+        self.last_time = now
+        return True
@@ -0,0 +1,44 @@
+"""Low-latency input relay: browser WebSocket straight to the Pico's UDP port.
+
+Runs its own asyncio loop on its own thread and port, so controller packets
+never queue behind MJPEG generators or Socket.IO traffic.
+"""
+import asyncio
+import threading
+import time
+
+from websockets.asyncio.server import serve
+
+from .input_protocol import MESSAGE_SIZE, split_message
+from .metrics import INPUT_TRACKER
+
+
+class InputRelay:
+    def __init__(self, scheduler, host='0.0.0.0', port=8802):
+        # Packets go out through the InputScheduler shared with the Socket.IO path
+        self.scheduler = scheduler
+        self.host = host
+        self.port = port
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='input-relay', daemon=True)
+        self.thread.start()
+
+    def run(self):
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        # No compression and tiny frames: every message is one input packet
+        async with serve(self.handle, self.host, self.port, compression=None, max_size=MESSAGE_SIZE) as server:
+            self.port = server.sockets[0].getsockname()[1]
+            self.ready.set()
+            await server.serve_forever()
+
+    async def handle(self, websocket):
+        async for message in websocket:
+            arrived = time.perf_counter()
+            parsed = split_message(message)
+            if parsed is None:
+                continue
+            packet, seq, client_ms = parsed
+            INPUT_TRACKER.received(packet[0], seq, client_ms, arrived)
+            self.scheduler.submit(packet, 'relay', arrived)
@@ -0,0 +1,100 @@
+"""Paces controller packets to the Pico on a fixed tick.
+
+Browsers send in bursts (requestAnimationFrame jitter, a tab regaining
+focus). Forwarding each message as it arrives hands those bursts to the
+Pico, whose loop1() then drains several packets of which only the last one
+matters. Instead the latest state of each player is held and sent on the
+next tick, so the Pico gets at most one datagram per tick.
+"""
+import threading
+import time
+
+from .input_protocol import PICO_TIMEOUT, pack_batch
+from .metrics import INPUT_COALESCED, INPUT_DATAGRAMS, INPUT_TRACKER
+
+FORMATS = ('batch', 'legacy')
+
+
+class InputScheduler:
+    """Sends the latest packet of each player at most rate times a second.
+
+    Ticks sit on a fixed grid and only run while a packet is waiting, so
+    an idle controller costs nothing. A packet replaced before its tick is
+    dropped as stale. With rate 0 every packet is sent as it arrives.
+
+    fmt 'legacy' sends each player's 8-byte PacketData on its own, which any
+    firmware reads; 'batch' sends one sequenced datagram carrying every
+    active player, which firmware older than the batch format drops.
+    """
+
+    def __init__(self, sock, pico_addr, rate=1000, fmt='legacy'):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown input format '{fmt}'. Choose from: {', '.join(FORMATS)}")
+        self.sock = sock
+        self.pico_addr = pico_addr
+        self.period = 1.0 / rate if rate else 0.0
+        self.fmt = fmt
+        # player -> (packet, path, arrived) still to send
+        self.pending = {}
+        # player -> (packet, arrived) of the last state sent, repeated in batches while recent
+        self.latest = {}
+        self.seq = 0
+        self.cond = threading.Condition()
+        self.running = True
+        if self.period:
+            self.thread = threading.Thread(target=self.run, name='input-send', daemon=True)
+            self.thread.start()
+
+    def submit(self, packet, path, arrived):
+        """Queues packet (8-byte PacketData) for its player; path and arrived are for /metrics."""
+        player = packet[0]
+        with self.cond:
+            if not self.period:
+                self.flush({player: (packet, path, arrived)})
+                return
+            if player in self.pending:
+                INPUT_COALESCED.inc(player=player)
+            self.pending[player] = (packet, path, arrived)
+            self.cond.notify()
+
+    def run(self):
+        while self.running:
+            with self.cond:
+                while self.running and not self.pending:
+                    self.cond.wait()
+            # Wait for the next tick; anything arriving meanwhile replaces what is pending
+            time.sleep(self.period - time.perf_counter() % self.period)
+            with self.cond:
+                pending, self.pending = self.pending, {}
+                self.flush(pending)
+
+    def flush(self, pending):
+        if self.fmt == 'legacy':
+            for player, (packet, path, arrived) in sorted(pending.items()):
+                self.send(packet, [(player, path, arrived)])
+            return
+        now = time.perf_counter()
+        for player, (packet, path, arrived) in pending.items():
+            self.latest[player] = (packet, arrived)
+        # Players heard from recently ride along, so a lost datagram is repaired by the
+        # next one; a player who left is repeated at most half the Pico's timeout
+        self.latest = {player: state for player, state in self.latest.items() if now - state[1] < PICO_TIMEOUT / 2}
+        self.seq = (self.seq + 1) & 0xFFFF
+        datagram = pack_batch(self.seq, [packet for player, (packet, _) in sorted(self.latest.items())])
+        self.send(datagram, [(player, path, arrived) for player, (_, path, arrived) in pending.items()])
+
+    def send(self, datagram, sent_for):
+        dispatched = time.perf_counter()
+        try:
+            self.sock.sendto(datagram, self.pico_addr)
+        except OSError:
+            return
+        sent = time.perf_counter()
+        INPUT_DATAGRAMS.inc(format=self.fmt)
+        for player, path, arrived in sent_for:
+            INPUT_TRACKER.sent(path, player, arrived, dispatched, sent)
+
+    def close(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify()
@@ -0,0 +1,91 @@
+"""Capture device that only runs while someone is watching."""
+import threading
+import time
+
+
+class LazyCapture:
+    """Reference-counted access to a capture device.
+
+    The first viewer opens the device (a cold start) and frames are read only
+    while viewers are counted. When the last one leaves, reading carries on
+    for a grace period and then stops, but the device stays open: the next
+    viewer gets a warm start without renegotiating format and resolution.
+    """
+
+    def __init__(self, open_device, grace=10.0, fps=60, on_start=None):
+        self.open_device = open_device
+        self.grace = grace
+        self.fps = fps
+        # Called with ('cold' | 'warm', seconds from first viewer to first frame)
+        self.on_start = on_start
+        self.cond = threading.Condition()
+        # Held around every use of the device, so close() never releases it mid-read
+        self.device_lock = threading.Lock()
+        self.cap = None
+        self.closed = False
+        self.viewers = 0
+        self.reading = False
+        self.idle_since = 0.0
+        self.requested = 0.0
+        # (kind, requested) until the first frame of a start has been read
+        self.starting = None
+
+    def acquire(self):
+        with self.cond:
+            self.viewers += 1
+            if self.viewers == 1:
+                self.requested = time.perf_counter()
+                self.cond.notify_all()
+
+    def release(self):
+        with self.cond:
+            self.viewers -= 1
+            if self.viewers == 0:
+                self.idle_since = time.perf_counter()
+
+    def read(self):
+        """Like cap.read(), but blocks while nobody has watched for the grace period.
+
+        Returns (False, None) once closed.
+        """
+        with self.cond:
+            if self.reading and self.viewers == 0 and time.perf_counter() - self.idle_since >= self.grace:
+                self.reading = False
+            if not self.reading:
+                self.cond.wait_for(lambda: self.viewers > 0 or self.closed)
+                self.reading = True
+                self.starting = ('warm' if self.cap is not None else 'cold', self.requested)
+            starting = self.starting
+        with self.device_lock:
+            if self.closed:
+                return False, None
+            if self.cap is None:
+                self.cap = self.open_device()
+            if starting is None:
+                return self.cap.read()
+            ret, frame = self.read_fresh() if starting[0] == 'warm' else self.cap.read()
+        if ret:
+            self.starting = None
+            if self.on_start:
+                self.on_start(starting[0], time.perf_counter() - starting[1])
+        return ret, frame
+
+    def read_fresh(self):
+        # Frames the driver queued while idle are stale and come back at once; skip to a live one
+        for _ in range(8):
+            started = time.perf_counter()
+            if not self.cap.grab():
+                return False, None
+            if time.perf_counter() - started > 0.5 / self.fps:
+                break
+        return self.cap.retrieve()
+
+    def close(self):
+        """Wakes a read() waiting for viewers and releases the device."""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        with self.device_lock:
+            if self.cap is not None:
+                self.cap.release()
+                self.cap = None
@@ -0,0 +1,330 @@
+"""Prometheus-style metrics, rendered as text on /metrics."""
+import collections
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, doc, labels=()):
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        self.values = {}
+        REGISTRY.register(self)
+
+    def key(self, labels):
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def remove(self, **labels):
+        with self.lock:
+            self.values.pop(self.key(labels), None)
+
+    def label_text(self, key, extra=()):
+        pairs = list(zip(self.labels, key)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+    def samples(self):
+        with self.lock:
+            return [(self.name + self.label_text(key), value) for key, value in self.values.items()]
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.doc}', f'# TYPE {self.name} {self.kind}']
+        lines += [f'{name} {value:g}' for name, value in self.samples()]
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self.key(labels)] = value
+
+
+class Summary(Metric):
+    """p50/p95/p99 over the most recent observations, plus _sum and _count."""
+
+    kind = 'summary'
+    quantiles = (0.5, 0.95, 0.99)
+
+    def __init__(self, name, doc, labels=(), window=1024):
+        super().__init__(name, doc, labels)
+        self.window = window
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            recent, total, count = self.values.get(key) or (collections.deque(maxlen=self.window), 0.0, 0)
+            recent.append(value)
+            self.values[key] = (recent, total + value, count + 1)
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            for key, (recent, total, count) in self.values.items():
+                ordered = sorted(recent)
+                for q in self.quantiles:
+                    value = ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+                    samples.append((self.name + self.label_text(key, [('quantile', q)]), value))
+                samples.append((self.name + '_sum' + self.label_text(key), total))
+                samples.append((self.name + '_count' + self.label_text(key), count))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+
+    def on_collect(self, fn):
+        """Runs fn before every render, to refresh gauges derived from live state."""
+        self.collectors.append(fn)
+
+    def remove_collector(self, fn):
+        """Undoes on_collect(fn), for objects closed before the process ends."""
+        if fn in self.collectors:
+            self.collectors.remove(fn)
+
+    def render(self):
+        # A copy: collectors can be removed from another thread while rendering
+        for fn in list(self.collectors):
+            fn()
+        return '\n'.join(metric.render() for metric in self.metrics) + '\n'
+
+
+REGISTRY = Registry()
+
+# --- INPUT ---
+INPUT_PACKETS = Counter('remote_switch_input_packets_total', 'Input packets sent to the Pico', ['player', 'path'])
+INPUT_DATAGRAMS = Counter('remote_switch_input_datagrams_total', 'UDP datagrams sent to the Pico', ['format'])
+INPUT_DROPPED = Counter('remote_switch_input_dropped_total', 'Input packets lost between browser and server (sequence gaps)', ['player'])
+INPUT_REORDERED = Counter('remote_switch_input_reordered_total', 'Input packets that arrived after a newer one', ['player'])
+INPUT_COALESCED = Counter('remote_switch_input_coalesced_total', 'Input packets replaced by a newer one before their send tick', ['player'])
+INPUT_RATE = Gauge('remote_switch_input_rate_hz', 'Input packets received per second over the last second', ['player'])
+INPUT_HANDLE = Summary('remote_switch_input_handle_seconds', 'Arrival to sendto() returning', ['path'])
+INPUT_DISPATCH = Summary('remote_switch_input_dispatch_seconds', 'Arrival to sendto() being called, including the wait for the send tick', ['path'])
+INPUT_QUEUEING = Summary('remote_switch_input_queueing_ms', 'Browser to server delay above the lowest seen (network queueing)', ['player'])
+
+# --- VIDEO ---
+VIDEO_FRAMES = Counter('remote_switch_video_frames_total', 'Frames published', ['profile'])
+VIDEO_FPS = Gauge('remote_switch_video_fps', 'Frames published per second since the last scrape', ['profile'])
+VIDEO_ENCODE = Summary('remote_switch_video_encode_seconds', 'Resize + JPEG encode time per frame', ['profile'])
+VIDEO_VIEWERS = Gauge('remote_switch_video_viewers', 'Connected /video_feed viewers', ['profile'])
+VIDEO_SEND = Summary('remote_switch_video_send_seconds', 'Time a viewer write blocked', ['profile'])
+VIDEO_DROPPED = Counter('remote_switch_video_dropped_total', 'Frames a viewer never got because newer ones replaced them while it was sending', ['profile'])
+VIDEO_VIEWER_LAG = Gauge('remote_switch_video_viewer_lag_frames', 'Frames published while the viewer was still sending', ['viewer', 'profile'])
+VIDEO_CAPTURED = Gauge('remote_switch_video_captured_frames', 'Frames read while someone was watching')
+VIDEO_SKIPPED = Gauge('remote_switch_video_skipped_frames', 'Frames skipped as unchanged')
+VIDEO_SKIP_RATIO = Gauge('remote_switch_video_skip_ratio', 'Share of watched frames skipped as unchanged')
+VIDEO_CAPTURING = Gauge('remote_switch_video_capturing', '1 while the capture device is being read')
+VIDEO_STARTUP = Summary('remote_switch_video_startup_seconds', 'First viewer to first captured frame', ['kind'])
+VIDEO_LATENCY = Summary('remote_switch_video_latency_ms', 'Capture to a page receiving (receive) and showing (display) a frame, as measuring pages report it', ['client', 'stage'])
+VIDEO_JITTER = Gauge('remote_switch_video_jitter_ms', 'Smoothed change in capture-to-display latency between frames (RFC 3550 jitter)', ['client'])
+
+# H.264
+H264_VIEWERS = Gauge('remote_switch_h264_viewers', 'Connected H.264 WebSocket viewers')
+H264_FRAMES = Counter('remote_switch_h264_frames_total', 'H.264 frames encoded', ['type'])
+H264_BYTES = Counter('remote_switch_h264_bytes_total', 'fMP4 bytes encoded, before fan-out')
+H264_ENCODE = Summary('remote_switch_h264_encode_seconds', 'JPEG decode + H.264 encode time per frame')
+H264_RESYNCS = Counter('remote_switch_h264_resyncs_total', 'Times a viewer fell behind and restarted at a keyframe')
+
+# Audio
+AUDIO_LISTENERS = Gauge('remote_switch_audio_listeners', 'Pages subscribed to audio', ['codec'])
+AUDIO_PACKETS = Counter('remote_switch_audio_packets_total', 'Audio packets emitted', ['codec'])
+
+# Send queues
+SEND_QUEUED = Gauge('remote_switch_send_queued_messages', 'Messages waiting in per-client send queues', ['channel'])
+SEND_DROPPED = Counter('remote_switch_send_dropped_total', 'Messages pushed out of a full per-client send queue, oldest first', ['channel'])
+
+# Spectator relay
+RELAY_FANOUTS = Gauge('remote_switch_relay_fanouts', 'Connected spectator fan-out processes')
+RELAY_BYTES = Counter('remote_switch_relay_bytes_total', 'Bytes published to fan-out processes', ['kind'])
+RELAY_DROPPED = Counter('remote_switch_relay_dropped_total', 'Packets not sent to a fan-out process that was reading too slowly', ['kind'])
+
+# Process (Linux only)
+PROCESS_CPU = Gauge('remote_switch_cpu_seconds', 'CPU seconds used by the live threads and processes of each component; "all" is the whole server process', ['component'])
+PROCESS_THREADS = Gauge('remote_switch_threads', 'Live threads of the server process per component', ['component'])
+PROCESS_RSS = Gauge('remote_switch_memory_rss_bytes', 'Resident memory of the server and its encoder processes', ['process'])
+
+
+class InputTracker:
+    """Turns per-packet sequence numbers and client timestamps into input metrics."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last_seq = {}
+        self.min_delay = {}
+        self.arrivals = collections.defaultdict(collections.deque)
+        REGISTRY.on_collect(self.collect)
+
+    def received(self, player, seq, client_ms, arrived):
+        with self.lock:
+            self.arrivals[player].append(arrived)
+            if seq is None:
+                return
+            last = self.last_seq.get(player)
+            if last is not None:
+                gap = (seq - last) & 0xFFFF
+                if gap == 0 or gap > 0x8000:
+                    # Older than what we already forwarded
+                    INPUT_REORDERED.inc(player=player)
+                    return
+                if gap > 1:
+                    INPUT_DROPPED.inc(gap - 1, player=player)
+            self.last_seq[player] = seq
+            if client_ms is not None:
+                # Clocks are not synced, so only the delay above the best case means anything
+                delay = time.time() * 1000 - client_ms
+                best = min(self.min_delay.get(player, delay), delay)
+                self.min_delay[player] = best
+                INPUT_QUEUEING.observe(delay - best, player=player)
+
+    def sent(self, path, player, arrived, dispatched, sent):
+        INPUT_PACKETS.inc(player=player, path=path)
+        INPUT_HANDLE.observe(sent - arrived, path=path)
+        INPUT_DISPATCH.observe(dispatched - arrived, path=path)
+
+    def collect(self):
+        now = time.perf_counter()
+        with self.lock:
+            for player, arrivals in self.arrivals.items():
+                while arrivals and now - arrivals[0] > 1.0:
+                    arrivals.popleft()
+                INPUT_RATE.set(len(arrivals), player=player)
+
+
+INPUT_TRACKER = InputTracker()
+
+
+class LatencyClient:
+    def __init__(self, number):
+        self.number = number
+        self.jitter = 0.0
+        # (frame, capture ms, display ms) of the last frame reported
+        self.last = None
+
+
+class VideoLatencyTracker:
+    """Turns the frame timings measuring pages report into per-client latency and jitter."""
+
+    # Samples taken from one report; a page sends about a second's worth
+    MAX_SAMPLES = 240
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clients = {}
+        self.numbers = itertools.count(1)
+
+    def report(self, sid, samples):
+        """samples: [[frame, capture ms, receive ms, display ms]], the page's times on the server's clock."""
+        with self.lock:
+            client = self.clients.get(sid)
+            if client is None:
+                client = self.clients[sid] = LatencyClient(next(self.numbers))
+            for frame, captured, received, displayed in samples[:self.MAX_SAMPLES]:
+                frame, captured, received, displayed = int(frame), float(captured), float(received), float(displayed)
+                if client.last and frame <= client.last[0]:
+                    continue
+                VIDEO_LATENCY.observe(received - captured, client=client.number, stage='receive')
+                VIDEO_LATENCY.observe(displayed - captured, client=client.number, stage='display')
+                if client.last:
+                    # How much longer (or shorter) this frame took to show than the one before
+                    change = (displayed - client.last[2]) - (captured - client.last[1])
+                    client.jitter += (abs(change) - client.jitter) / 16
+                client.last = (frame, captured, displayed)
+            VIDEO_JITTER.set(client.jitter, client=client.number)
+
+    def remove(self, sid):
+        with self.lock:
+            client = self.clients.pop(sid, None)
+        if client:
+            for stage in ('receive', 'display'):
+                VIDEO_LATENCY.remove(client=client.number, stage=stage)
+            VIDEO_JITTER.remove(client=client.number)
+
+
+VIDEO_LATENCY_TRACKER = VideoLatencyTracker()
+
+
+class ProcessTracker:
+    """Splits the server's CPU time by component, from /proc and thread names.
+
+    Threads started without a name (request handlers, Socket.IO) count as
+    "web"; the aiohttp backend serves everything from "main". Does nothing
+    where there is no /proc.
+    """
+
+    def __init__(self):
+        self.available = os.path.isdir('/proc/self/task')
+        if self.available:
+            self.tick = os.sysconf('SC_CLK_TCK')
+            self.page = os.sysconf('SC_PAGE_SIZE')
+        self.components = set()
+        REGISTRY.on_collect(self.collect)
+
+    def cpu_seconds(self, path):
+        try:
+            with open(path) as f:
+                # utime and stime, counted after the parenthesised command name
+                fields = f.read().rpartition(')')[2].split()
+        except OSError:
+            return 0.0
+        return (int(fields[11]) + int(fields[12])) / self.tick
+
+    def rss_bytes(self, pid):
+        try:
+            with open(f'/proc/{pid}/statm') as f:
+                return int(f.read().split()[1]) * self.page
+        except OSError:
+            return 0
+
+    def collect(self):
+        if not self.available:
+            return
+        cpu = collections.Counter()
+        threads = collections.Counter()
+        for thread in threading.enumerate():
+            if thread.native_id is None:
+                continue
+            if thread is threading.main_thread():
+                component = 'main'
+            else:
+                component = 'web' if thread.name.startswith('Thread-') else thread.name
+            cpu[component] += self.cpu_seconds(f'/proc/self/task/{thread.native_id}/stat')
+            threads[component] += 1
+        cpu['all'] = self.cpu_seconds('/proc/self/stat')
+        rss = collections.Counter(server=self.rss_bytes('self'))
+        for child in multiprocessing.active_children():
+            cpu[child.name] += self.cpu_seconds(f'/proc/{child.pid}/stat')
+            rss[child.name] += self.rss_bytes(child.pid)
+        for component, seconds in cpu.items():
+            PROCESS_CPU.set(seconds, component=component)
+        # Components whose threads have all ended drop to 0
+        self.components |= set(threads)
+        for component in self.components:
+            PROCESS_THREADS.set(threads[component], component=component)
+        for process, size in rss.items():
+            PROCESS_RSS.set(size, process=process)
+
+
+PROCESS_TRACKER = ProcessTracker()
@@ -0,0 +1,625 @@
+"""The play page: video, audio, gamepad input and controller mapping."""
+
+# Rendered with render_template_string: profiles, input_port (None for spectators), h264_port and
+# h264_height (None without H.264), audio_rate, audio_packet_ms, audio_codecs
+HTML_PAGE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Remote Switch</title>
+    <meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=no">
+    <style>
+        body { font-family: sans-serif; background: #111; color: #fff; text-align: center; margin: 0; overflow: hidden; }
+        .main-layout { display: flex; flex-direction: column; height: 100vh; width: 100vw; }
+        .tab-nav { display: flex; background: #222; border-bottom: 1px solid #444; height: 40px; }
+        .tab-btn { flex: 1; background: transparent; color: #aaa; border: none; cursor: pointer; font-size: 14px; font-weight: bold; }
+        .tab-btn.active { background: #444; color: #fff; border-bottom: 2px solid #0f0; }
+        .tab-content { flex: 1; display: none; position: relative; }
+        .tab-content.active { display: flex; justify-content: center; align-items: center; background: #000; }
+        #usb-feed, #h264-feed, #measured-feed { height: 100%; max-width: 100%; object-fit: contain; }
+        .controls-bar { 
+            position: absolute; bottom: 20px; background: rgba(0,0,0,0.8); 
+            padding: 10px 20px; border-radius: 8px; display: flex; gap: 15px; align-items: center; 
+            border: 1px solid #444; z-index: 10;
+        }
+        select, button { padding: 8px; border-radius: 4px; border: none; cursor: pointer; }
+        button { background: #0066cc; color: white; font-weight: bold; }
+        button:hover { background: #0055aa; }
+        #status { font-weight: bold; color: #ff9900; min-width: 100px; text-align: left; }
+        .settings-container { padding: 20px; overflow-y: auto; width: 100%; text-align: center; }
+        .mapping-table { margin: 0 auto; border-collapse: collapse; background: #222; width: 80%; max-width: 600px; }
+        .mapping-table td, .mapping-table th { border: 1px solid #444; padding: 8px; text-align: left; }
+        .map-btn { background: #444; color: white; padding: 4px 10px; width: 80px; }
+        .map-btn.listening { background: #e67e22; animation: pulse 1s infinite; }
+        @keyframes pulse { 0% { opacity: 1; } 50% { opacity: 0.6; } 100% { opacity: 1; } }
+    </style>
+    <script src="https://cdnjs.cloudflare.com/ajax/libs/socket.io/4.0.1/socket.io.js"></script>
+</head>
+<body>
+    <div class="main-layout">
+        <div class="tab-nav">
+            <button class="tab-btn active" onclick="switchTab('stream')">📺 Stream & Play</button>
+            <button class="tab-btn" onclick="switchTab('settings')">⚙️ Controller Mapping</button>
+        </div>
+
+        <div id="tab-stream" class="tab-content active">
+            <img id="usb-feed" src="/video_feed?profile=auto">
+            <video id="h264-feed" muted autoplay playsinline style="display: none;"></video>
+            <canvas id="measured-feed" style="display: none;"></canvas>
+            <div class="controls-bar">
+                <label>Player:</label>
+                <select id="player-select">
+                    <option value="1">Player 1</option>
+                    <option value="2">Player 2</option>
+                </select>
+                <label>Quality:</label>
+                <select id="profile-select" onchange="setProfile(this.value)">
+                    <option value="auto" selected>auto</option>
+                    {% for name, (w, h, q) in profiles.items() %}
+                    <option value="{{ name }}">{{ name }} ({{ h }}p)</option>
+                    {% endfor %}
+                    {% if h264_port %}
+                    <option value="h264">H.264 ({{ h264_height }}p)</option>
+                    {% endif %}
+                </select>
+                <button id="audio-btn" onclick="toggleAudio()">🔊 Enable Audio</button>
+                <button id="latency-btn" onclick="toggleLatency()" title="Measure how old the picture is (MJPEG only)">⏱ Latency</button>
+                <span id="status">{{ 'Waiting for Gamepad...' if input_port else '👀 Spectating' }}</span>
+            </div>
+        </div>
+
+        <div id="tab-settings" class="tab-content">
+            <div class="settings-container">
+                <h2>Controller Mapping</h2>
+                <button onclick="resetDefaults()" style="margin-bottom: 15px; background: #c0392b;">Reset Defaults</button>
+                <div style="display:flex; justify-content:center; gap:20px;">
+                    <div>
+                        <h3>Axes</h3>
+                        <table class="mapping-table" id="axes-table"></table>
+                    </div>
+                    <div>
+                        <h3>Buttons</h3>
+                        <table class="mapping-table" id="buttons-table"></table>
+                    </div>
+                </div>
+            </div>
+        </div>
+    </div>
+
+    <script>
+    const socket = io({ transports: ['websocket'] });
+    
+    // --- AUDIO HANDLING WITH ADAPTIVE JITTER BUFFER ---
+    let audioContext;
+    let nextStartTime = 0;
+    let opusDecoder = null;
+    let audioCodec = null;
+    let audioOn = false;
+    // Must match Python RATE / AUDIO_PACKET_MS
+    const SAMPLE_RATE = {{ audio_rate }};
+    const AUDIO_PACKET_MS = {{ audio_packet_ms }};
+    // Codecs the server can send, best first; Opus needs WebCodecs in the browser
+    const AUDIO_CODECS = {{ audio_codecs | tojson }};
+    // Every packet starts with [seq uint32 | capture time float64 ms], little-endian
+    const AUDIO_HEADER_BYTES = 12;
+
+    // The target delay follows recent arrival jitter (spread of arrival - capture
+    // time over the last few seconds). Clock drift between the capture card and the
+    // sound card shows up as the queue slowly growing or shrinking, and is absorbed
+    // by nudging the playback rate instead of letting it underrun or pile up.
+    const MIN_DELAY = 0.01, MAX_DELAY = 0.25, DRIFT_RATE = 0.005;
+    const jitter = { offsets: [], target: 0.03, lastSeq: null };
+
+    function updateJitter(captureMs) {
+        const offset = performance.timeOrigin + performance.now() - captureMs;
+        jitter.offsets.push(offset);
+        if (jitter.offsets.length > 3000 / AUDIO_PACKET_MS) jitter.offsets.shift();
+        const sorted = [...jitter.offsets].sort((a, b) => a - b);
+        const spread = sorted[Math.floor(sorted.length * 0.95)] - sorted[0];
+        jitter.target = Math.min(MAX_DELAY, Math.max(MIN_DELAY, spread / 1000 + AUDIO_PACKET_MS / 2000));
+    }
+
+    function startAudio() {
+        if (!audioContext) {
+            audioContext = new (window.AudioContext || window.webkitAudioContext)({ sampleRate: SAMPLE_RATE });
+            audioCodec = (AUDIO_CODECS.includes('opus') && 'AudioDecoder' in window) ? 'opus' : 'pcm';
+            if (audioCodec === 'opus') {
+                opusDecoder = new AudioDecoder({
+                    output: (audioData) => {
+                        const f32 = new Float32Array(audioData.numberOfFrames);
+                        audioData.copyTo(f32, { planeIndex: 0, format: 'f32-planar' });
+                        audioData.close();
+                        playSamples(f32);
+                    },
+                    error: (e) => console.error('Opus decode error', e),
+                });
+                opusDecoder.configure({ codec: 'opus', sampleRate: SAMPLE_RATE, numberOfChannels: 1 });
+            }
+        }
+        if (audioContext.state === 'suspended') {
+            audioContext.resume();
+        }
+        // Fresh jitter state: the server's capture clock restarts when it was idle
+        nextStartTime = 0;
+        jitter.offsets = [];
+        jitter.lastSeq = null;
+        audioOn = true;
+        socket.emit('audio_subscribe', audioCodec);
+        document.getElementById('audio-btn').innerText = "🔊 Audio Active";
+        document.getElementById('audio-btn').style.background = "#27ae60";
+    }
+
+    // The server stops capturing once nobody is subscribed
+    function stopAudio() {
+        audioOn = false;
+        socket.emit('audio_unsubscribe');
+        audioContext.suspend();
+        document.getElementById('audio-btn').innerText = "🔇 Audio Off";
+        document.getElementById('audio-btn').style.background = "";
+    }
+
+    function toggleAudio() {
+        if (audioOn) stopAudio(); else startAudio();
+    }
+
+    // Rooms do not survive a reconnect
+    socket.on('connect', () => {
+        if (audioOn) socket.emit('audio_subscribe', audioCodec);
+    });
+
+    function readAudioHeader(data) {
+        const view = new DataView(data);
+        const seq = view.getUint32(0, true);
+        // A gap means the server skipped ahead; resync rather than play late
+        if (jitter.lastSeq !== null && seq !== jitter.lastSeq + 1) nextStartTime = 0;
+        jitter.lastSeq = seq;
+        updateJitter(view.getFloat64(4, true));
+        return data.slice(AUDIO_HEADER_BYTES);
+    }
+
+    function playSamples(f32) {
+        const buffer = audioContext.createBuffer(1, f32.length, SAMPLE_RATE);
+        buffer.getChannelData(0).set(f32);
+        const source = audioContext.createBufferSource();
+        source.buffer = buffer;
+        source.connect(audioContext.destination);
+
+        let queued = nextStartTime - audioContext.currentTime;
+        if (queued < 0) {
+            // Underrun: restart at the current target delay
+            nextStartTime = audioContext.currentTime + jitter.target;
+            queued = jitter.target;
+        } else if (queued > jitter.target + MAX_DELAY) {
+            // Far behind (tab was in the background): drop until caught up
+            return;
+        }
+        let rate = 1.0;
+        if (queued > jitter.target * 1.5) rate = 1 + DRIFT_RATE;
+        else if (queued < jitter.target * 0.5) rate = 1 - DRIFT_RATE;
+        source.playbackRate.value = rate;
+        source.start(nextStartTime);
+        nextStartTime += buffer.duration / rate;
+    }
+
+    // Raw PCM fallback: 16-bit Int to Float32
+    socket.on('audio_data', (data) => {
+        if (!audioContext) return;
+        const int16 = new Int16Array(readAudioHeader(data));
+        const f32 = new Float32Array(int16.length);
+        for (let i = 0; i < int16.length; i++) {
+            f32[i] = int16[i] / 32768.0;
+        }
+        playSamples(f32);
+    });
+
+    // One Opus packet per AUDIO_PACKET_MS, each decodable on its own
+    socket.on('audio_opus', (data) => {
+        if (!opusDecoder) return;
+        const seqStart = new DataView(data).getUint32(0, true);
+        const payload = readAudioHeader(data);
+        opusDecoder.decode(new EncodedAudioChunk({ type: 'key', timestamp: seqStart * AUDIO_PACKET_MS * 1000, data: payload }));
+    });
+
+    // --- GAMEPAD & CONTROLS ---
+    let gamepadIndex = -1;
+    let lastSentTime = 0;
+    let lastPacket = new Uint8Array(8);
+    let inputSeq = 0;
+    // Resend an unchanged state this often, well inside the Pico's 500 ms TIMEOUT_MS
+    const HEARTBEAT_INTERVAL = 200;
+    const DEADZONE = 0.15;
+    const defaultAxes = { lx: 0, ly: 1, rx: 2, ry: 3 };
+    const defaultButtons = {};
+    for(let i=0; i<16; i++) defaultButtons[i] = i;
+
+    let axisMap = JSON.parse(localStorage.getItem('axisMap')) || defaultAxes;
+    let buttonMap = JSON.parse(localStorage.getItem('buttonMap')) || defaultButtons;
+
+    function setProfile(name) {
+        const img = document.getElementById('usb-feed');
+        const video = document.getElementById('h264-feed');
+        if (name === 'h264') {
+            stopMeasuring();
+            // Ends the MJPEG connection
+            img.src = 'data:,';
+            img.style.display = 'none';
+            video.style.display = '';
+            startH264();
+        } else if (measure) {
+            stopH264();
+            video.style.display = 'none';
+            startMeasuring(name);
+        } else {
+            stopH264();
+            video.style.display = 'none';
+            img.style.display = '';
+            img.src = '/video_feed?profile=' + encodeURIComponent(name);
+        }
+    }
+
+    // --- LATENCY: capture to display, for the MJPEG stream ---
+    // An <img> hides the multipart headers, so while measuring the page reads /video_feed itself
+    // and draws on a canvas. Every frame's capture time (X-Capture-Time), arrival and first repaint
+    // go to the server each second, on the server's clock, which clock_sync estimates from the
+    // fastest of the last few round trips.
+    const clock = { offset: null, syncs: [] };
+    let measure = null;
+
+    function syncClock() {
+        const sent = performance.now();
+        socket.emit('clock_sync', (serverMs) => {
+            const now = performance.now();
+            // The reply was read about halfway through the round trip
+            clock.syncs.push({ rtt: now - sent, offset: serverMs - (performance.timeOrigin + (sent + now) / 2) });
+            if (clock.syncs.length > 10) clock.syncs.shift();
+            clock.offset = clock.syncs.reduce((a, b) => (b.rtt < a.rtt ? b : a)).offset;
+        });
+    }
+
+    function localMs() {
+        return performance.timeOrigin + performance.now();
+    }
+
+    function findHeaderEnd(buf) {
+        for (let i = 0; i + 3 < buf.length; i++) {
+            if (buf[i] === 13 && buf[i + 1] === 10 && buf[i + 2] === 13 && buf[i + 3] === 10) return i;
+        }
+        return -1;
+    }
+
+    // The first complete part in buf as { frame, captured, body, end }, or null until one is
+    function nextPart(buf) {
+        const headerEnd = findHeaderEnd(buf);
+        if (headerEnd < 0) return null;
+        const headers = {};
+        for (const line of new TextDecoder().decode(buf.subarray(0, headerEnd)).split('\\r\\n')) {
+            const colon = line.indexOf(': ');
+            if (colon > 0) headers[line.slice(0, colon).toLowerCase()] = line.slice(colon + 2);
+        }
+        // Stamped parts say how long they are, so none waits for the next one to arrive
+        const length = parseInt(headers['content-length']);
+        if (isNaN(length)) throw new Error('Frames carry no stamps');
+        const end = headerEnd + 4 + length + 2;
+        if (buf.length < end) return null;
+        return { frame: parseInt(headers['x-frame']), captured: parseFloat(headers['x-capture-time']),
+                 body: buf.slice(headerEnd + 4, end - 2), end };
+    }
+
+    async function startMeasuring(profile) {
+        stopMeasuring();
+        const img = document.getElementById('usb-feed');
+        img.src = 'data:,';
+        img.style.display = 'none';
+        document.getElementById('measured-feed').style.display = '';
+        const state = { abort: new AbortController(), samples: [], pending: null, shown: 0 };
+        measure = state;
+        syncClock();
+        state.timer = setInterval(() => { syncClock(); reportLatency(state); }, 1000);
+        try {
+            const response = await fetch('/video_feed?profile=' + encodeURIComponent(profile), { signal: state.abort.signal });
+            const reader = response.body.getReader();
+            let buf = new Uint8Array(0);
+            while (measure === state) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                const received = localMs();
+                const joined = new Uint8Array(buf.length + value.length);
+                joined.set(buf);
+                joined.set(value, buf.length);
+                buf = joined;
+                let part;
+                while ((part = nextPart(buf))) {
+                    buf = buf.subarray(part.end);
+                    part.received = received;
+                    decodeFrame(state, part);
+                }
+            }
+        } catch (e) {
+            if (measure === state) console.error('Latency measurement stopped', e);
+        }
+    }
+
+    function decodeFrame(state, part) {
+        createImageBitmap(new Blob([part.body], { type: 'image/jpeg' })).then((bitmap) => {
+            // Decodes can finish out of order; only the newest is drawn at the next repaint
+            if (measure !== state || part.frame <= state.shown || (state.pending && part.frame < state.pending.frame)) {
+                bitmap.close();
+                return;
+            }
+            if (state.pending) state.pending.bitmap.close();
+            else requestAnimationFrame(() => drawFrame(state));
+            part.bitmap = bitmap;
+            state.pending = part;
+        });
+    }
+
+    function drawFrame(state) {
+        const part = state.pending;
+        state.pending = null;
+        if (measure !== state) return part.bitmap.close();
+        const canvas = document.getElementById('measured-feed');
+        if (canvas.width !== part.bitmap.width || canvas.height !== part.bitmap.height) {
+            canvas.width = part.bitmap.width;
+            canvas.height = part.bitmap.height;
+        }
+        canvas.getContext('2d').drawImage(part.bitmap, 0, 0);
+        part.bitmap.close();
+        state.shown = part.frame;
+        // On screen once this repaint is done, which is about when the next one starts
+        requestAnimationFrame(() => {
+            if (clock.offset === null) return;
+            state.samples.push([part.frame, part.captured, part.received + clock.offset, localMs() + clock.offset]);
+        });
+    }
+
+    function reportLatency(state) {
+        if (!state.samples.length) return;
+        const samples = state.samples;
+        state.samples = [];
+        socket.emit('video_latency', samples);
+        const shown = samples.map((s) => s[3] - s[1]).sort((a, b) => a - b);
+        document.getElementById('latency-btn').innerText = `⏱ ${Math.round(shown[Math.floor(shown.length / 2)])} ms`;
+    }
+
+    function stopMeasuring() {
+        if (!measure) return;
+        const state = measure;
+        measure = null;
+        clearInterval(state.timer);
+        state.abort.abort();
+        if (state.pending) state.pending.bitmap.close();
+        document.getElementById('measured-feed').style.display = 'none';
+        document.getElementById('latency-btn').innerText = '⏱ Latency';
+    }
+
+    function toggleLatency() {
+        const profile = document.getElementById('profile-select').value;
+        if (measure) {
+            stopMeasuring();
+            setProfile(profile);
+        } else if (profile !== 'h264') {
+            startMeasuring(profile);
+        }
+    }
+
+    // --- H.264: fragmented MP4 over a WebSocket into Media Source Extensions ---
+    const H264_PORT = {{ h264_port | tojson }};
+    // Jump to the live edge when playback falls this far behind what has arrived
+    const H264_MAX_LAG = 0.1;
+    // Fragments waiting to be appended before giving up and rejoining at a keyframe
+    const H264_MAX_QUEUE = 30;
+    let h264 = null;
+
+    function startH264() {
+        const video = document.getElementById('h264-feed');
+        const ws = new WebSocket(`${location.protocol === 'https:' ? 'wss' : 'ws'}://${location.hostname}:${H264_PORT}`);
+        ws.binaryType = 'arraybuffer';
+        const state = { ws, queue: [], buffer: null };
+        h264 = state;
+        ws.onmessage = (e) => {
+            if (h264 !== state) return;
+            if (typeof e.data === 'string') {
+                // First message: the codec, then the init segment and fragments from a keyframe
+                const codec = JSON.parse(e.data).codec;
+                if (!window.MediaSource || !MediaSource.isTypeSupported(codec)) {
+                    document.getElementById('profile-select').value = 'auto';
+                    setProfile('auto');
+                    return;
+                }
+                const source = new MediaSource();
+                video.src = URL.createObjectURL(source);
+                source.addEventListener('sourceopen', () => {
+                    state.buffer = source.addSourceBuffer(codec);
+                    state.buffer.addEventListener('updateend', () => appendH264(state));
+                    appendH264(state);
+                    video.play().catch(() => {});
+                }, { once: true });
+                return;
+            }
+            state.queue.push(e.data);
+            if (state.queue.length > H264_MAX_QUEUE) {
+                // Fell behind (tab in the background): reconnect for a fresh keyframe
+                stopH264();
+                startH264();
+                return;
+            }
+            appendH264(state);
+        };
+        ws.onclose = () => {
+            if (h264 === state) setTimeout(() => { if (h264 === state) startH264(); }, 2000);
+        };
+    }
+
+    function appendH264(state) {
+        const video = document.getElementById('h264-feed');
+        if (!state.buffer || state.buffer.updating || !state.queue.length) return;
+        const buffered = video.buffered;
+        if (buffered.length) {
+            const start = buffered.start(0), end = buffered.end(buffered.length - 1);
+            if (video.currentTime < start || end - video.currentTime > H264_MAX_LAG) video.currentTime = end;
+            if (video.currentTime - start > 10) {
+                // Keep the buffer short; updateend comes back here
+                state.buffer.remove(start, video.currentTime - 2);
+                return;
+            }
+        }
+        state.buffer.appendBuffer(state.queue.shift());
+    }
+
+    function stopH264() {
+        if (!h264) return;
+        const state = h264;
+        h264 = null;
+        state.ws.close();
+        const video = document.getElementById('h264-feed');
+        video.removeAttribute('src');
+        video.load();
+    }
+
+    function switchTab(t) {
+        document.querySelectorAll('.tab-content').forEach(e => e.classList.remove('active'));
+        document.querySelectorAll('.tab-btn').forEach(e => e.classList.remove('active'));
+        document.getElementById('tab-'+t).classList.add('active');
+        event.target.classList.add('active');
+    }
+
+    // Spectator pages (served by a fan-out process) watch and listen only
+    const INPUT_PORT = {{ input_port | tojson }};
+
+    window.addEventListener("gamepadconnected", (e) => {
+        gamepadIndex = e.gamepad.index;
+        if (!INPUT_PORT) return;
+        document.getElementById("status").innerText = "🎮 Connected";
+        document.getElementById("status").style.color = "#00ff00";
+        renderSettings();
+        requestAnimationFrame(updateLoop);
+    });
+
+    window.addEventListener("gamepaddisconnected", () => {
+        if (!INPUT_PORT) return;
+        document.getElementById("status").innerText = "❌ Disconnected";
+        document.getElementById("status").style.color = "red";
+    });
+
+    // Controller packets go over the dedicated relay; Socket.IO is the fallback
+    let inputSocket = null;
+    function connectInputRelay() {
+        const ws = new WebSocket(`${location.protocol === 'https:' ? 'wss' : 'ws'}://${location.hostname}:${INPUT_PORT}`);
+        ws.binaryType = 'arraybuffer';
+        ws.onopen = () => { inputSocket = ws; };
+        ws.onclose = () => { inputSocket = null; setTimeout(connectInputRelay, 2000); };
+    }
+    if (INPUT_PORT) connectInputRelay();
+
+    function sendInput(buffer) {
+        if (inputSocket) inputSocket.send(buffer);
+        else socket.emit('input_data', buffer);
+    }
+
+    function normalizeAxis(val) {
+        if (Math.abs(val) < DEADZONE) val = 0;
+        else val = (val > 0) ? (val - DEADZONE) / (1 - DEADZONE) : (val + DEADZONE) / (1 - DEADZONE);
+        return Math.max(0, Math.min(255, Math.floor((val + 1) * 127.5)));
+    }
+
+    function updateLoop() {
+        const gp = navigator.getGamepads()[gamepadIndex];
+        if (gp && !remapMode) {
+            const now = Date.now();
+            const pid = parseInt(document.getElementById('player-select').value);
+            let btns = 0;
+            for(let i=0; i<16; i++) {
+                if(gp.buttons[buttonMap[i]]?.pressed) btns |= (1 << i);
+            }
+            // Same 8-byte layout as PacketData on the Pico, forwarded as-is
+            const packet = new Uint8Array(8);
+            const view = new DataView(packet.buffer);
+            view.setUint8(0, pid);
+            view.setUint16(1, btns, true);
+            view.setUint8(3, 8);
+            view.setUint8(4, normalizeAxis(gp.axes[axisMap.lx] || 0));
+            view.setUint8(5, normalizeAxis(gp.axes[axisMap.ly] || 0));
+            view.setUint8(6, normalizeAxis(gp.axes[axisMap.rx] || 0));
+            view.setUint8(7, normalizeAxis(gp.axes[axisMap.ry] || 0));
+
+            const changed = packet.some((b, i) => b !== lastPacket[i]);
+            if (changed || now - lastSentTime > HEARTBEAT_INTERVAL) {
+                // Trailer for /metrics: sequence number + send time, stripped before the Pico
+                const message = new Uint8Array(18);
+                message.set(packet);
+                const trailer = new DataView(message.buffer);
+                inputSeq = (inputSeq + 1) & 0xFFFF;
+                trailer.setUint16(8, inputSeq, true);
+                trailer.setFloat64(10, performance.timeOrigin + performance.now(), true);
+                sendInput(message.buffer);
+                lastPacket = packet;
+                lastSentTime = now;
+            }
+        }
+        if (remapMode) checkRemapInput(gp);
+        requestAnimationFrame(updateLoop);
+    }
+
+    let remapMode = null; 
+    let baselineState = { axes: [], buttons: [] };
+    const btnLabels = ["A", "B", "X", "Y", "L1", "R1", "L2", "R2", "Select", "Start", "L3", "R3", "Up", "Down", "Left", "Right"];
+
+    function renderSettings() {
+        let aHtml = `<tr><th>Axis</th><th>ID</th><th></th></tr>`;
+        for (let k in axisMap) {
+            aHtml += `<tr><td>${k.toUpperCase()}</td><td>${axisMap[k]}</td><td><button class="map-btn" onclick="startRemap('axis', '${k}', this)">Set</button></td></tr>`;
+        }
+        document.getElementById('axes-table').innerHTML = aHtml;
+        let bHtml = `<tr><th>Button</th><th>ID</th><th></th></tr>`;
+        for (let i = 0; i < 16; i++) {
+            bHtml += `<tr><td>${btnLabels[i]}</td><td>${buttonMap[i]}</td><td><button class="map-btn" onclick="startRemap('btn', '${i}', this)">Set</button></td></tr>`;
+        }
+        document.getElementById('buttons-table').innerHTML = bHtml;
+    }
+
+    function startRemap(type, key, el) {
+        const gp = navigator.getGamepads()[gamepadIndex];
+        if (gp) {
+            baselineState.axes = [...gp.axes];
+            baselineState.buttons = gp.buttons.map(b => b.pressed);
+        }
+        remapMode = { type, key, el };
+        el.innerText = "...";
+        el.classList.add('listening');
+    }
+
+    function checkRemapInput(gp) {
+        if (!remapMode || !gp) return;
+        if (remapMode.type === 'btn') {
+            gp.buttons.forEach((btn, idx) => {
+                if (btn.pressed && !baselineState.buttons[idx]) {
+                    buttonMap[remapMode.key] = idx;
+                    finishRemap();
+                }
+            });
+        } else {
+            gp.axes.forEach((val, idx) => {
+                if (Math.abs(val - (baselineState.axes[idx] || 0)) > 0.5) {
+                    axisMap[remapMode.key] = idx;
+                    finishRemap();
+                }
+            });
+        }
+    }
+
+    function finishRemap() {
+        localStorage.setItem('axisMap', JSON.stringify(axisMap));
+        localStorage.setItem('buttonMap', JSON.stringify(buttonMap));
+        remapMode.el.innerText = "Set";
+        remapMode.el.classList.remove('listening');
+        renderSettings();
+        remapMode = null;
+    }
+    function resetDefaults() {
+        axisMap = {...defaultAxes}; buttonMap = {...defaultButtons};
+        localStorage.clear(); renderSettings();
+    }
+    </script>
+</body>
+</html>
+"""
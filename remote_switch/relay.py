@@ -0,0 +1,195 @@
+"""Spectator relay: encoded frames and audio packets published once for fan-out processes.
+
+Every spectator served by this process costs it CPU on the same cores as
+capture, encoding and the input relay. With a relay address set, the
+server publishes each watched rendition and audio codec once per fan-out
+process (python -m remote_switch.fanout) over a Unix socket or TCP; those
+processes serve the page and streams to as many spectators as they like,
+on cores of their own, and never touch the input path.
+
+Messages are RELAY_HEADER (kind, channel, payload length) then the payload:
+HELLO (JSON describing the stream) once on connect, VIDEO (channel: the
+profile's index, payload: the multipart part as /video_feed sends it) and
+AUDIO (channel: the codec's index, payload: the Socket.IO packet). Fan-out
+processes send DEMAND (JSON: the profiles and codecs their spectators want)
+whenever that changes; nothing else is sent to them.
+"""
+import asyncio
+import json
+import os
+import stat
+import struct
+import threading
+
+from .frame_hub import HubWaiter
+from .metrics import RELAY_BYTES, RELAY_DROPPED, RELAY_FANOUTS
+
+# kind, channel, payload length
+RELAY_HEADER = struct.Struct('<BBI')
+HELLO, VIDEO, AUDIO, DEMAND = range(4)
+# Audio for a fan-out process with this much still unsent is dropped rather than queued
+MAX_PENDING_BYTES = 4 * 1024 * 1024
+
+
+def parse_address(address):
+    """host:port for TCP, anything else is a Unix socket path."""
+    host, _, port = address.rpartition(':')
+    if host and port.isdigit():
+        return host, int(port)
+    return address
+
+
+def write_message(writer, kind, channel, payload):
+    writer.write(RELAY_HEADER.pack(kind, channel, len(payload)))
+    writer.write(payload)
+
+
+async def read_message(reader):
+    """Returns (kind, channel, payload); raises asyncio.IncompleteReadError when the peer goes."""
+    kind, channel, length = RELAY_HEADER.unpack(await reader.readexactly(RELAY_HEADER.size))
+    return kind, channel, await reader.readexactly(length)
+
+
+async def open_relay(address):
+    address = parse_address(address)
+    if isinstance(address, tuple):
+        return await asyncio.open_connection(*address)
+    return await asyncio.open_unix_connection(address)
+
+
+def remove_stale_socket(address):
+    """Clears the way for binding address: a socket file left by a server that did not exit cleanly would
+    fail the bind, and anything else at that path is not ours to delete."""
+    address = parse_address(address)
+    if isinstance(address, tuple) or not os.path.exists(address):
+        return
+    if not stat.S_ISSOCK(os.stat(address).st_mode):
+        raise ValueError(f"relay_address '{address}' exists and is not a socket, refusing to replace it")
+    os.unlink(address)
+
+
+class FanoutConnection:
+    def __init__(self, writer, number):
+        self.writer = writer
+        self.sid = f'relay-{number}'
+        # profile -> task sending it
+        self.video = {}
+        self.audio = set()
+
+
+class BroadcastRelay:
+    """Publishes what fan-out processes ask for, from its own event loop thread.
+
+    Each fan-out process counts as one viewer of every rendition it wants
+    and one listener of each audio codec, so capture and encoding start and
+    stop exactly as they do for local viewers. A fan-out process that reads
+    too slowly skips frames like a slow viewer does.
+    """
+
+    def __init__(self, video_streamer, audio_streamer, config, address):
+        self.video = video_streamer
+        self.audio = audio_streamer
+        self.config = config
+        self.address = address
+        self.profiles = list(config.profiles)
+        self.codecs = list(audio_streamer.codecs)
+        self.connections = set()
+        self.count = 0
+        self.loop = None
+        self.ready = threading.Event()
+        audio_streamer.taps.append(self.publish_audio)
+        self.thread = threading.Thread(target=lambda: asyncio.run(self.serve()), name='relay', daemon=True)
+        self.thread.start()
+
+    def hello(self):
+        config = self.config
+        return json.dumps({'profiles': config.profiles, 'default_profile': config.default_profile,
+                           'capture_fps': config.capture_fps, 'audio_rate': config.audio_rate,
+                           'audio_packet_ms': config.audio_packet_ms, 'audio_codecs': self.codecs,
+                           'audio_queue_packets': config.audio_queue_packets,
+                           'video_queue_frames': config.video_queue_frames,
+                           'media_unsent_bytes': config.media_unsent_bytes}).encode()
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.waiters = {name: HubWaiter(hub, self.loop) for name, hub in self.video.hubs.items()}
+        address = parse_address(self.address)
+        if isinstance(address, tuple):
+            server = await asyncio.start_server(self.handle, *address)
+        else:
+            server = await asyncio.start_unix_server(self.handle, address)
+        self.ready.set()
+        async with server:
+            await server.serve_forever()
+
+    async def handle(self, reader, writer):
+        self.count += 1
+        conn = FanoutConnection(writer, self.count)
+        self.connections.add(conn)
+        RELAY_FANOUTS.set(len(self.connections))
+        write_message(writer, HELLO, 0, self.hello())
+        try:
+            while True:
+                kind, _, payload = await read_message(reader)
+                if kind == DEMAND:
+                    demand = json.loads(payload)
+                    if not isinstance(demand, dict):
+                        raise ValueError("DEMAND is not a JSON object")
+                    self.set_demand(conn, demand)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, TypeError):
+            pass
+        finally:
+            self.connections.discard(conn)
+            RELAY_FANOUTS.set(len(self.connections))
+            self.set_demand(conn, {})
+            writer.close()
+
+    def set_demand(self, conn, demand):
+        video = {name for name in demand.get('video', ()) if name in self.waiters}
+        for name in video - set(conn.video):
+            self.video.hubs[name].subscribe()
+            self.video.capture.acquire()
+            conn.video[name] = asyncio.create_task(self.send_video(conn, name))
+        for name in set(conn.video) - video:
+            conn.video.pop(name).cancel()
+            self.video.hubs[name].unsubscribe()
+            self.video.capture.release()
+        # One listener per codec, each under a sid of its own
+        audio = {codec for codec in demand.get('audio', ()) if codec in self.codecs}
+        for codec in audio - conn.audio:
+            self.audio.subscribe(f'{conn.sid}:{codec}', codec)
+        for codec in conn.audio - audio:
+            self.audio.unsubscribe(f'{conn.sid}:{codec}')
+        conn.audio = audio
+
+    async def send_video(self, conn, name):
+        waiter = self.waiters[name]
+        channel = self.profiles.index(name)
+        # From the next frame: what the hub kept may be from before capture idled
+        last_seq = self.video.hubs[name].seq
+        try:
+            while True:
+                last_seq, part = await waiter.wait_for(last_seq)
+                if part:
+                    write_message(conn.writer, VIDEO, channel, part)
+                    RELAY_BYTES.inc(len(part), kind='video')
+                    # Frames published meanwhile are skipped, not queued
+                    await conn.writer.drain()
+        except ConnectionError:
+            pass
+
+    def publish_audio(self, codec, packet):
+        # Called from AudioStreamer's thread
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.send_audio, codec, packet)
+
+    def send_audio(self, codec, packet):
+        channel = self.codecs.index(codec)
+        for conn in self.connections:
+            if codec not in conn.audio:
+                continue
+            if conn.writer.transport.get_write_buffer_size() > MAX_PENDING_BYTES:
+                RELAY_DROPPED.inc(kind='audio')
+                continue
+            write_message(conn.writer, AUDIO, channel, packet)
+            RELAY_BYTES.inc(len(packet), kind='audio')
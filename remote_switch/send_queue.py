@@ -0,0 +1,104 @@
+"""Per-client bounded send queues: a client on a slow link loses its oldest audio instead of piling it up.
+
+Engine.IO keeps an unbounded queue per client. On a stalled link every
+packet emitted to it waits there, which costs server memory and, once the
+link recovers, plays seconds of stale sound. Here a message for a client
+only goes to Engine.IO while that client has no more than HANDOFF_PACKETS
+still queued; the rest wait in a queue of at most depth messages, and a
+new message arriving at a full queue pushes out the oldest.
+
+Below all of that sits the kernel's send buffer, which TCP grows to
+megabytes on a fast path; limit_unsent() keeps it from hoarding stale
+media for a connection whose peer stopped reading.
+"""
+import collections
+import socket
+
+import engineio
+import socketio
+
+from .metrics import SEND_DROPPED, SEND_QUEUED
+
+# Engine.IO packets a client may hold before it gets no more; a binary message is two
+HANDOFF_PACKETS = 4
+
+
+def limit_unsent(sock, size):
+    """Caps the bytes sock's kernel buffer holds not yet sent (TCP_NOTSENT_LOWAT: Linux and macOS).
+
+    Unlike a small SO_SNDBUF this leaves throughput alone: data in flight
+    does not count, only what is waiting behind it.
+    """
+    if sock is None or not size or not hasattr(socket, 'TCP_NOTSENT_LOWAT'):
+        return
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NOTSENT_LOWAT, size)
+    except OSError:
+        # Not TCP (a Unix socket)
+        pass
+
+
+def encode_event(sio, event, data):
+    """One Socket.IO event as the Engine.IO packets every recipient gets, encoded once."""
+    encoded = sio.packet_class(socketio.packet.EVENT, namespace='/', data=[event, data]).encode()
+    return [engineio.packet.Packet(engineio.packet.MESSAGE, part)
+            for part in (encoded if isinstance(encoded, list) else [encoded])]
+
+
+class SendQueues:
+    """A queue per client and room, drained whenever the room gets a new message.
+
+    Only touched from the thread or event loop that emits.
+    """
+
+    def __init__(self, eio, depth):
+        self.eio = eio
+        # 0: no limit, everything goes straight to Engine.IO
+        self.depth = depth
+        # room -> {eio sid: deque of messages}
+        self.rooms = {}
+
+    def push(self, room, eio_sids, packets):
+        """Queues one message for every client in eio_sids; returns [(eio sid, packets)] to send now."""
+        if not self.depth:
+            return [(eio_sid, packets) for eio_sid in eio_sids]
+        queues = self.rooms.get(room, {})
+        kept = {}
+        ready = []
+        dropped = 0
+        for eio_sid in eio_sids:
+            queue = queues.get(eio_sid) or collections.deque()
+            if len(queue) >= self.depth:
+                queue.popleft()
+                dropped += 1
+            queue.append(packets)
+            eio_socket = self.eio.sockets.get(eio_sid)
+            held = eio_socket.queue.qsize() if eio_socket else 0
+            out = []
+            while queue and held < HANDOFF_PACKETS:
+                message = queue.popleft()
+                out += message
+                held += len(message)
+            if out:
+                ready.append((eio_sid, out))
+            kept[eio_sid] = queue
+        # Clients that left the room leave their queue behind
+        self.rooms[room] = kept
+        if dropped:
+            SEND_DROPPED.inc(dropped, channel=room)
+        SEND_QUEUED.set(sum(len(queue) for queue in kept.values()), channel=room)
+        return ready
+
+
+class QueuedEmitter:
+    """emit() for the threaded server's AudioStreamer: every room member through its own bounded queue."""
+
+    def __init__(self, sio, depth):
+        self.sio = sio
+        self.queues = SendQueues(sio.eio, depth)
+
+    def emit(self, event, data=None, to=None):
+        eio_sids = [eio_sid for _, eio_sid in self.sio.manager.get_participants('/', to)]
+        for eio_sid, packets in self.queues.push(to, eio_sids, encode_event(self.sio, event, data)):
+            for packet in packets:
+                self.sio.eio.send_packet(eio_sid, packet)
@@ -0,0 +1,115 @@
+"""Startup settings from the command line, the environment and a JSON config file.
+
+Each option is looked up in that order before falling back to the Config
+default, e.g. --camera 2, REMOTE_SWITCH_CAMERA=2 or {"camera": 2} in
+remote_switch.json. Devices given here are used as-is, without probing.
+"""
+import argparse
+import json
+import os
+import sys
+
+ENV_PREFIX = 'REMOTE_SWITCH_'
+DEFAULT_CONFIG = 'remote_switch.json'
+
+
+def device(value):
+    """Capture device: an index, or a path such as /dev/video0."""
+    return int(value) if str(value).isdigit() else str(value)
+
+
+def audio_device(value):
+    """PortAudio input index, or 'default' for the system default."""
+    return 'default' if str(value).lower() == 'default' else int(value)
+
+
+def size(value):
+    """WIDTHxHEIGHT, e.g. 1280x720."""
+    if isinstance(value, (list, tuple)):
+        return tuple(int(v) for v in value)
+    width, _, height = str(value).lower().partition('x')
+    return int(width), int(height)
+
+
+def flag(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+
+# name -> (type, help)
+OPTIONS = {
+    'pico_ip': (str, 'IP address of the Pico W'),
+    'pico_port': (int, 'UDP port of the Pico W'),
+    'host': (str, 'address the web server listens on'),
+    'port': (int, 'web server port'),
+    'web_backend': (str, 'flask (a thread per connection) or aiohttp (one event loop, needs aiohttp)'),
+    'relay_address': (str, 'Unix socket path or host:port to publish the stream on for spectator fan-out processes'),
+    'input_port': (int, 'controller input WebSocket port'),
+    'input_send_hz': (int, 'send ticks per second for controller state to the Pico (0: send as it arrives)'),
+    'input_format': (str, 'legacy (one packet per player, any firmware) or batch (every player in one datagram, needs the current sketch.ino)'),
+    'video_backend': (str, 'v4l2, dshow, synthetic (a test pattern) or file (--video-file on a loop)'),
+    'camera': (device, 'capture card index or device path; skips probing'),
+    'video_file': (str, 'video played on a loop by the file backend'),
+    'synthetic_pattern': (str, 'scroll, still, noise or clock'),
+    'source_size': (size, 'WIDTHxHEIGHT of synthetic and file sources (default: the capture size)'),
+    'capture_fps': (int, 'capture frame rate'),
+    'capture_grace': (float, 'seconds capture keeps reading after the last viewer leaves'),
+    'encode_workers': (int, 'worker processes for resizing and encoding (0: encode in the capture thread)'),
+    'default_profile': (str, 'rendition for /video_feed without a profile, and where auto starts'),
+    'h264_profile': (str, "rendition also streamed as H.264 (needs PyAV), or 'none'"),
+    'h264_port': (int, 'H.264 WebSocket port'),
+    'h264_bitrate': (int, 'H.264 bitrate in bits per second'),
+    'audio_backend': (str, 'pyaudio, synthetic (a test tone) or wav (--audio-file on a loop)'),
+    'audio_device': (audio_device, "audio input index or 'default'; skips the prompt"),
+    'audio_file': (str, 'WAV file played on a loop by the wav backend'),
+    'audio_rate': (int, 'audio sample rate'),
+    'capture_period_ms': (int, 'ms of audio read from the device at a time'),
+    'audio_packet_ms': (int, 'ms of audio per packet sent to listeners; Opus needs 5, 10, 20, 40 or 60, other values send raw PCM'),
+    'audio_queue_packets': (int, 'audio packets a slow listener may have waiting before the oldest is dropped (0: no limit)'),
+    'video_queue_frames': (int, 'frames a slow viewer may fall behind before the oldest are dropped'),
+    'media_unsent_bytes': (int, 'bytes a media connection may hold unsent in the kernel (Linux and macOS; 0 for no limit)'),
+    'prompt': (flag, 'ask which device to use when several are found (default: only on a terminal)'),
+}
+
+
+def load_settings(defaults, argv=None, description=None):
+    """Returns a Namespace with every option in OPTIONS; unset devices are None."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--config', help=f'JSON settings file (default: {DEFAULT_CONFIG} if present)')
+    for name, (kind, text) in OPTIONS.items():
+        if kind is flag:
+            parser.add_argument('--' + name.replace('_', '-'), dest=name, action='store_true', default=None, help=text)
+            parser.add_argument('--no-' + name.replace('_', '-'), dest=name, action='store_false', default=None)
+        else:
+            parser.add_argument('--' + name.replace('_', '-'), dest=name, type=kind, help=text)
+    args = parser.parse_args(argv)
+
+    path = args.config or os.environ.get(ENV_PREFIX + 'CONFIG')
+    from_file = {}
+    if path or os.path.exists(DEFAULT_CONFIG):
+        try:
+            with open(path or DEFAULT_CONFIG) as f:
+                from_file = json.load(f)
+        except (OSError, ValueError) as e:
+            parser.error(f"Cannot read config {path or DEFAULT_CONFIG}: {e}")
+        unknown = set(from_file) - set(OPTIONS)
+        if unknown:
+            parser.error(f"Unknown settings in config: {', '.join(sorted(unknown))}")
+
+    for name, (kind, _) in OPTIONS.items():
+        if getattr(args, name) is not None:
+            continue
+        env = os.environ.get(ENV_PREFIX + name.upper())
+        try:
+            if env is not None:
+                setattr(args, name, kind(env))
+            elif name in from_file:
+                setattr(args, name, kind(from_file[name]))
+            else:
+                setattr(args, name, defaults.get(name))
+        except ValueError:
+            parser.error(f"Invalid value for {name}: {env if env is not None else from_file[name]!r}")
+    if args.prompt is None:
+        args.prompt = sys.stdin.isatty()
+    return args
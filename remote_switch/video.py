@@ -0,0 +1,258 @@
+"""Video pipeline: capture thread, renditions and the per-viewer MJPEG generator."""
+import itertools
+import threading
+import time
+
+import cv2
+
+from .adaptive import AdaptiveQuality
+from .capture import open_camera
+from .change_detector import ChangeDetector, thumbnail
+from .encoder_pool import EncoderPool, encode_renditions
+from .frame_hub import FrameHub, jpeg_size, multipart_frame
+from .lazy_capture import LazyCapture
+from .metrics import (REGISTRY, VIDEO_CAPTURED, VIDEO_CAPTURING, VIDEO_DROPPED, VIDEO_ENCODE, VIDEO_FPS,
+                      VIDEO_FRAMES, VIDEO_SEND, VIDEO_SKIPPED, VIDEO_SKIP_RATIO, VIDEO_STARTUP, VIDEO_VIEWERS,
+                      VIDEO_VIEWER_LAG)
+
+# /video_feed?profile=auto follows each viewer's link up and down the ladder
+AUTO_PROFILE = 'auto'
+# cv2.imdecode flags that decode straight to 1/n of the size
+REDUCED_DECODE = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                  (2, cv2.IMREAD_REDUCED_COLOR_2), (1, cv2.IMREAD_COLOR))
+
+
+class VideoStreamer:
+    def __init__(self, config, open_device=None):
+        self.config = config
+        self.profiles = config.profiles
+        # One hub per rendition, each with its own viewer count
+        self.hubs = {name: FrameHub(config.video_queue_frames) for name in self.profiles}
+        # Start the encoders before the capture device and threads exist
+        self.pool = None
+        if config.encode_workers:
+            width, height = config.source_size or config.capture_size
+            # The size the slots hold; larger frames are shrunk to it first
+            self.slot_size = (width, height)
+            self.pool = EncoderPool(config.encode_workers, width * height * 3,
+                                    self.publish, context=config.encode_start_method)
+
+        # The device is opened by the first viewer and idles when nobody watches
+        self.capture = LazyCapture(open_device or (lambda: open_camera(config)), config.capture_grace,
+                                   config.capture_fps, self.record_start)
+        self.detector = ChangeDetector(config.change_threshold, config.keepalive_interval)
+        self.last_collect = (time.perf_counter(), {name: 0 for name in self.profiles})
+        self.viewer_ids = itertools.count(1)
+        # Frames read so far, the X-Frame header of each part
+        self.frame_number = 0
+        REGISTRY.on_collect(self.collect_metrics)
+        # Last encode failure printed, so a broken source does not flood the log
+        self.encode_error = None
+        self.running = True
+
+        self.thread = threading.Thread(target=self.update, name='video-capture', daemon=True)
+        self.thread.start()
+
+    def record_start(self, kind, seconds):
+        print(f"Capture {kind} start: first frame after {seconds * 1000:.0f} ms")
+        VIDEO_STARTUP.observe(seconds, kind=kind)
+
+    def update(self):
+        while self.running:
+            try:
+                ret, frame = self.capture.read()
+                # As close to capture as we get: the device has had the frame since before read() returned
+                captured_ms = time.time() * 1000
+            except Exception as e:
+                # A source that cannot open (missing file, bad pattern) is retried while someone watches
+                print(f"Capture Error: {e}")
+                time.sleep(1.0)
+                continue
+            if ret:
+                self.frame_number += 1
+                send, thumb = self.should_send(frame)
+                if not send:
+                    continue
+                stamp = (self.frame_number, captured_ms)
+                try:
+                    # Backends that ignore CONVERT_RGB=0 still hand back decoded frames
+                    if frame.ndim == 3:
+                        sent = self.encode_renditions(frame, self.profiles, stamp)
+                    else:
+                        sent = self.forward_mjpeg(frame, stamp)
+                    # Only a frame that went out is what viewers see; a dropped one is compared against again
+                    if sent:
+                        self.detector.sent(thumb)
+                except Exception as e:
+                    # One bad frame must not stop capture for good; say so once, not every frame
+                    if str(e) != self.encode_error:
+                        print(f"Encode Error: {e}")
+                    self.encode_error = str(e)
+                    continue
+                if self.pool is None:
+                    # Inline encoding holds the GIL; give the web threads a turn
+                    time.sleep(0.005)
+            else:
+                time.sleep(0.1)
+
+    def forward_mjpeg(self, raw, stamp=None):
+        """Publishes raw to every watched rendition; False if any of them was dropped."""
+        size = jpeg_size(raw)
+        pending = []
+        for name, (width, height, quality) in self.profiles.items():
+            hub = self.hubs[name]
+            if hub.viewers == 0:
+                continue
+            if size == (width, height) and raw.size <= self.config.passthrough_max_bytes_per_pixel * width * height:
+                self.publish(name, multipart_frame(raw, stamp))
+            else:
+                pending.append(name)
+        if not pending:
+            return True
+        if size is None:
+            return False
+        # Decode once, at the coarsest scale that still covers every pending rendition
+        for scale, flags in REDUCED_DECODE:
+            if all(size[0] // scale >= self.profiles[n][0] and size[1] // scale >= self.profiles[n][1]
+                   for n in pending):
+                break
+        return self.encode_renditions(raw, pending, stamp, flags)
+
+    def encode_renditions(self, frame, names, stamp=None, flags=cv2.IMREAD_COLOR):
+        """Encodes the watched renditions of frame; False if the encoder pool dropped it."""
+        renditions = [(name, *self.profiles[name]) for name in names if self.hubs[name].viewers]
+        if not renditions:
+            return True
+        if self.pool and frame.nbytes > self.pool.slot_bytes and frame.ndim == 3:
+            # Larger than the card was asked for (DirectShow can ignore the requested size)
+            frame = cv2.resize(frame, self.slot_size, interpolation=cv2.INTER_AREA)
+        if self.pool and frame.nbytes <= self.pool.slot_bytes:
+            # Never blocks: a frame is dropped if every encoder is busy
+            return self.pool.submit(frame, renditions, flags, stamp)
+        for name, part, seconds in encode_renditions(frame, renditions, flags, stamp):
+            self.publish(name, part, seconds)
+        return True
+
+    def publish(self, name, part, encode_seconds=None):
+        self.hubs[name].publish(part)
+        VIDEO_FRAMES.inc(profile=name)
+        if encode_seconds is not None:
+            VIDEO_ENCODE.observe(encode_seconds, profile=name)
+
+    def should_send(self, frame):
+        """Returns (send, thumbnail to pass to detector.sent() once the frame is out)."""
+        # Nothing to do without viewers; otherwise skip frames that have not changed
+        watched = [hub for hub in self.hubs.values() if hub.viewers]
+        if not watched:
+            return False, None
+        thumb = thumbnail(frame)
+        return self.detector.changed(thumb, force=any(hub.fresh_viewer for hub in watched)), thumb
+
+    def stats(self):
+        return {
+            'frames': self.detector.frames,
+            'skipped': self.detector.skipped,
+            'skip_ratio': self.detector.skip_ratio,
+        }
+
+    def collect_metrics(self):
+        now = time.perf_counter()
+        then, seqs = self.last_collect
+        for name, hub in self.hubs.items():
+            VIDEO_FPS.set((hub.seq - seqs[name]) / max(now - then, 1e-6), profile=name)
+            VIDEO_VIEWERS.set(hub.viewers, profile=name)
+        self.last_collect = (now, {name: hub.seq for name, hub in self.hubs.items()})
+        stats = self.stats()
+        VIDEO_CAPTURED.set(stats['frames'])
+        VIDEO_SKIPPED.set(stats['skipped'])
+        VIDEO_SKIP_RATIO.set(stats['skip_ratio'])
+        VIDEO_CAPTURING.set(int(self.capture.reading))
+
+    def get_frame(self, profile, last_seq=0):
+        # Returns (seq, frame) newer than last_seq; every viewer sees every frame
+        return self.hubs[profile].wait_for(last_seq, timeout=1.0)
+
+    def generate_frames(self, profile):
+        """Yields multipart parts for one /video_feed viewer until it disconnects."""
+        viewer = Viewer(self, profile)
+        last_seq = viewer.start_seq
+        try:
+            while True:
+                try:
+                    last_seq, frame = self.get_frame(viewer.profile, last_seq)
+                    if frame:
+                        started = time.perf_counter()
+                        yield frame
+                        # The server resumes us once the write returns, so this is the send time
+                        last_seq = viewer.sent(last_seq, time.perf_counter() - started)
+                    else:
+                        time.sleep(0.01)
+                except GeneratorExit:
+                    # Client disconnected
+                    break
+                except Exception:
+                    break
+        finally:
+            viewer.close()
+
+    def close(self):
+        self.running = False
+        REGISTRY.remove_collector(self.collect_metrics)
+        # Wakes the capture thread if it waits for viewers and lets go of the device
+        self.capture.close()
+        self.thread.join(timeout=2.0)
+        if self.pool:
+            self.pool.close()
+
+
+class Viewer:
+    """One /video_feed connection: its rendition, the auto ladder and its metrics.
+
+    The server loop waits for frames of viewer.profile, writes them and
+    reports each write to sent(); generate_frames() is the threaded loop.
+    """
+
+    def __init__(self, streamer, profile):
+        self.streamer = streamer
+        self.adaptive = None
+        if profile == AUTO_PROFILE:
+            config = streamer.config
+            self.adaptive = AdaptiveQuality(streamer.profiles, config.default_profile, 1.0 / config.capture_fps)
+            profile = self.adaptive.profile
+        self.profile = profile
+        self.hub = streamer.hubs[profile]
+        self.hub.subscribe()
+        # Counted once per connection, so switching renditions never idles the device
+        streamer.capture.acquire()
+        self.id = next(streamer.viewer_ids)
+        # The hub still holds its last frame, which is stale if nobody watched this rendition
+        # since (or capture idled); start with the next one, as H.264 clients do
+        self.start_seq = self.hub.seq
+        # Sequence of the last frame sent from this hub, 0 before the first
+        self.last_seq = 0
+
+    def sent(self, seq, send_time):
+        """Records a frame written in send_time; returns the sequence to wait past next."""
+        behind = self.hub.seq - seq
+        if self.last_seq and seq - self.last_seq > 1:
+            VIDEO_DROPPED.inc(seq - self.last_seq - 1, profile=self.profile)
+        self.last_seq = seq
+        VIDEO_SEND.observe(send_time, profile=self.profile)
+        VIDEO_VIEWER_LAG.set(behind, viewer=self.id, profile=self.profile)
+        if self.adaptive:
+            next_profile = self.adaptive.record(send_time, behind)
+            if next_profile != self.profile:
+                VIDEO_VIEWER_LAG.remove(viewer=self.id, profile=self.profile)
+                self.hub.unsubscribe()
+                self.profile = next_profile
+                self.hub = self.streamer.hubs[next_profile]
+                self.hub.subscribe()
+                self.last_seq = 0
+                # Wait for a fresh encode rather than a stale frame
+                return self.hub.seq
+        return seq
+
+    def close(self):
+        VIDEO_VIEWER_LAG.remove(viewer=self.id, profile=self.profile)
+        self.hub.unsubscribe()
+        self.streamer.capture.release()
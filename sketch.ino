@@ -41,6 +41,19 @@ struct __attribute__((packed)) PacketData {
     uint8_t  lx; uint8_t  ly; uint8_t  rx; uint8_t  ry;
 };
 
+// BATCHED DATAGRAM: this header, then count x PacketData (every active player).
+// A bare PacketData is still accepted. Python side: remote_switch/input_protocol.py
+#define BATCH_MAGIC 0xB5
+#define BATCH_VERSION 1
+#define MAX_BATCH 8
+
+struct __attribute__((packed)) BatchHeader {
+    uint8_t  magic;
+    uint8_t  version;
+    uint16_t seq;
+    uint8_t  count;
+};
+
 Adafruit_USBD_HID usb_hid1;
 Adafruit_USBD_HID usb_hid2;
 WiFiUDP udp;
@@ -54,6 +67,11 @@ unsigned long lastPacketTime1 = 0;
 unsigned long lastPacketTime2 = 0;
 const unsigned long TIMEOUT_MS = 500; // Reset controller if no data for 500ms
 
+// SEQUENCE LOGIC (batches only)
+bool haveSeq = false;
+uint16_t lastSeq = 0;
+unsigned long lastBatchTime = 0;
+
 void resetReport(SwitchReport* r) {
     r->buttons = 0;
     r->hat = 0x08;
@@ -61,6 +79,34 @@ void resetReport(SwitchReport* r) {
     r->vendor = 0;
 }
 
+// Caller holds reportMutex
+void applyPacket(const PacketData* packet) {
+    if (packet->playerId == 1) {
+        gp1.buttons = packet->buttons; gp1.hat = packet->hat;
+        gp1.lx = packet->lx; gp1.ly = packet->ly; gp1.rx = packet->rx; gp1.ry = packet->ry;
+        lastPacketTime1 = millis();
+    }
+    else if (packet->playerId == 2) {
+        gp2.buttons = packet->buttons; gp2.hat = packet->hat;
+        gp2.lx = packet->lx; gp2.ly = packet->ly; gp2.rx = packet->rx; gp2.ry = packet->ry;
+        lastPacketTime2 = millis();
+    }
+}
+
+// Drops duplicates and batches older than the last one. After TIMEOUT_MS of
+// silence anything goes, so a restarted server counting from 0 gets through.
+bool acceptSeq(uint16_t seq) {
+    unsigned long now = millis();
+    if (haveSeq && now - lastBatchTime < TIMEOUT_MS) {
+        uint16_t ahead = seq - lastSeq;
+        if (ahead == 0 || ahead >= 0x8000) return false;
+    }
+    haveSeq = true;
+    lastSeq = seq;
+    lastBatchTime = now;
+    return true;
+}
+
 void setup() {
     TinyUSBDevice.setID(VID, PID);
     TinyUSBDevice.setManufacturerDescriptor("HORI CO.,LTD.");
@@ -144,27 +190,35 @@ void loop1() {
     // Fix: Process ALL available packets to drain the buffer.
     // This ensures we always react to the LATEST packet and don't lag behind.
     int packetSize;
+    static uint8_t buffer[sizeof(BatchHeader) + MAX_BATCH * sizeof(PacketData)];
     while ((packetSize = udp.parsePacket())) { 
-        if (packetSize >= sizeof(PacketData)) {
-            PacketData packet;
-            udp.read((char*)&packet, sizeof(packet));
-
-            // Update Shared Memory
+        int len = udp.read(buffer, sizeof(buffer));
+        // Flush whatever did not fit the buffer
+        udp.flush();
+
+        if (len >= (int)sizeof(BatchHeader) && buffer[0] == BATCH_MAGIC) {
+            BatchHeader header;
+            memcpy(&header, buffer, sizeof(header));
+            if (header.version != BATCH_VERSION || header.count > MAX_BATCH
+                || packetSize != (int)(sizeof(BatchHeader) + header.count * sizeof(PacketData))) continue;
+            if (!acceptSeq(header.seq)) continue;
+
+            // Update Shared Memory: every player in one go
             mutex_enter_blocking(&reportMutex);
-            if (packet.playerId == 1) {
-                gp1.buttons = packet.buttons; gp1.hat = packet.hat;
-                gp1.lx = packet.lx; gp1.ly = packet.ly; gp1.rx = packet.rx; gp1.ry = packet.ry;
-                lastPacketTime1 = millis();
-            } 
-            else if (packet.playerId == 2) {
-                gp2.buttons = packet.buttons; gp2.hat = packet.hat;
-                gp2.lx = packet.lx; gp2.ly = packet.ly; gp2.rx = packet.rx; gp2.ry = packet.ry;
-                lastPacketTime2 = millis();
+            for (uint8_t i = 0; i < header.count; i++) {
+                PacketData packet;
+                memcpy(&packet, buffer + sizeof(BatchHeader) + i * sizeof(PacketData), sizeof(packet));
+                applyPacket(&packet);
             }
             mutex_exit(&reportMutex);
-        } else {
-            // Flush incomplete/garbage packets
-            udp.flush(); 
+        }
+        else if (len >= (int)sizeof(PacketData)) {
+            // Legacy: one player per datagram
+            PacketData packet;
+            memcpy(&packet, buffer, sizeof(packet));
+            mutex_enter_blocking(&reportMutex);
+            applyPacket(&packet);
+            mutex_exit(&reportMutex);
         }
     }
 